@@ -0,0 +1,289 @@
+# backend/app/admission.py
+"""
+Admission control: bounded, prioritised queues in front of expensive work.
+
+Classes, highest priority first:
+
+- chat     interactive /chat
+- summary  /chat with kind="summary" (the UI's summarize button)
+- ingest   /upload, /upload/batch
+- batch    /chat with kind="batch" (eval runs, scripts); same priority as ingest
+
+The class of a /chat request is decided here, not by the client (chat_class):
+ADMISSION_KEYS maps API keys (X-Api-Key header) to the highest class they may
+use, and callers without a known key get ADMISSION_UNTRUSTED_CLASS (default
+batch) once any key is configured. The payload's kind can only lower the
+priority below that ceiling, never raise it.
+
+At most ADMISSION_CONCURRENCY requests run at once; summary/ingest/batch are
+further capped by ADMISSION_SLOTS_<CLASS> so they can never take every slot
+from chat. When a slot frees, the oldest waiter of the highest-priority class
+that may run gets it. Each class has a bounded queue (ADMISSION_QUEUE_<CLASS>)
+and a maximum wait (ADMISSION_MAX_WAIT_<CLASS>, seconds); a request that
+finds its queue full, or waits too long, gets 429 with a Retry-After
+estimated from recent service times instead of hanging until a timeout.
+
+Per-class queue depth, wait and service times: GET /admission/stats.
+ADMISSION_CONTROL=off disables all of it.
+
+Every process has its own controller: the writer and each query worker
+admit independently, so ADMISSION_CONCURRENCY is a per-process limit and a
+deployment with N query workers runs up to N times that many chats at once.
+"""
+import os
+import hmac
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
+
+from fastapi import HTTPException
+
+
+PRIORITY = {"chat": 0, "summary": 1, "ingest": 2, "batch": 2}
+DEFAULT_QUEUE = {"chat": 32, "summary": 8, "ingest": 4, "batch": 8}
+DEFAULT_MAX_WAIT = {"chat": 10.0, "summary": 30.0, "ingest": 120.0, "batch": 60.0}
+DEFAULT_SLOTS = {"summary": 2, "ingest": 1, "batch": 1}  # chat may use every slot
+
+
+CHAT_CLASSES = ("chat", "summary", "batch")
+
+
+def admission_enabled() -> bool:
+    return os.getenv("ADMISSION_CONTROL", "on").strip().lower() not in ("0", "off", "false", "no")
+
+
+def _class_env(name: str, default: str) -> str:
+    kind = os.getenv(name, default).strip().lower()
+    return kind if kind in CHAT_CLASSES else default
+
+
+def admission_keys() -> Dict[str, str]:
+    """ADMISSION_KEYS="key1:chat,key2:batch" -> {key: class}; a key without a class gets chat."""
+    keys: Dict[str, str] = {}
+    for item in os.getenv("ADMISSION_KEYS", "").split(","):
+        key, _, kind = item.strip().partition(":")
+        if key:
+            kind = kind.strip().lower() or "chat"
+            keys[key] = kind if kind in CHAT_CLASSES else _class_env("ADMISSION_UNTRUSTED_CLASS", "batch")
+    return keys
+
+
+def chat_class(requested: Optional[str], api_key: Optional[str] = None) -> str:
+    """
+    Admission class for a /chat request. The caller's key sets the ceiling
+    (no keys configured: everyone may use chat); `requested` can only lower it.
+    """
+    keys = admission_keys()
+    if not keys:
+        ceiling = "chat"
+    else:
+        ceiling = _class_env("ADMISSION_UNTRUSTED_CLASS", "batch")
+        for key, kind in keys.items():
+            if api_key and hmac.compare_digest(api_key.encode(), key.encode()):
+                ceiling = kind
+                break
+    requested = requested if requested in CHAT_CLASSES else "chat"
+    return max(ceiling, requested, key=PRIORITY.get)
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    vals = sorted(values)
+    idx = min(len(vals) - 1, max(0, int(round(pct / 100.0 * (len(vals) - 1)))))
+    return vals[idx]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+class Overloaded(Exception):
+    def __init__(self, kind: str, reason: str, retry_after: int):
+        super().__init__(f"{kind}: {reason}")
+        self.kind = kind
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ClassStats:
+    def __init__(self, window: int = 500):
+        self.waits = deque(maxlen=window)  # seconds queued before admission
+        self.services = deque(maxlen=window)  # seconds holding a slot
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+
+
+class AdmissionController:
+    def __init__(self, capacity: Optional[int] = None):
+        self.lock = threading.Lock()
+        self.capacity = max(1, capacity or int(os.getenv("ADMISSION_CONCURRENCY", "4")))
+        self.running: Dict[str, int] = {k: 0 for k in PRIORITY}
+        self.queues: Dict[str, deque] = {k: deque() for k in PRIORITY}
+        self.stats: Dict[str, ClassStats] = {k: ClassStats() for k in PRIORITY}
+
+    # -- limits ---------------------------------------------------------------
+
+    def slots(self, kind: str) -> int:
+        default = DEFAULT_SLOTS.get(kind, self.capacity)
+        return max(1, min(self.capacity, int(os.getenv(f"ADMISSION_SLOTS_{kind.upper()}", str(default)))))
+
+    def queue_limit(self, kind: str) -> int:
+        return max(0, int(os.getenv(f"ADMISSION_QUEUE_{kind.upper()}", str(DEFAULT_QUEUE[kind]))))
+
+    def max_wait(self, kind: str) -> float:
+        return float(os.getenv(f"ADMISSION_MAX_WAIT_{kind.upper()}", str(DEFAULT_MAX_WAIT[kind])))
+
+    # -- scheduling (callers hold self.lock) ------------------------------------
+
+    def _can_run(self, kind: str) -> bool:
+        return sum(self.running.values()) < self.capacity and self.running[kind] < self.slots(kind)
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters: highest priority first, FIFO within a class."""
+        order = sorted(PRIORITY, key=PRIORITY.get)
+        granted = True
+        while granted:
+            granted = False
+            for kind in order:
+                queue = self.queues[kind]
+                if queue and self._can_run(kind):
+                    waiter = queue.popleft()
+                    waiter["granted"] = True
+                    self.running[kind] += 1
+                    waiter["loop"].call_soon_threadsafe(_wake, waiter["future"])
+                    granted = True
+                    break
+
+    def _retry_after(self, kind: str) -> int:
+        """Seconds until a retry has a fair chance: work queued at or above this priority / throughput."""
+        ahead = sum(len(q) for k, q in self.queues.items() if PRIORITY[k] <= PRIORITY[kind])
+        service = _percentile(list(self.stats[kind].services), 50) or 1.0
+        return int(min(60, max(1, math.ceil(service * (ahead + 1) / self.slots(kind)))))
+
+    # -- public -----------------------------------------------------------------
+
+    async def acquire(self, kind: str) -> float:
+        """Wait for a slot; returns seconds waited. Raises Overloaded (queue full / waited too long)."""
+        t0 = time.monotonic()
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            # a runnable class has no waiters (_dispatch), so the bound only applies when we'd queue
+            if not self._can_run(kind) and len(self.queues[kind]) >= self.queue_limit(kind):
+                self.stats[kind].rejected_full += 1
+                raise Overloaded(kind, "queue full", self._retry_after(kind))
+            waiter = {"future": loop.create_future(), "loop": loop, "granted": False}
+            self.queues[kind].append(waiter)
+            self._dispatch()
+
+        if not waiter["granted"]:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter["future"]), timeout=self.max_wait(kind))
+            except asyncio.TimeoutError:
+                with self.lock:
+                    if not waiter["granted"]:
+                        self.queues[kind].remove(waiter)
+                        self.stats[kind].rejected_timeout += 1
+                        raise Overloaded(kind, "queue wait exceeded", self._retry_after(kind))
+                # granted while timing out: keep the slot
+            except asyncio.CancelledError:
+                # client went away: give the slot (or the queue place) back
+                with self.lock:
+                    if waiter["granted"]:
+                        self.running[kind] -= 1
+                        self._dispatch()
+                    else:
+                        self.queues[kind].remove(waiter)
+                raise
+
+        waited = time.monotonic() - t0
+        with self.lock:
+            self.stats[kind].admitted += 1
+            self.stats[kind].waits.append(waited)
+        return waited
+
+    def release(self, kind: str, service_s: float) -> None:
+        with self.lock:
+            self.running[kind] -= 1
+            self.stats[kind].services.append(service_s)
+            self._dispatch()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            classes = {}
+            for kind in sorted(PRIORITY, key=PRIORITY.get):
+                st = self.stats[kind]
+                waits, services = list(st.waits), list(st.services)
+                classes[kind] = {
+                    "priority": PRIORITY[kind],
+                    "running": self.running[kind],
+                    "queued": len(self.queues[kind]),
+                    "slots": self.slots(kind),
+                    "queue_limit": self.queue_limit(kind),
+                    "max_wait_s": self.max_wait(kind),
+                    "admitted": st.admitted,
+                    "rejected_full": st.rejected_full,
+                    "rejected_timeout": st.rejected_timeout,
+                    "wait_p50_ms": _ms(_percentile(waits, 50)),
+                    "wait_p95_ms": _ms(_percentile(waits, 95)),
+                    "wait_max_ms": _ms(max(waits) if waits else None),
+                    "service_p50_ms": _ms(_percentile(services, 50)),
+                    "service_p95_ms": _ms(_percentile(services, 95)),
+                }
+            return {
+                "enabled": admission_enabled(),
+                "capacity": self.capacity,
+                "running": sum(self.running.values()),
+                "queued": sum(len(q) for q in self.queues.values()),
+                "classes": classes,
+            }
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(True)
+
+
+_CONTROLLER: Optional[AdmissionController] = None
+_CONTROLLER_LOCK = threading.Lock()
+
+
+def get_controller() -> AdmissionController:
+    global _CONTROLLER
+    with _CONTROLLER_LOCK:
+        if _CONTROLLER is None:
+            _CONTROLLER = AdmissionController()
+        return _CONTROLLER
+
+
+@asynccontextmanager
+async def admit(kind: str):
+    """Hold one slot of class `kind` for the block; 429 + Retry-After if over capacity."""
+    if not admission_enabled():
+        yield
+        return
+
+    ctl = get_controller()
+    try:
+        await ctl.acquire(kind)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Server busy ({e.reason} for {kind} requests), retry in {e.retry_after}s",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ctl.release(kind, time.perf_counter() - t0)
+
+
+def admission_stats() -> Dict[str, Any]:
+    return get_controller().snapshot()
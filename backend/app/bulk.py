@@ -0,0 +1,188 @@
+# backend/app/bulk.py
+"""
+Bulk ingest: many PDFs in one go.
+
+    cd backend
+    python -m app.bulk ../outlooks/2026Q1/                 # every *.pdf in a directory
+    python -m app.bulk "../outlooks/**/*.pdf" --workers 8   # or globs / individual files
+
+Parsing, cleaning, chunking, MinHash and table/figure extraction run on a
+process pool (same worker as app.reindex); dedup linking happens per document in upload order, and
+embedding + col.add are batched across documents (INGEST_BATCH_SIZE chunks
+per call). POST /upload/batch runs the same path inside the writer.
+Files are content-addressed (app.checkpoint): re-running an import skips
+PDFs that are already in, and finishes any interrupted ones.
+
+The CLI takes data/writer.lock, so it only runs while no API writer is up.
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+from typing import List, Dict, Any, Optional, Tuple
+
+from .store import claim_writer, get_collection, get_chunking, bump_index_version
+from .ingest import IndexBatch
+from .reindex import doc_order, prepare_doc, prepare_pool
+from .maintenance import delete_document
+from .figures import has_figures, save_figures
+from .checkpoint import UnreadableDocument, begin_document, mark_failed, mark_ready, resume_pending
+from . import registry
+
+
+def safe_filename(name: Optional[str]) -> str:
+    return (name or "document.pdf").replace("/", "_").replace("\\", "_")
+
+
+def stage_files(files: List[Tuple[str, bytes]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    (doc_name, bytes) -> registry entries to ingest, plus results for files
+    that are already fully ingested (same content hash). Caller holds the write lock.
+    """
+    todo: Dict[str, Dict[str, Any]] = {}
+    skipped: List[Dict[str, Any]] = []
+    for name, data in files:
+        entry, _ = begin_document(name, data)
+        if registry.is_ready(entry):
+            skipped.append({"doc_id": entry["doc_id"], "doc_name": name, "status": "duplicate"})
+        else:
+            todo.setdefault(entry["doc_id"], entry)
+    return list(todo.values()), skipped
+
+
+def ingest_documents(
+    docs: List[Dict[str, Any]],
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Ingest staged documents (registry entries, see stage_files) into the
+    active collection. Each document is marked ready as soon as the batch
+    holding its last chunk is committed; a run that stops on an error marks
+    the rest "failed" for checkpoint.resume_pending. A document that fails to
+    parse is dropped; one whose preparation fails otherwise (worker crash,
+    disk error) is marked "failed" and stays resumable. Both are reported and
+    the other documents carry on. Caller holds the write lock.
+    """
+    t0 = time.perf_counter()
+    chunking = get_chunking()
+    chunk_size = chunk_size or chunking["chunk_size"]
+    chunk_overlap = chunk_overlap or chunking["chunk_overlap"]
+    docs = sorted(docs, key=doc_order)
+    col = get_collection()
+    batch = IndexBatch(col, batch_size=batch_size, on_commit=mark_ready)
+
+    results: List[Dict[str, Any]] = []
+    done: List[Dict[str, Any]] = []
+    totals = {"documents": 0, "failed": 0, "pages": 0, "chunks_added": 0, "duplicates_linked": 0}
+
+    try:
+        n_workers = min(workers or os.cpu_count() or 1, max(1, len(docs)))
+        with prepare_pool(n_workers) as pool:
+            futures = [
+                (
+                    pool.submit(
+                        prepare_doc,
+                        d,
+                        d.get("chunk_size") or chunk_size,
+                        d.get("chunk_overlap") or chunk_overlap,
+                        not has_figures(d["doc_id"]),
+                    ),
+                    d,
+                )
+                for d in docs
+            ]
+            for fut, doc in futures:
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    if isinstance(e, UnreadableDocument):
+                        delete_document(doc["doc_id"])
+                    else:
+                        mark_failed([doc["doc_id"]], str(e))
+                    totals["failed"] += 1
+                    results.append({"doc_id": doc["doc_id"], "doc_name": doc["doc_name"], "status": "error", "error": str(e)})
+                    print(f"[bulk] {doc['doc_name']}: failed ({e})")
+                    continue
+
+                if res["with_figures"]:
+                    save_figures(doc["doc_id"], res["figure_rows"], res["figure_error"])
+                registry.update_doc(doc["doc_id"], chunks_total=len(res["chunks"]))
+                stats = batch.add_document(res["chunks"], doc["doc_id"], doc["doc_name"])
+                totals["documents"] += 1
+                totals["pages"] += res["pages"]
+                totals["chunks_added"] += stats["chunks_added"]
+                totals["duplicates_linked"] += stats["duplicates_linked"]
+                results.append({"doc_id": doc["doc_id"], "doc_name": doc["doc_name"], "status": "ok", "pages": res["pages"], **stats})
+                done.append(doc)
+                print(f"[bulk {len(results)}/{len(docs)}] {doc['doc_name']}: {stats}")
+
+        batch.flush()
+    except Exception as e:
+        # embedding / upsert failed: whatever isn't committed yet is "failed", resumable later
+        mark_failed([d["doc_id"] for d in docs], str(e))
+        raise
+    finally:
+        if done:
+            bump_index_version()
+
+    seconds = time.perf_counter() - t0
+    chunks = totals["chunks_added"] + totals["duplicates_linked"]
+    totals.update(
+        {
+            "seconds": round(seconds, 2),
+            "pages_per_s": round(totals["pages"] / seconds, 2) if seconds else None,
+            "chunks_per_s": round(chunks / seconds, 2) if seconds else None,
+        }
+    )
+    print(
+        f"[bulk] {totals['documents']} docs, {totals['pages']} pages, {chunks} chunks in {seconds:.1f}s "
+        f"({totals['pages_per_s']} pages/s, {totals['chunks_per_s']} chunks/s), {totals['failed']} failed"
+    )
+    return {**totals, "results": results}
+
+
+def expand_paths(patterns: List[str]) -> List[str]:
+    """Directories -> their *.pdf files; anything else is treated as a glob."""
+    found: List[str] = []
+    for p in patterns:
+        if os.path.isdir(p):
+            found.extend(glob.glob(os.path.join(p, "*.pdf")) + glob.glob(os.path.join(p, "*.PDF")))
+        else:
+            found.extend(glob.glob(p, recursive=True))
+    return sorted(dict.fromkeys(os.path.abspath(f) for f in found if os.path.isfile(f)))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bulk-ingest PDFs from directories or globs")
+    ap.add_argument("paths", nargs="+", help="Directories, files or glob patterns")
+    ap.add_argument("--workers", type=int, default=None, help="Process pool size (default: all cores)")
+    ap.add_argument("--batch-size", type=int, default=None, help="Chunks per embedding/add call (INGEST_BATCH_SIZE)")
+    args = ap.parse_args()
+
+    files = expand_paths(args.paths)
+    if not files:
+        sys.exit("No PDFs matched")
+
+    claim_writer()
+    # Finish anything an earlier, interrupted run left behind first
+    resume_pending(batch_size=args.batch_size)
+
+    staged = []
+    for path in files:
+        with open(path, "rb") as f:
+            staged.append((safe_filename(os.path.basename(path)), f.read()))
+    docs, skipped = stage_files(staged)
+
+    print(f"Ingesting {len(docs)} PDFs ({len(skipped)} already ingested)")
+    res = ingest_documents(docs, workers=args.workers, batch_size=args.batch_size)
+    for r in res["results"]:
+        if r["status"] == "error":
+            print(f"  FAILED {r['doc_name']}: {r['error']}")
+
+
+if __name__ == "__main__":
+    main()
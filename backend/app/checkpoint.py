@@ -0,0 +1,201 @@
+# backend/app/checkpoint.py
+"""
+Resumable, checkpointed ingestion.
+
+Each document's doc_id is the hash of its PDF bytes, so retrying an upload
+(or uploading the same file twice) never creates a second document. Progress
+is kept in the document's registry entry:
+
+    status              "ingesting" until every chunk is committed, then "ready";
+                        "failed" (with `error`) when an attempt stopped early
+    ingest_key          prefix of the deterministic chunk ids ("<doc_id>:<started_at>")
+    chunk_size/overlap  chunking parameters those ids depend on (the corpus
+                        setting, store.get_chunking, when the upload started)
+    chunks_total        chunk count once the document has been chunked
+    chunks_committed    chunks embedded + stored, advanced after every batch
+
+Chunks are committed in INGEST_BATCH_SIZE batches; the checkpoint only moves
+after a batch's vectors and side indexes are on disk, and batches are
+upserted, so replaying one after a crash is harmless. A restarted writer
+resumes every unfinished ("ingesting" or "failed") document from its last
+checkpoint (resume_on_startup); POST /admin/resume, or uploading the same
+file again, retries without a restart. Retrieval skips those documents until
+they are ready (registry.hidden_doc_ids). The document's table/figure file
+(app.figures) is built here too, once, so lookups never build it.
+"""
+import os
+import time
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from .store import get_collection, get_paths, get_chunking, bump_index_version
+from .ingest import extract_pages, chunk_pages, IndexBatch, ingest_batch_size
+from .maintenance import delete_document, start_job, run_job
+from .partitions import build_partitions
+from .figures import build_figures, has_figures
+from . import pagecache
+from . import registry
+
+
+class UnreadableDocument(ValueError):
+    """The PDF could not be parsed: there is nothing to resume, so its entry and file are removed."""
+
+
+def content_doc_id(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def begin_document(
+    doc_name: str,
+    data: bytes,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Store the PDF and open an "ingesting" entry for it. If this exact file is
+    already known, returns its entry instead (ready, or ingesting = resume).
+    Returns (entry, is_new). Caller holds the write lock.
+    """
+    chunking = get_chunking()
+    doc_id = content_doc_id(data)
+    entry = registry.get_doc(doc_id)
+    if entry is not None and os.path.exists(entry.get("pdf_path") or ""):
+        return entry, False
+
+    pdf_path = os.path.join(get_paths()["docs_dir"], f"{doc_id}__{doc_name}")
+    tmp = pdf_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, pdf_path)
+
+    registry.upsert_doc(
+        doc_id,
+        doc_name,
+        pdf_path,
+        status="ingesting",
+        ingest_key=f"{doc_id}:{int(time.time())}",
+        chunk_size=chunk_size or chunking["chunk_size"],
+        chunk_overlap=chunk_overlap or chunking["chunk_overlap"],
+        chunks_total=None,
+        chunks_committed=0,
+    )
+    return registry.get_doc(doc_id), True
+
+
+def mark_failed(doc_ids: List[str], error: str) -> None:
+    """Unfinished docs of a stopped run: hidden, resumable (POST /admin/resume or re-upload)."""
+    for doc_id in doc_ids:
+        entry = registry.get_doc(doc_id)
+        if entry is not None and not registry.is_ready(entry):
+            registry.update_doc(doc_id, status="failed", error=error, failed_at=int(time.time()))
+
+
+def mark_ready(doc_ids: List[str]) -> None:
+    build_partitions(get_collection(), doc_ids)
+    for doc_id in doc_ids:
+        entry = registry.get_doc(doc_id) or {}
+        registry.update_doc(doc_id, status="ready", chunks_committed=entry.get("chunks_total"))
+
+
+def ingest_document(entry: Dict[str, Any], batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Ingest one "ingesting" document, starting after its last committed batch.
+    Caller holds the write lock and bumps the index version.
+    """
+    doc_id, doc_name = entry["doc_id"], entry["doc_name"]
+
+    pages = pagecache.read_pages(doc_id)
+    if pages is None:
+        try:
+            pages = extract_pages(entry["pdf_path"])
+        except Exception as e:
+            # Nothing to resume from an unreadable file: forget it entirely
+            delete_document(doc_id)
+            raise UnreadableDocument(f"{doc_name}: {e}") from e
+        pagecache.write_pages(doc_id, pages)
+    if not has_figures(doc_id):
+        build_figures(doc_id, entry["pdf_path"])
+
+    # Same pages + same parameters + same prefix -> same chunk ids as the interrupted run
+    chunking = get_chunking()
+    chunks = chunk_pages(
+        pages,
+        chunk_size=entry.get("chunk_size") or chunking["chunk_size"],
+        chunk_overlap=entry.get("chunk_overlap") or chunking["chunk_overlap"],
+        id_prefix=entry.get("ingest_key") or doc_id,
+    )
+    registry.update_doc(doc_id, chunks_total=len(chunks))
+
+    start = int(entry.get("chunks_committed") or 0)
+    size = batch_size or ingest_batch_size()
+    col = get_collection()
+    batch = IndexBatch(col, batch_size=size)
+    added = linked = 0
+    registry.update_doc(doc_id, status="ingesting", error=None)
+    try:
+        for i in range(start, len(chunks), size):
+            part = chunks[i : i + size]
+            stats = batch.add_document(part, doc_id, doc_name)
+            batch.flush()
+            registry.update_doc(doc_id, chunks_committed=i + len(part))
+            added += stats["chunks_added"]
+            linked += stats["duplicates_linked"]
+        build_partitions(col, [doc_id])
+    except Exception as e:
+        # stays hidden, resumable from the last committed batch
+        mark_failed([doc_id], str(e))
+        raise
+
+    registry.update_doc(doc_id, status="ready", chunks_committed=len(chunks), error=None)
+    done = len(chunks) - start
+    return {
+        "doc_id": doc_id,
+        "doc_name": doc_name,
+        "pages": len(pages),
+        "chunks_added": added,
+        "duplicates_linked": linked,
+        "dedup_ratio": round(linked / done, 4) if done else 0.0,
+        "resumed_from": start,
+    }
+
+
+def resume_pending(batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """Finish every document left "ingesting" or "failed" by an earlier run. Caller holds the write lock."""
+    results = []
+    for entry in registry.list_docs():
+        if registry.is_ready(entry):
+            continue
+        try:
+            res = ingest_document(entry, batch_size=batch_size)
+            results.append({"status": "ok", **res})
+            print(f"Resumed {entry['doc_name']} from chunk {res['resumed_from']}: {res}")
+        except Exception as e:
+            # UnreadableDocument is already dropped; anything else is "failed" until the next attempt
+            results.append({"doc_id": entry["doc_id"], "status": "error", "error": str(e)})
+            print(f"Resume of {entry['doc_name']} failed: {e}")
+    if results:
+        bump_index_version()
+    return {"resumed": len([r for r in results if r["status"] == "ok"]), "documents": results}
+
+
+def pending_documents() -> List[Dict[str, Any]]:
+    """Documents not ready yet, with how far they got and why the last attempt stopped."""
+    return [
+        {k: e.get(k) for k in ("doc_id", "doc_name", "status", "chunks_committed", "chunks_total", "error")}
+        for e in registry.list_docs()
+        if not registry.is_ready(e)
+    ]
+
+
+def start_resume() -> bool:
+    """Retry unfinished ingests in the background (uploads get 409 meanwhile). False if nothing to do or already running."""
+    if not registry.hidden_doc_ids() or not start_job("resume"):
+        return False
+    threading.Thread(target=run_job, args=("resume", resume_pending), daemon=True, name="ingest-resume").start()
+    return True
+
+
+def resume_on_startup() -> None:
+    """Writer startup: finish interrupted ingests."""
+    start_resume()
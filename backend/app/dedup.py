@@ -0,0 +1,348 @@
+# backend/app/dedup.py
+"""
+Near-duplicate chunk detection (MinHash + LSH banding).
+
+Each stored chunk keeps a MinHash signature. A new chunk whose estimated
+Jaccard similarity to an existing one is >= DEDUP_THRESHOLD is not embedded;
+instead its (doc_id, doc_name, page) is recorded as an alias of the canonical
+chunk so citations still resolve to every page that contains the text.
+
+Alias membership lives only in this index (never in chunk metadata): doc-scoped
+retrieval asks linked_chunks(doc_id) for the canonicals another doc owns.
+"""
+import os
+import re
+import zlib
+import random
+import threading
+from collections import defaultdict
+from typing import Collection, List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from .store import get_index_dir, get_index_version, is_query_role
+from .journal import Journal
+
+
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS  # 8 rows/band -> ~0.77 Jaccard detection knee
+SHINGLE_WORDS = 5
+
+_PRIME = (1 << 31) - 1
+_rng = random.Random(1337)  # fixed seed: signatures must be stable across restarts
+_A = np.array([_rng.randrange(1, _PRIME) for _ in range(NUM_PERM)], dtype=np.uint64)
+_B = np.array([_rng.randrange(0, _PRIME) for _ in range(NUM_PERM)], dtype=np.uint64)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+INDEX_FILENAME = "dedup.json"
+
+
+def dedup_enabled() -> bool:
+    return os.getenv("DEDUP_ENABLED", "1").strip().lower() not in ("0", "false", "no", "")
+
+
+def dedup_threshold() -> float:
+    return float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+
+
+# Older builds flagged canonical chunks with in_<doc_id> metadata; compaction strips them
+LEGACY_ALIAS_PREFIX = "in_"
+
+
+def strip_alias_flags(meta: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {k: v for k, v in (meta or {}).items() if not k.startswith(LEGACY_ALIAS_PREFIX)}
+
+
+def _shingles(text: str) -> np.ndarray:
+    words = _WORD.findall((text or "").lower())
+    if len(words) < SHINGLE_WORDS:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    hashes = {zlib.crc32(g.encode("utf-8")) % _PRIME for g in grams}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+def minhash(text: str) -> List[int]:
+    sh = _shingles(text)
+    if sh.size == 0:
+        return [_PRIME] * NUM_PERM
+    # (a*x + b) mod p for every (perm, shingle); a, x < 2^31 so this fits in uint64
+    vals = (np.outer(_A, sh) + _B[:, None]) % _PRIME
+    return vals.min(axis=1).astype(np.int64).tolist()
+
+
+def _bands(sig: List[int]) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [(b, tuple(sig[b * ROWS : (b + 1) * ROWS])) for b in range(BANDS)]
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+def _best_match(sig, exclude, buckets, signatures) -> Tuple[Optional[str], float]:
+    threshold = dedup_threshold()
+    best_id, best_sim = None, 0.0
+    candidates = set()
+    for key in _bands(sig):
+        candidates.update(buckets.get(key, ()))
+    for cid in candidates:
+        if cid == exclude:
+            continue
+        sim = similarity(sig, signatures[cid])
+        if sim >= threshold and sim > best_sim:
+            best_id, best_sim = cid, sim
+    return best_id, best_sim
+
+
+class DedupIndex:
+    """
+    Signatures + LSH buckets + alias table for one collection.
+    Persisted in the collection's index dir as a snapshot plus an append-only
+    log (app.journal); buckets and the doc -> linked canonicals map are
+    rebuilt on load.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.journal = Journal(path)
+        self.lock = threading.RLock()
+        self.signatures: Dict[str, List[int]] = {}
+        self.aliases: Dict[str, List[Dict[str, Any]]] = {}
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = defaultdict(list)
+        self.linked: Dict[str, Dict[str, None]] = {}  # doc_id -> canonical ids (ordered set)
+        self.unsaved: List[Dict[str, Any]] = []  # ops since the last save()
+        self.rewrite = False  # a removal happened: save() writes a full snapshot
+        self.version = None
+        self.load()
+
+    def load(self) -> None:
+        self.version = get_index_version()
+        with self.lock:
+            data, ops = self.journal.read()
+            self.signatures = data.get("signatures") or {}
+            self.aliases = data.get("aliases") or {}
+            for op in ops:
+                if op["op"] == "add":
+                    self.signatures.setdefault(op["id"], op["sig"])
+                elif op["op"] == "link":
+                    entries = self.aliases.setdefault(op["id"], [])
+                    if op["alias"] not in entries:
+                        entries.append(op["alias"])
+            self.buckets = defaultdict(list)
+            for cid, sig in self.signatures.items():
+                for key in _bands(sig):
+                    self.buckets[key].append(cid)
+            self._relink()
+            self.unsaved, self.rewrite = [], False
+
+    def _relink(self) -> None:
+        self.linked = {}
+        for cid, entries in self.aliases.items():
+            for a in entries:
+                self.linked.setdefault(a.get("doc_id"), {})[cid] = None
+
+    def save(self) -> None:
+        with self.lock:
+            if self.rewrite or self.journal.should_compact(len(self.signatures)):
+                self.journal.rewrite({"signatures": self.signatures, "aliases": self.aliases})
+            else:
+                self.journal.append(self.unsaved)
+            self.unsaved, self.rewrite = [], False
+
+    def find(self, sig: List[int], exclude: Optional[str] = None) -> Optional[str]:
+        """Best canonical chunk with estimated Jaccard >= threshold, if any."""
+        return self.best_match(sig, exclude)[0]
+
+    def best_match(self, sig: List[int], exclude: Optional[str] = None) -> Tuple[Optional[str], float]:
+        with self.lock:
+            return _best_match(sig, exclude, self.buckets, self.signatures)
+
+    def add(self, chunk_id: str, sig: List[int]) -> None:
+        with self.lock:
+            if chunk_id in self.signatures:
+                return
+            self.signatures[chunk_id] = sig
+            for key in _bands(sig):
+                self.buckets[key].append(chunk_id)
+            self.unsaved.append({"op": "add", "id": chunk_id, "sig": sig})
+
+    def link(self, canonical_id: str, alias: Dict[str, Any]) -> None:
+        with self.lock:
+            entries = self.aliases.setdefault(canonical_id, [])
+            if alias not in entries:
+                entries.append(alias)
+                self.linked.setdefault(alias.get("doc_id"), {})[canonical_id] = None
+                self.unsaved.append({"op": "link", "id": canonical_id, "alias": alias})
+
+    def aliases_for(self, chunk_id: str) -> List[Dict[str, Any]]:
+        with self.lock:
+            return list(self.aliases.get(chunk_id, ()))
+
+    def linked_chunks(self, doc_id: str) -> List[str]:
+        """Canonical chunks (possibly owned by other docs) whose text also appears in doc_id."""
+        with self.lock:
+            return list(self.linked.get(doc_id, ()))
+
+    def remove_doc(self, doc_id: str, chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Forget doc_id: drop its aliases everywhere and its canonical chunks.
+        A canonical that other docs still link to is kept and promoted to its
+        first remaining alias; returns {chunk_id: new metadata} for those.
+        """
+        promoted: Dict[str, Dict[str, Any]] = {}
+        with self.lock:
+            for cid in list(self.aliases.keys()):
+                kept = [a for a in self.aliases[cid] if a.get("doc_id") != doc_id]
+                if kept:
+                    self.aliases[cid] = kept
+                else:
+                    del self.aliases[cid]
+
+            for cid in chunk_ids:
+                remaining = self.aliases.pop(cid, [])
+                if remaining:
+                    owner, rest = remaining[0], remaining[1:]
+                    if rest:
+                        self.aliases[cid] = rest
+                    promoted[cid] = {"doc_id": owner["doc_id"], "doc_name": owner["doc_name"], "page": owner["page"]}
+                    continue
+
+                sig = self.signatures.pop(cid, None)
+                if sig is None:
+                    continue
+                for key in _bands(sig):
+                    bucket = self.buckets.get(key)
+                    if bucket and cid in bucket:
+                        bucket.remove(cid)
+                        if not bucket:
+                            del self.buckets[key]
+            self._relink()
+            self.rewrite = True
+        return promoted
+
+
+class DedupStage:
+    """
+    Adds and links of one ingest batch, kept out of the shared DedupIndex
+    until the batch's chunks are stored. find() sees both, so duplicates
+    within the batch are still caught; a batch that fails to embed or upsert
+    is simply dropped and leaves no phantom canonicals behind.
+    """
+
+    def __init__(self, index: DedupIndex):
+        self.index = index
+        self.clear()
+
+    def clear(self) -> None:
+        self.signatures: Dict[str, List[int]] = {}
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = defaultdict(list)
+        self.links: List[Tuple[str, Dict[str, Any]]] = []
+
+    def find(self, sig: List[int], exclude: Optional[str] = None) -> Optional[str]:
+        committed = self.index.best_match(sig, exclude)
+        staged = _best_match(sig, exclude, self.buckets, self.signatures)
+        return (staged if staged[1] > committed[1] else committed)[0]
+
+    def add(self, chunk_id: str, sig: List[int]) -> None:
+        if chunk_id in self.signatures:
+            return
+        self.signatures[chunk_id] = sig
+        for key in _bands(sig):
+            self.buckets[key].append(chunk_id)
+
+    def link(self, canonical_id: str, alias: Dict[str, Any]) -> None:
+        self.links.append((canonical_id, alias))
+
+    def commit(self) -> None:
+        """Apply to the shared index; call once the batch is in the collection."""
+        with self.index.lock:
+            for cid, sig in self.signatures.items():
+                self.index.add(cid, sig)
+            for canonical, alias in self.links:
+                self.index.link(canonical, alias)
+        self.clear()
+
+
+_INDEXES: Dict[str, DedupIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_dedup_index(collection_name: str) -> DedupIndex:
+    with _INDEXES_LOCK:
+        idx = _INDEXES.get(collection_name)
+        if idx is None:
+            idx = DedupIndex(os.path.join(get_index_dir(collection_name), INDEX_FILENAME))
+            _INDEXES[collection_name] = idx
+        elif is_query_role() and idx.version != get_index_version():
+            # the writer process committed since we loaded
+            idx.load()
+        return idx
+
+
+def link_near_duplicates(
+    chunks: List[Dict[str, Any]],
+    index: DedupStage,
+) -> Tuple[List[Dict[str, Any]], List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Split chunks (metadata already has doc_id/doc_name/page) into ones to embed
+    and (canonical_id, alias) links. Chunks are staged as they go, so
+    duplicates inside the same upload are caught too; index.commit() publishes
+    them once stored.
+    """
+    if not dedup_enabled():
+        return chunks, []
+
+    unique: List[Dict[str, Any]] = []
+    links: List[Tuple[str, Dict[str, Any]]] = []
+    for c in chunks:
+        sig = c.get("minhash") or minhash(c["text"])
+        canonical = index.find(sig, exclude=c["id"])
+        if canonical is None:
+            index.add(c["id"], sig)
+            unique.append(c)
+            continue
+
+        meta = c["metadata"]
+        alias = {"doc_id": meta.get("doc_id"), "doc_name": meta.get("doc_name"), "page": meta.get("page")}
+        index.link(canonical, alias)
+        links.append((canonical, alias))
+
+    return unique, links
+
+
+def resolve_aliases(
+    source: Dict[str, Any],
+    index: DedupIndex,
+    doc_id: Optional[str] = None,
+    hidden: Collection[str] = (),
+) -> Dict[str, Any]:
+    """
+    Attach `also_in` (other pages holding the same text). For doc-scoped
+    queries where the canonical lives in another doc, cite the page in doc_id.
+    Hidden docs (not ready) are never cited: a canonical they own is cited
+    at its first visible alias instead.
+    """
+    cid = source.get("id")
+    aliases = index.aliases_for(cid) if cid else []
+    if not aliases:
+        return source
+
+    meta = dict(source.get("metadata") or {})
+    locations = [{"doc_id": meta.get("doc_id"), "doc_name": meta.get("doc_name"), "page": meta.get("page")}] + aliases
+    locations = [loc for loc in locations if loc.get("doc_id") not in hidden]
+    if not doc_id and meta.get("doc_id") in hidden and locations:
+        doc_id = locations[0]["doc_id"]
+
+    if doc_id and meta.get("doc_id") != doc_id:
+        for a in aliases:
+            if a.get("doc_id") == doc_id:
+                meta.update(a)
+                break
+
+    shown = (meta.get("doc_id"), meta.get("page"))
+    source["metadata"] = meta
+    source["also_in"] = [loc for loc in locations if (loc.get("doc_id"), loc.get("page")) != shown]
+    return source
@@ -0,0 +1,250 @@
+# backend/app/failover.py
+"""
+Latency-aware failover across an ordered list of LLM providers.
+
+- per-provider timeouts (LLM_TIMEOUT_<NAME>)
+- hedging: if the current provider hasn't answered by its observed
+  LLM_HEDGE_PERCENTILE latency, the next provider is started in parallel
+  and the first success wins
+- circuit breakers: LLM_BREAKER_FAILURES consecutive failures eject a
+  provider for LLM_BREAKER_COOLDOWN seconds, then one trial call is let through
+- per-provider latency / error stats (GET /llm/stats)
+"""
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+
+DEFAULT_TIMEOUTS = {"OPENAI": 60.0, "OLLAMA": 180.0, "MOCK": 5.0}
+
+_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_POOL_SIZE", "16")), thread_name_prefix="llm")
+
+
+def provider_timeout(name: str) -> float:
+    return float(os.getenv(f"LLM_TIMEOUT_{name}", str(DEFAULT_TIMEOUTS.get(name, 60.0))))
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    vals = sorted(values)
+    idx = min(len(vals) - 1, max(0, int(round(pct / 100.0 * (len(vals) - 1)))))
+    return vals[idx]
+
+
+class ProviderStats:
+    def __init__(self, window: int = 200):
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=window)  # successful calls only, seconds
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.hedges_started = 0
+        self.wins = 0
+        self.last_error: Optional[str] = None
+
+    def record(self, ok: bool, seconds: float, error: Optional[str] = None, timed_out: bool = False) -> None:
+        with self.lock:
+            self.calls += 1
+            if ok:
+                self.latencies.append(seconds)
+            else:
+                self.errors += 1
+                self.timeouts += int(timed_out)
+                self.last_error = error
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self.lock:
+            return _percentile(list(self.latencies), pct)
+
+    def samples(self) -> int:
+        with self.lock:
+            return len(self.latencies)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            lat = list(self.latencies)
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "error_rate": round(self.errors / self.calls, 4) if self.calls else 0.0,
+                "hedges_started": self.hedges_started,
+                "wins": self.wins,
+                "p50_ms": round(_percentile(lat, 50) * 1000, 1) if lat else None,
+                "p95_ms": round(_percentile(lat, 95) * 1000, 1) if lat else None,
+                "p99_ms": round(_percentile(lat, 99) * 1000, 1) if lat else None,
+                "last_error": self.last_error,
+            }
+
+
+class CircuitBreaker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    def _threshold(self) -> int:
+        return int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+
+    def _cooldown(self) -> float:
+        return float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self._cooldown():
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Closed: always. Open: never. Half-open: one trial call at a time."""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self._cooldown():
+                return False
+            if self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self._threshold():
+                self.opened_at = time.monotonic()
+
+
+_STATS: Dict[str, ProviderStats] = {}
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_REG_LOCK = threading.Lock()
+
+
+def _get(name: str) -> Tuple[ProviderStats, CircuitBreaker]:
+    with _REG_LOCK:
+        if name not in _STATS:
+            _STATS[name] = ProviderStats()
+            _BREAKERS[name] = CircuitBreaker()
+        return _STATS[name], _BREAKERS[name]
+
+
+def provider_stats() -> Dict[str, Any]:
+    with _REG_LOCK:
+        names = list(_STATS.keys())
+    out = {}
+    for name in names:
+        stats, breaker = _get(name)
+        out[name] = {**stats.snapshot(), "breaker": breaker.state(), "timeout_s": provider_timeout(name)}
+    return out
+
+
+def _hedge_delay(name: str) -> Optional[float]:
+    """Seconds to wait on `name` before starting the next provider (None = don't hedge)."""
+    pct = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    if pct <= 0:
+        return None
+    stats, _ = _get(name)
+    if stats.samples() < int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")):
+        return None
+    return max(float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5")), stats.percentile(pct) or 0.0)
+
+
+def _run(name: str, fn: Callable[[float], str], timeout: float) -> str:
+    stats, breaker = _get(name)
+    t0 = time.perf_counter()
+    try:
+        out = fn(timeout)
+    except Exception as e:
+        elapsed = time.perf_counter() - t0
+        stats.record(False, elapsed, error=str(e)[:300], timed_out=elapsed >= timeout)
+        breaker.failure()
+        raise
+    stats.record(True, time.perf_counter() - t0)
+    breaker.success()
+    return out
+
+
+def call_with_failover(providers: List[Tuple[str, Callable[[float], str]]]) -> str:
+    """
+    providers: ordered [(NAME, fn(timeout_seconds) -> text)].
+    Returns the first successful result; raises RuntimeError if all fail.
+    """
+    queue = list(providers)
+    errors: List[str] = []
+    pending: Dict[Any, Tuple[str, float]] = {}  # future -> (name, deadline)
+
+    def launch(hedge: bool = False, force: bool = False) -> Optional[str]:
+        """Start the next provider whose breaker allows a call; returns its name."""
+        while queue:
+            name, fn = queue.pop(0)
+            stats, breaker = _get(name)
+            if not force and not breaker.allow():
+                errors.append(f"{name}: circuit open")
+                continue
+            if hedge:
+                with stats.lock:
+                    stats.hedges_started += 1
+            timeout = provider_timeout(name)
+            pending[_POOL.submit(_run, name, fn, timeout)] = (name, time.monotonic() + timeout)
+            return name
+        return None
+
+    def next_hedge(name: Optional[str]) -> Optional[float]:
+        delay = _hedge_delay(name) if name and queue else None
+        return time.monotonic() + delay if delay is not None else None
+
+    name = launch()
+    if name is None:
+        # Every breaker is open: trying is better than failing outright
+        queue = list(providers)
+        name = launch(force=True)
+    hedge_at = next_hedge(name)
+
+    while pending:
+        now = time.monotonic()
+        wake = min(d for _, d in pending.values())
+        if hedge_at is not None:
+            wake = min(wake, hedge_at)
+        done, _ = wait(list(pending.keys()), timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+
+        for fut in done:
+            name, _ = pending.pop(fut)
+            try:
+                result = fut.result()
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+                continue
+            stats, _ = _get(name)
+            with stats.lock:
+                stats.wins += 1
+            return result
+
+        now = time.monotonic()
+        # Calls past their own timeout count as failed; the thread finishes in the background
+        for fut, (name, deadline) in list(pending.items()):
+            if now >= deadline:
+                pending.pop(fut)
+                errors.append(f"{name}: timed out after {provider_timeout(name):.0f}s")
+
+        if not pending:
+            # failover: nothing in flight, move to the next provider
+            hedge_at = next_hedge(launch())
+        elif hedge_at is not None and now >= hedge_at:
+            # hedge: current provider is slower than its usual tail, race the next one
+            launch(hedge=True)
+            hedge_at = None
+
+    raise RuntimeError("All LLM providers failed. " + " | ".join(errors))
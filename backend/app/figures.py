@@ -0,0 +1,334 @@
+# backend/app/figures.py
+"""
+Structured side-store for tables and chart figures.
+
+chunk_pages drops chart/table dumps (looks_like_chart_or_table) because they
+embed badly, which also threw away the exact numbers analysts ask about. Those
+pages are parsed once more for structure:
+
+    tables   PyMuPDF page.find_tables(): one row per numeric cell, labelled
+             with its row header (first text cell) and column header
+    figures  text blocks that look like chart/table dumps: one row per number
+             on a "label ... value" line (a bare number line inherits the
+             label above it)
+
+One columnar file per doc (data/figures/<doc_id>.figs.json). Only the writer
+builds them: at ingest (checkpoint.ingest_document, and the bulk / re-index
+pool for documents without one) and in the backfill job for documents
+ingested before this store existed (POST /admin/figures, or
+`python -m app.figures`). The outcome is recorded on the registry entry
+(figures "ready" with figures_rows, or "failed" with figures_error; the
+backfill retries failed ones). Lookups only read: a missing file means the
+doc has no figures yet.
+
+    {"doc_id": ..., "pages_with_tables": [...],
+     "columns": {"page": [...], "source": [...], "label": [...],
+                 "column": [...], "value": [...], "number": [...]}}
+
+Lookup (by metric keyword, year or page) runs on a small in-memory inverted
+index built when a file is first read, so answer_question can attach exact,
+page-cited figures without another vector query.
+"""
+import os
+import re
+import json
+import argparse
+import threading
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from .store import DATA_DIR, WRITE_LOCK, claim_writer
+from .filters import looks_like_chart_or_table
+from .lexical import tokenize
+from . import registry
+
+
+FIGURES_DIR = os.path.join(DATA_DIR, "figures")
+COLUMNS = ("page", "source", "label", "column", "value", "number")
+
+_NUMBER = re.compile(r"(?<![\w.])[-+−]?[$€£]?\d[\d,]*(?:\.\d+)?\s?(?:%|bps|bp|bn|tn|mn|x)?(?![\w.])", re.IGNORECASE)
+_YEAR = re.compile(r"\b(?:19|20)\d{2}[ef]?\b", re.IGNORECASE)
+_LETTERS = re.compile(r"[A-Za-z]{2,}")
+_CACHE: Dict[str, Tuple[float, "FigureTable"]] = {}  # doc_id -> (mtime, table)
+_CACHE_LOCK = threading.Lock()
+
+os.makedirs(FIGURES_DIR, exist_ok=True)
+
+
+def figures_path(doc_id: str) -> str:
+    return os.path.join(FIGURES_DIR, f"{doc_id}.figs.json")
+
+
+def has_figures(doc_id: str) -> bool:
+    return os.path.exists(figures_path(doc_id))
+
+
+def years_in(text: str) -> List[str]:
+    return [y[:4] for y in _YEAR.findall(text or "")]
+
+
+def _parse_number(value: str) -> Optional[float]:
+    s = re.sub(r"[^\d.\-]", "", (value or "").replace("−", "-"))
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+def _clean(cell: Any) -> str:
+    return re.sub(r"\s+", " ", str(cell or "")).strip()
+
+
+def _numbers(text: str) -> List[str]:
+    """Numeric values on a line, ignoring bare years (those are labels/columns)."""
+    return [m.group(0).strip() for m in _NUMBER.finditer(text) if not _YEAR.fullmatch(m.group(0).strip())]
+
+
+def _row(page: int, source: str, label: str, column: str, value: str) -> Dict[str, Any]:
+    return {
+        "page": page,
+        "source": source,
+        "label": label[:160],
+        "column": column[:60],
+        "value": value,
+        "number": _parse_number(value),
+    }
+
+
+def _table_rows(page_num: int, table) -> List[Dict[str, Any]]:
+    data = [[_clean(c) for c in row] for row in (table.extract() or [])]
+    if not data:
+        return []
+
+    header = [_clean(n) for n in (getattr(table.header, "names", None) or [])]
+    if header == data[0]:
+        data = data[1:]
+
+    rows = []
+    for cells in data:
+        # Row label: first cell with words in it (tables often lead with the metric name)
+        label = next((c for c in cells if _LETTERS.search(c) and not _numbers(c)), "")
+        for j, cell in enumerate(cells):
+            if not cell or cell == label:
+                continue
+            nums = _numbers(cell)
+            if len(nums) != 1:
+                continue
+            column = header[j] if j < len(header) else ""
+            rows.append(_row(page_num, "table", label, column, nums[0]))
+    return rows
+
+
+def _text_rows(page_num: int, text: str) -> List[Dict[str, Any]]:
+    rows = []
+    title = last_label = ""
+    for line in (ln.strip() for ln in text.splitlines()):
+        if not line:
+            continue
+        nums = _numbers(line)
+        label = _clean(_NUMBER.sub(" ", line))
+        if not _LETTERS.search(label):
+            label = ""
+        if not nums:
+            if label:
+                # First words-only line of a chart block is usually its title
+                title = title or label
+                last_label = label
+            continue
+        label = label or last_label
+        if not label:
+            continue
+        if title and label != title:
+            label = f"{title}: {label}"
+        column = ", ".join(dict.fromkeys(years_in(line)))
+        for n in nums:
+            rows.append(_row(page_num, "figure", label, column, n))
+    return rows
+
+
+def extract_figures(pdf_path: str) -> List[Dict[str, Any]]:
+    """Table cells and chart figures of one PDF as row dicts (see COLUMNS)."""
+    rows: List[Dict[str, Any]] = []
+    doc = fitz.open(pdf_path)
+    try:
+        for i in range(len(doc)):
+            page = doc.load_page(i)
+            table_boxes = []
+            finder = getattr(page, "find_tables", None)  # PyMuPDF >= 1.23
+            if finder is not None:
+                try:
+                    for tab in finder().tables:
+                        rows.extend(_table_rows(i + 1, tab))
+                        table_boxes.append(fitz.Rect(tab.bbox))
+                except Exception as e:
+                    print(f"[figures] table detection failed on p.{i + 1} of {pdf_path}: {e}")
+
+            for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks"):
+                if block_type != 0 or not looks_like_chart_or_table(text):
+                    continue
+                box = fitz.Rect(x0, y0, x1, y1)
+                if any(box.intersects(t) for t in table_boxes):
+                    continue
+                rows.extend(_text_rows(i + 1, text))
+    finally:
+        doc.close()
+    return rows
+
+
+def write_figures(doc_id: str, rows: List[Dict[str, Any]]) -> str:
+    """Persist extract_figures() output as columns; written to a temp file then renamed."""
+    columns = {c: [r[c] for r in rows] for c in COLUMNS}
+    payload = {
+        "doc_id": doc_id,
+        "pages_with_tables": sorted({r["page"] for r in rows if r["source"] == "table"}),
+        "columns": columns,
+    }
+    path = figures_path(doc_id)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    with _CACHE_LOCK:
+        _CACHE.pop(doc_id, None)
+    return path
+
+
+def save_figures(doc_id: str, rows: Optional[List[Dict[str, Any]]], error: Optional[str] = None) -> None:
+    """
+    Writer: persist extracted rows, or record why extraction failed (rows None),
+    on the doc's registry entry. Caller holds the write lock.
+    """
+    if rows is None:
+        print(f"[figures] {doc_id}: extraction failed ({error})")
+        registry.update_doc(doc_id, figures="failed", figures_error=(error or "")[:300])
+        return
+    write_figures(doc_id, rows)
+    registry.update_doc(doc_id, figures="ready", figures_rows=len(rows), figures_error=None)
+
+
+def build_figures(doc_id: str, pdf_path: str) -> bool:
+    """Writer: extract and save one doc's figures. Best effort, never raises; True if built."""
+    try:
+        rows = extract_figures(pdf_path)
+    except Exception as e:
+        save_figures(doc_id, None, str(e))
+        return False
+    save_figures(doc_id, rows)
+    return True
+
+
+def backfill_figures() -> Dict[str, Any]:
+    """Build figures for every ready doc that has none (older uploads, failed extractions). Caller holds the write lock."""
+    todo = [d for d in registry.list_docs() if registry.is_ready(d) and not has_figures(d["doc_id"])]
+    built = sum(build_figures(d["doc_id"], d.get("pdf_path") or "") for d in todo)
+    return {"documents": len(todo), "built": built, "failed": len(todo) - built}
+
+
+def delete_figures(doc_id: str) -> bool:
+    with _CACHE_LOCK:
+        _CACHE.pop(doc_id, None)
+    path = figures_path(doc_id)
+    if os.path.exists(path):
+        os.remove(path)
+        return True
+    return False
+
+
+class FigureTable:
+    """One document's columns plus term / year / page -> row postings."""
+
+    def __init__(self, doc_id: str, columns: Dict[str, List[Any]]):
+        self.doc_id = doc_id
+        self.columns = columns
+        self.n = len(columns.get("page") or [])
+        self.terms: Dict[str, List[int]] = {}
+        self.years: Dict[str, List[int]] = {}
+        self.pages: Dict[int, List[int]] = {}
+        for i in range(self.n):
+            label, column = columns["label"][i], columns["column"][i]
+            for t in set(tokenize(f"{label} {column}")):
+                self.terms.setdefault(t, []).append(i)
+            for y in set(years_in(f"{label} {column}")):
+                self.years.setdefault(y, []).append(i)
+            self.pages.setdefault(columns["page"][i], []).append(i)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return {c: self.columns[c][i] for c in COLUMNS}
+
+
+def get_figure_table(doc_id: str) -> Optional[FigureTable]:
+    """The doc's figures, or None if it has no file (not built yet, or extraction failed)."""
+    path = figures_path(doc_id)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _CACHE_LOCK:
+        hit = _CACHE.get(doc_id)
+        if hit and hit[0] == mtime:
+            return hit[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        table = FigureTable(doc_id, json.load(f).get("columns") or {})
+    with _CACHE_LOCK:
+        _CACHE[doc_id] = (mtime, table)
+    return table
+
+
+def lookup(
+    doc_ids: Iterable[str],
+    keywords: Optional[List[str]] = None,
+    years: Optional[List[str]] = None,
+    pages: Optional[List[int]] = None,
+    limit: int = 12,
+) -> List[Dict[str, Any]]:
+    """
+    Figures matching the filters, best keyword overlap first. Years and pages
+    narrow the match; keywords rank it (a row needs at least one keyword hit
+    when keywords are given). With no filter at all every row of the docs is
+    returned in page order, up to `limit`. Rows carry doc_id, and `hits` (the
+    number of keywords they matched) so callers can judge how strong a match is.
+    """
+    terms = list(dict.fromkeys(keywords or []))
+    scored: List[Tuple[int, int, str, Dict[str, Any]]] = []
+    for doc_id in doc_ids:
+        table = get_figure_table(doc_id)
+        if table is None or not table.n:
+            continue
+
+        allowed: Optional[set] = None
+        if years:
+            allowed = {i for y in years for i in table.years.get(y, [])}
+        if pages:
+            on_pages = {i for p in pages for i in table.pages.get(p, [])}
+            allowed = on_pages if allowed is None else allowed & on_pages
+
+        if terms:
+            hits: Dict[int, int] = {}
+            for t in terms:
+                for i in table.terms.get(t, []):
+                    if allowed is None or i in allowed:
+                        hits[i] = hits.get(i, 0) + 1
+        elif allowed is not None:
+            hits = {i: 0 for i in allowed}
+        else:
+            hits = {i: 0 for i in range(table.n)}
+
+        for i, score in hits.items():
+            scored.append((score, table.columns["page"][i], doc_id, {"doc_id": doc_id, **table.row(i), "hits": score}))
+
+    scored.sort(key=lambda s: (-s[0], s[2], s[1]))
+    return [s[3] for s in scored[:limit]]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build missing table/figure files (documents ingested before app.figures)")
+    ap.parse_args()
+    claim_writer()
+    with WRITE_LOCK:
+        print(backfill_figures())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# backend/app/history.py
+"""
+Bounded conversation history for multi-turn chat.
+
+Recent turns are kept verbatim; older turns are compacted into a short
+running summary (question + first cited sentences of each answer) that is
+cached per conversation so each request only compacts the newly-aged turns.
+
+A cache entry is (turns compacted, hash of the last of them, lines). A client
+resends the whole history with every request, so the entry is reused when
+the history still holds that turn at that position; checking one turn keeps a
+request O(new turns) rather than re-hashing the whole conversation. A client
+that rewrites earlier turns should send a new conversation_id.
+"""
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+
+_WS = re.compile(r"\s+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_HEADERS = ("ANSWER:", "KEY THEMES:", "WHAT TO FOCUS ON IN 2026:", "GAPS:")
+
+# conversation_id -> {"n": turns compacted, "last": hash of turn n-1, "lines": [...]}
+_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def _budget() -> int:
+    return int(os.getenv("HISTORY_TOKEN_BUDGET", "1200"))
+
+
+def _recent_turns() -> int:
+    return int(os.getenv("HISTORY_RECENT_TURNS", "4"))
+
+
+def _cache_size() -> int:
+    return int(os.getenv("HISTORY_CACHE_SIZE", "512"))
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 chars per token is close enough for budgeting English prose."""
+    return (len(text or "") + 3) // 4
+
+
+def _normalize(history: Optional[List[Dict[str, Any]]]) -> List[Dict[str, str]]:
+    out = []
+    for m in history or []:
+        role = m.get("role")
+        content = (m.get("content") or "").strip()
+        if role in ("user", "assistant") and content:
+            out.append({"role": role, "content": content})
+    return out
+
+
+def _turn_hash(turn: Dict[str, str]) -> str:
+    h = hashlib.sha1(turn["role"].encode("utf-8"))
+    h.update(b"\0")
+    h.update(turn["content"].encode("utf-8"))
+    return h.hexdigest()
+
+
+def _clip(text: str, max_chars: int) -> str:
+    t = _WS.sub(" ", text or "").strip()
+    return (t[:max_chars] + "…") if len(t) > max_chars else t
+
+
+def _answer_section(text: str) -> str:
+    """Body of the ANSWER section of a four-section reply (or the whole reply)."""
+    lines = []
+    in_answer = False
+    for line in (text or "").splitlines():
+        stripped = line.strip()
+        if stripped in _HEADERS:
+            if in_answer:
+                break
+            in_answer = stripped == "ANSWER:"
+            continue
+        if in_answer:
+            lines.append(stripped)
+    body = " ".join(ln for ln in lines if ln)
+    return body or text
+
+
+def compact_turn(turn: Dict[str, str]) -> str:
+    """One summary line per turn: the question, or the first two sentences of the answer."""
+    if turn["role"] == "user":
+        return f"User asked: {_clip(turn['content'], 200)}"
+
+    sentences = _SENTENCE.split(_WS.sub(" ", _answer_section(turn["content"])).strip())
+    return f"Assistant answered: {_clip(' '.join(sentences[:2]), 320)}"
+
+
+def _summary_lines(older: List[Dict[str, str]], conversation_id: Optional[str]) -> List[str]:
+    if not conversation_id:
+        return [compact_turn(m) for m in older]
+
+    with _LOCK:
+        entry = _CACHE.get(conversation_id)
+        if entry is not None:
+            _CACHE.move_to_end(conversation_id)
+
+    n = 0
+    lines: List[str] = []
+    if entry and 0 < entry["n"] <= len(older) and entry["last"] == _turn_hash(older[entry["n"] - 1]):
+        n = entry["n"]
+        lines = list(entry["lines"])
+
+    lines.extend(compact_turn(m) for m in older[n:])
+
+    with _LOCK:
+        _CACHE[conversation_id] = {"n": len(older), "last": _turn_hash(older[-1]), "lines": lines}
+        _CACHE.move_to_end(conversation_id)
+        while len(_CACHE) > _cache_size():
+            _CACHE.popitem(last=False)
+
+    return lines
+
+
+def build_history(
+    history: Optional[List[Dict[str, Any]]],
+    conversation_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Return {"summary": str, "recent": [messages]} that fits HISTORY_TOKEN_BUDGET.
+    Recent turns stay verbatim (up to 3/4 of the budget); everything older is
+    folded into the summary, oldest lines dropped first when over budget.
+    """
+    turns = _normalize(history)
+    budget = _budget()
+
+    keep = max(0, _recent_turns())
+    recent = turns[-keep:] if keep else []
+    older = turns[: len(turns) - len(recent)]
+
+    recent_cap = (budget * 3) // 4
+    while recent and sum(estimate_tokens(m["content"]) for m in recent) > recent_cap:
+        older.append(recent.pop(0))
+
+    lines = _summary_lines(older, conversation_id) if older else []
+
+    remaining = budget - sum(estimate_tokens(m["content"]) for m in recent)
+    while lines and estimate_tokens("\n".join(lines)) > remaining:
+        lines.pop(0)
+
+    return {"summary": "\n".join(lines), "recent": recent}
+
+
+def render_history_text(hist: Dict[str, Any]) -> str:
+    """Plain-text block for prompt-only providers (Ollama)."""
+    parts = []
+    if hist.get("summary"):
+        parts.append("EARLIER CONVERSATION (summary):\n" + hist["summary"])
+    if hist.get("recent"):
+        parts.append(
+            "RECENT CONVERSATION:\n"
+            + "\n\n".join(f"{m['role'].upper()}: {m['content']}" for m in hist["recent"])
+        )
+    return "\n\n".join(parts)
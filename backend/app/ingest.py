@@ -1,12 +1,16 @@
+import os
 import re
 import uuid
 import math
 from collections import Counter
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
 import fitz  # PyMuPDF
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from .filters import is_boilerplate, looks_like_chart_or_table
+from .dedup import DedupStage, get_dedup_index, link_near_duplicates
+from .lexical import ensure_lexical_index
 
 
 _WS = re.compile(r"\s+")
@@ -113,10 +117,12 @@ def strip_repeated_lines(text: str, blacklist: set[str]) -> str:
     return cleaned
 
 
-def chunk_pages(pages, chunk_size: int = 1800, chunk_overlap: int = 250):
+def chunk_pages(pages, chunk_size: int = 1800, chunk_overlap: int = 250, id_prefix: Optional[str] = None):
     """
     Chunk each page separately so metadata keeps correct page numbers.
     Also strips repeated headers/footers prior to chunking.
+    With id_prefix, chunk ids are "<id_prefix>:<n>" so a retried ingest
+    produces the same ids (and overwrites instead of duplicating).
     """
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
@@ -144,10 +150,102 @@ def chunk_pages(pages, chunk_size: int = 1800, chunk_overlap: int = 250):
 
             chunks.append(
                 {
-                    "id": str(uuid.uuid4()),
+                    "id": f"{id_prefix}:{len(chunks)}" if id_prefix else str(uuid.uuid4()),
                     "text": chunk,
                     "metadata": {"page": page_num},
                 }
             )
 
     return chunks
+
+
+def ingest_batch_size() -> int:
+    """Chunks per embedding + col.add call when ingesting several documents."""
+    return int(os.getenv("INGEST_BATCH_SIZE", "512"))
+
+
+class IndexBatch:
+    """
+    Collects chunks from several documents and embeds/adds them in large
+    batches. Dedup linking still happens per document, in arrival order.
+    on_commit(doc_ids) runs after each flush with the documents it covered.
+    """
+
+    def __init__(self, col, batch_size: Optional[int] = None, on_commit: Optional[Callable[[List[str]], None]] = None):
+        self.col = col
+        self.batch_size = batch_size or ingest_batch_size()
+        self.on_commit = on_commit
+        self.docs: List[str] = []
+        self.dedup = get_dedup_index(col.name)
+        self.staged = DedupStage(self.dedup)
+        self.lexical = ensure_lexical_index(col)
+        self.pending: List[Dict[str, Any]] = []
+        self.links: List[Tuple[str, Dict[str, Any]]] = []
+
+    def add_document(self, chunks, doc_id: str, doc_name: str) -> Dict[str, Any]:
+        for c in chunks:
+            c["metadata"]["doc_id"] = doc_id
+            c["metadata"]["doc_name"] = doc_name
+
+        unique, links = link_near_duplicates(chunks, self.staged)
+        self.pending.extend(unique)
+        self.links.extend(links)
+        if doc_id not in self.docs:
+            self.docs.append(doc_id)
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+        return {
+            "chunks_added": len(unique),
+            "duplicates_linked": len(links),
+            "dedup_ratio": round(len(links) / len(chunks), 4) if chunks else 0.0,
+        }
+
+    def discard(self) -> None:
+        """Drop everything not yet flushed, staged dedup entries included."""
+        self.staged.clear()
+        self.pending, self.links, self.docs = [], [], []
+
+    def flush(self) -> None:
+        if not (self.pending or self.links or self.docs):
+            return
+        try:
+            for start in range(0, len(self.pending), self.batch_size):
+                batch = self.pending[start : start + self.batch_size]
+                # upsert: re-running a batch after a crash overwrites instead of failing/duplicating
+                self.col.upsert(
+                    ids=[c["id"] for c in batch],
+                    documents=[c["text"] for c in batch],
+                    metadatas=[c["metadata"] for c in batch],
+                )
+        except Exception:
+            # the shared dedup index must never point at chunks that aren't in the collection
+            self.discard()
+            raise
+        self.staged.commit()
+        self.dedup.save()
+
+        for c in self.pending:
+            self.lexical.add(c["id"], c["text"], [c["metadata"]["doc_id"]])
+        for canonical, alias in self.links:
+            self.lexical.add_doc(canonical, alias["doc_id"])
+        self.lexical.save()
+
+        committed, self.docs = self.docs, []
+        self.pending = []
+        self.links = []
+        if self.on_commit and committed:
+            self.on_commit(committed)
+
+
+def index_chunks(col, chunks, doc_id: str, doc_name: str):
+    """
+    Tag chunks with doc metadata, link near-duplicates to their canonical
+    chunk instead of embedding them again, and add the rest to the collection
+    and the BM25 index.
+    """
+    batch = IndexBatch(col)
+    stats = batch.add_document(chunks, doc_id, doc_name)
+    batch.flush()
+    return stats
@@ -0,0 +1,87 @@
+# backend/app/journal.py
+"""
+Snapshot + append-only log persistence for the side indexes (dedup, lexical).
+
+Rewriting a whole index file after every ingest batch costs O(corpus) per
+batch, so ingest gets quadratic as the corpus grows. Instead a batch appends
+its operations as JSON lines to <name>.log and load() replays them on top of
+the last snapshot (<name>.json). The snapshot is rewritten, and the log
+emptied, only after a removal or once the log outgrows the snapshot, which
+keeps the amortised cost of a batch proportional to the batch.
+
+Log lines carry a sequence number and the snapshot records the last one it
+includes, so a crash between writing the snapshot and emptying the log never
+replays an operation twice. A torn last line (crash mid-append, or a reader
+racing the writer) is skipped.
+"""
+import os
+import json
+from typing import Any, Dict, List, Tuple
+
+
+COMPACT_MIN_OPS = int(os.getenv("INDEX_LOG_COMPACT_MIN", "5000"))
+
+
+class Journal:
+    def __init__(self, path: str):
+        self.path = path
+        self.log_path = os.path.splitext(path)[0] + ".log"
+        self.seq = 0
+        self.log_ops = 0
+
+    def read(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """(snapshot, operations logged after it), oldest first."""
+        snapshot: Dict[str, Any] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f) or {}
+            except Exception:
+                snapshot = {}
+        base = int(snapshot.get("seq") or 0)
+
+        ops: List[Dict[str, Any]] = []
+        last = base
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        continue
+                    last = max(last, op.get("seq", 0))
+                    if op.get("seq", 0) > base:
+                        ops.append(op)
+        self.seq = last
+        self.log_ops = len(ops)
+        return snapshot, ops
+
+    def append(self, ops: List[Dict[str, Any]]) -> None:
+        if not ops:
+            return
+        lines = []
+        for op in ops:
+            self.seq += 1
+            lines.append(json.dumps({**op, "seq": self.seq}, separators=(",", ":")))
+        with open(self.log_path, "a+", encoding="utf-8") as f:
+            # never glue a new line onto a torn one left by a crash
+            if f.tell() > 0:
+                f.seek(f.tell() - 1)
+                if f.read(1) != "\n":
+                    lines.insert(0, "")
+            f.write("\n".join(lines) + "\n")
+        self.log_ops += len(ops)
+
+    def rewrite(self, snapshot: Dict[str, Any]) -> None:
+        """Write a full snapshot (write-then-rename), then empty the log."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({**snapshot, "seq": self.seq}, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        with open(self.log_path, "w", encoding="utf-8"):
+            pass
+        self.log_ops = 0
+
+    def should_compact(self, size: int) -> bool:
+        """True once the log holds more operations than the snapshot has entries."""
+        return self.log_ops > max(COMPACT_MIN_OPS, size)
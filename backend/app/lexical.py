@@ -0,0 +1,288 @@
+# backend/app/lexical.py
+"""
+In-process BM25 inverted index over stored chunks.
+
+Exact terms ("secondaries", "NAV lending", "EPMM") are often missed by the
+embedding model; this index catches them and, for keyword-style queries,
+answers without computing a query embedding at all.
+
+Built incrementally at ingest next to the dedup index and persisted per
+collection as a snapshot plus an append-only log (app.journal), so a batch
+costs what it adds rather than a rewrite of the whole index. Collections
+indexed before this index existed are backfilled from the stored chunks the
+first time they are used (ensure_lexical_index). Chunk ids are interned to
+ints; postings are term -> {int: tf}. Each chunk also records every doc_id
+whose pages contain it (owner + dedup aliases) so searches can be filtered by
+document.
+"""
+import os
+import re
+import math
+import threading
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
+
+from .store import get_index_dir, get_index_version, is_query_role
+from .journal import Journal
+from .dedup import get_dedup_index
+
+
+INDEX_FILENAME = "lexical.json"
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    """a an and are as at be by for from has have how in is it its of on or that the this to was
+    were what when where which who why will with does do did about into over than then there these
+    those their they them our we you your can could would should may might also any all more most
+    report reports say says said""".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class LexicalIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self.journal = Journal(path)
+        self.lock = threading.RLock()
+        self.version = None
+        self.load()
+
+    def _reset(self) -> None:
+        self.ids: List[Optional[str]] = []
+        self.slot: Dict[str, int] = {}
+        self.lengths: List[int] = []
+        self.docs: List[List[str]] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.total_len = 0
+        self.live = 0
+        self.unsaved: List[Dict] = []  # ops since the last save()
+        self.rewrite = False  # a removal or backfill happened: save() writes a full snapshot
+        self.backfill_checked = False
+
+    def load(self) -> None:
+        self.version = get_index_version()
+        with self.lock:
+            data, ops = self.journal.read()
+            self._reset()
+            self.ids = data.get("ids") or []
+            self.lengths = data.get("lengths") or []
+            self.docs = data.get("docs") or []
+            for term, flat in (data.get("postings") or {}).items():
+                # stored flat as [slot, tf, slot, tf, ...]
+                self.postings[term] = dict(zip(flat[0::2], flat[1::2]))
+            for i, cid in enumerate(self.ids):
+                if cid is not None:
+                    self.slot[cid] = i
+                    self.total_len += self.lengths[i]
+                    self.live += 1
+            for op in ops:
+                if op["op"] == "add":
+                    self._add_tf(op["id"], op["tf"], op["docs"])
+                elif op["op"] == "doc":
+                    self._add_doc(op["id"], op["doc"])
+
+    def save(self) -> None:
+        with self.lock:
+            if self.rewrite or self.journal.should_compact(self.live):
+                self.journal.rewrite(
+                    {
+                        "ids": self.ids,
+                        "lengths": self.lengths,
+                        "docs": self.docs,
+                        "postings": {
+                            term: [x for pair in plist.items() for x in pair] for term, plist in self.postings.items()
+                        },
+                    }
+                )
+            else:
+                self.journal.append(self.unsaved)
+            self.unsaved, self.rewrite = [], False
+
+    def add(self, chunk_id: str, text: str, doc_ids: List[str]) -> None:
+        with self.lock:
+            if chunk_id in self.slot:
+                return
+            tf = dict(Counter(tokenize(text)))
+            docs = list(dict.fromkeys(d for d in doc_ids if d))
+            self._add_tf(chunk_id, tf, docs)
+            self.unsaved.append({"op": "add", "id": chunk_id, "tf": tf, "docs": docs})
+
+    def _add_tf(self, chunk_id: str, tf: Dict[str, int], docs: List[str]) -> None:
+        if chunk_id in self.slot:
+            return
+        i = len(self.ids)
+        self.ids.append(chunk_id)
+        self.slot[chunk_id] = i
+        length = sum(tf.values())
+        self.lengths.append(length)
+        self.docs.append(list(docs))
+        for term, n in tf.items():
+            self.postings.setdefault(term, {})[i] = n
+        self.total_len += length
+        self.live += 1
+
+    def add_doc(self, chunk_id: str, doc_id: str) -> None:
+        """Another document contains this chunk's text (dedup alias)."""
+        with self.lock:
+            if self._add_doc(chunk_id, doc_id):
+                self.unsaved.append({"op": "doc", "id": chunk_id, "doc": doc_id})
+
+    def _add_doc(self, chunk_id: str, doc_id: str) -> bool:
+        i = self.slot.get(chunk_id)
+        if i is None or doc_id in self.docs[i]:
+            return False
+        self.docs[i].append(doc_id)
+        return True
+
+    def _drop(self, i: int) -> None:
+        cid = self.ids[i]
+        if cid is None:
+            return
+        self.ids[i] = None
+        del self.slot[cid]
+        self.total_len -= self.lengths[i]
+        self.live -= 1
+        self.docs[i] = []
+        self.lengths[i] = 0
+
+    def remove_doc(self, doc_id: str) -> None:
+        """Forget doc_id; chunks no other document contains are dropped."""
+        with self.lock:
+            for i, docs in enumerate(self.docs):
+                if doc_id in docs:
+                    docs.remove(doc_id)
+                    if not docs:
+                        self._drop(i)
+            # slots stay reserved (ids are positional); only their postings go
+            for term in list(self.postings.keys()):
+                plist = {s: tf for s, tf in self.postings[term].items() if self.ids[s] is not None}
+                if plist:
+                    self.postings[term] = plist
+                else:
+                    del self.postings[term]
+            self.rewrite = True
+
+    def backfill(self, col, aliases_for, batch: int = 1000) -> int:
+        """
+        Index every chunk stored in `col` (owner doc + the docs aliases_for(id)
+        returns). For collections indexed before BM25 existed. Returns chunks added.
+        """
+        added = 0
+        with self.lock:
+            offset = 0
+            while True:
+                res = col.get(include=["documents", "metadatas"], limit=batch, offset=offset)
+                ids = res.get("ids") or []
+                for cid, doc, meta in zip(ids, res.get("documents") or [], res.get("metadatas") or []):
+                    if cid in self.slot:
+                        continue
+                    docs = [(meta or {}).get("doc_id")] + [a.get("doc_id") for a in aliases_for(cid)]
+                    self.add(cid, doc or "", docs)
+                    added += 1
+                offset += len(ids)
+                if len(ids) < batch:
+                    break
+            if added:
+                self.rewrite = True
+        return added
+
+    def max_score(self, query: str) -> float:
+        """
+        Upper bound of search()'s score for this query (every term at
+        saturating tf). score / max_score is comparable across queries.
+        """
+        with self.lock:
+            n = max(1, self.live)
+            total = 0.0
+            for term in dict.fromkeys(tokenize(query)):
+                df = len(self.postings.get(term) or ())
+                total += math.log(1 + (n - df + 0.5) / (df + 0.5)) * (K1 + 1)
+            return total
+
+    def search(
+        self,
+        query: str,
+        k: int = 30,
+        doc_ids: Optional[List[str]] = None,
+        exclude_doc_ids: Optional[List[str]] = None,
+    ) -> List[Tuple[str, float, List[str]]]:
+        """
+        Top-k (chunk_id, bm25, doc_ids) for the query, optionally limited to
+        doc_ids. Chunks found only in exclude_doc_ids are skipped.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        allowed = set(doc_ids) if doc_ids else None
+        excluded = set(exclude_doc_ids or ())
+        with self.lock:
+            n = max(1, self.live)
+            avg = (self.total_len / n) if self.live else 1.0
+            scores: Dict[int, float] = {}
+            for term in terms:
+                plist = self.postings.get(term)
+                if not plist:
+                    continue
+                idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+                for i, tf in plist.items():
+                    if self.ids[i] is None:
+                        continue
+                    if allowed is not None and not allowed.intersection(self.docs[i]):
+                        continue
+                    if excluded and excluded.issuperset(self.docs[i]):
+                        continue
+                    norm = tf + K1 * (1 - B + B * self.lengths[i] / avg)
+                    scores[i] = scores.get(i, 0.0) + idf * tf * (K1 + 1) / norm
+
+            top = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+            return [(self.ids[i], s, list(self.docs[i])) for i, s in top]
+
+
+_INDEXES: Dict[str, LexicalIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_lexical_index(collection_name: str) -> LexicalIndex:
+    with _INDEXES_LOCK:
+        idx = _INDEXES.get(collection_name)
+        if idx is None:
+            idx = LexicalIndex(os.path.join(get_index_dir(collection_name), INDEX_FILENAME))
+            _INDEXES[collection_name] = idx
+        elif is_query_role() and idx.version != get_index_version():
+            idx.load()
+        return idx
+
+
+def ensure_lexical_index(col) -> LexicalIndex:
+    """
+    The collection's BM25 index, backfilled from the stored chunks when it is
+    empty but the collection is not (indexed before BM25 existed). Checked
+    once per load. The writer persists the backfill; a query worker keeps it
+    in memory until the writer has saved one.
+    """
+    idx = get_lexical_index(col.name)
+    with idx.lock:
+        if idx.backfill_checked:
+            return idx
+        idx.backfill_checked = True
+        if idx.live or not col.count():
+            return idx
+        added = idx.backfill(col, get_dedup_index(col.name).aliases_for)
+        print(f"[lexical] {col.name}: backfilled {added} chunks from the collection")
+        if added and not is_query_role():
+            idx.save()
+    return idx
+
+
+def is_keyword_query(query: str) -> bool:
+    """Short term lookups / quoted phrases: skip the embedding and go lexical."""
+    q = (query or "").strip()
+    if q.startswith('"') and q.endswith('"') and len(q) > 2:
+        return True
+    return 0 < len(tokenize(q)) <= int(os.getenv("LEXICAL_MAX_KEYWORDS", "3"))
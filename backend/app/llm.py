@@ -8,11 +8,27 @@ from urllib.error import URLError, HTTPError
 
 from openai import OpenAI
 
+from .history import build_history, render_history_text
+from .failover import call_with_failover
+
+
+SUPPORTED_PROVIDERS = ("MOCK", "OLLAMA", "OPENAI")
+
 
 def _normalize_ws(s: str) -> str:
     return re.sub(r"\s+", " ", (s or "")).strip()
 
 
+def source_label(s: Dict[str, Any]) -> str:
+    """'name p.X' plus any other pages holding the same (deduplicated) text."""
+    meta = s.get("metadata", {}) or {}
+    label = f"{meta.get('doc_name', 'report')} p.{meta.get('page', '?')}"
+    also = s.get("also_in") or []
+    if also:
+        label += "; also " + ", ".join(f"{a.get('doc_name', 'report')} p.{a.get('page', '?')}" for a in also)
+    return label
+
+
 def _format_sources_for_prompt(
     sources: List[Dict[str, Any]],
     max_sources: int = 10,
@@ -20,15 +36,12 @@ def _format_sources_for_prompt(
 ) -> str:
     parts = []
     for s in sources[:max_sources]:
-        meta = s.get("metadata", {}) or {}
-        name = meta.get("doc_name", "report")
-        page = meta.get("page", "?")
         text = _normalize_ws(s.get("text", ""))
 
         if len(text) > max_chars_per_source:
             text = text[:max_chars_per_source] + "…"
 
-        parts.append(f"[{name} p.{page}] {text}")
+        parts.append(f"[{source_label(s)}] {text}")
     return "\n\n".join(parts)
 
 
@@ -36,7 +49,7 @@ def _format_sources_for_prompt(
 # Providers
 # ---------------------------
 
-def _ollama_generate(prompt: str) -> str:
+def _ollama_generate(prompt: str, timeout: float = 180) -> str:
     host = os.getenv("OLLAMA_HOST", "http://localhost:11434").rstrip("/")
     model = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
 
@@ -55,7 +68,7 @@ def _ollama_generate(prompt: str) -> str:
     )
 
     try:
-        with urlrequest.urlopen(req, timeout=180) as resp:
+        with urlrequest.urlopen(req, timeout=timeout) as resp:
             data = json.loads(resp.read().decode("utf-8"))
             return (data.get("response") or "").strip()
     except HTTPError as e:
@@ -72,8 +85,8 @@ def _ollama_generate(prompt: str) -> str:
 
 
 
-def _openai_generate(prompt: str, history: Optional[List[Dict[str, Any]]] = None) -> str:
-    history = history or []
+def _openai_generate(prompt: str, hist: Optional[Dict[str, Any]] = None, timeout: float = 60) -> str:
+    hist = hist or {"summary": "", "recent": []}
 
     api_key = os.getenv("OPENAI_API_KEY", "").strip()
     if not api_key:
@@ -86,7 +99,8 @@ def _openai_generate(prompt: str, history: Optional[List[Dict[str, Any]]] = None
     # DEBUG: Print what we're using (check Railway logs)
     print(f"DEBUG LLM: model='{model}', base_url='{base_url}', has_key={bool(api_key)}")
 
-    client = OpenAI(api_key=api_key, base_url=base_url)
+    # No SDK retries: failover/hedging in failover.py decides what to try next
+    client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
 
     system = (
         "You are a careful investment/markets analyst. "
@@ -98,12 +112,11 @@ def _openai_generate(prompt: str, history: Optional[List[Dict[str, Any]]] = None
     # Build messages cleanly
     messages: List[Dict[str, str]] = [{"role": "system", "content": system}]
 
-    # Include last N turns of history (keep small)
-    for m in history[-8:]:
-        role = m.get("role")
-        content = (m.get("content") or "").strip()
-        if role in ("user", "assistant") and content:
-            messages.append({"role": role, "content": content})
+    # Compacted history: running summary of older turns + recent turns verbatim
+    if hist.get("summary"):
+        messages.append({"role": "system", "content": "Summary of earlier conversation:\n" + hist["summary"]})
+    for m in hist.get("recent") or []:
+        messages.append({"role": m["role"], "content": m["content"]})
 
     # Final user prompt (your RAG prompt with CONTEXT)
     messages.append({"role": "user", "content": prompt})
@@ -144,13 +157,23 @@ def _mock_generate(question: str, sources: List[Dict[str, Any]]) -> str:
 # Main entry
 # ---------------------------
 
-def generate(question: str, context: str, sources: List[Dict[str, Any]], history: List[Dict[str, str]] | None = None) -> str:
+def generate(
+    question: str,
+    context: str,
+    sources: List[Dict[str, Any]],
+    history: List[Dict[str, str]] | None = None,
+    conversation_id: str | None = None,
+) -> str:
     """
     LLM provider switch. Supported: MOCK, OLLAMA, OPENAI.
+    LLM_PROVIDERS (e.g. "OPENAI,OLLAMA,MOCK") gives an ordered failover list;
+    otherwise the single LLM_PROVIDER is used. See failover.py for timeouts,
+    hedging and circuit breakers.
+    History is bounded by HISTORY_TOKEN_BUDGET for every provider (see history.py).
     """
-    provider = os.getenv("LLM_PROVIDER", "MOCK").upper().strip()
+    providers = configured_providers()
 
-    if provider == "MOCK":
+    if providers == ["MOCK"]:
         return _mock_generate(question, sources)
 
     src_block = _format_sources_for_prompt(
@@ -197,10 +220,22 @@ def generate(question: str, context: str, sources: List[Dict[str, Any]], history
     {src_block}
     """
 
-    if provider == "OLLAMA":
-        return _ollama_generate(prompt).replace("\r\n", "\n").strip()
+    hist = build_history(history, conversation_id)
+    history_block = render_history_text(hist)
+    ollama_prompt = f"{history_block}\n\n{prompt}" if history_block else prompt
+
+    calls = {
+        "OPENAI": lambda t: _openai_generate(prompt, hist, timeout=t).replace("\r\n", "\n").strip(),
+        "OLLAMA": lambda t: _ollama_generate(ollama_prompt, timeout=t).replace("\r\n", "\n").strip(),
+        "MOCK": lambda t: _mock_generate(question, sources),
+    }
+    return call_with_failover([(name, calls[name]) for name in providers])
 
-    if provider == "OPENAI":
-        return _openai_generate(prompt, history).replace("\r\n", "\n").strip()
 
-    raise RuntimeError(f"Unknown LLM_PROVIDER={provider}. Use MOCK, OLLAMA, or OPENAI.")
+def configured_providers() -> List[str]:
+    raw = os.getenv("LLM_PROVIDERS", "").strip() or os.getenv("LLM_PROVIDER", "MOCK")
+    providers = [p.strip().upper() for p in raw.split(",") if p.strip()]
+    for p in providers:
+        if p not in SUPPORTED_PROVIDERS:
+            raise RuntimeError(f"Unknown LLM provider {p}. Use MOCK, OLLAMA, or OPENAI.")
+    return providers or ["MOCK"]
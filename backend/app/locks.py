@@ -0,0 +1,69 @@
+# backend/app/locks.py
+"""
+Cross-process advisory file locks (fcntl on POSIX, msvcrt on Windows).
+Used for the registry read-modify-write and to guarantee a single index writer.
+"""
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class LockHeld(RuntimeError):
+    pass
+
+
+def _lock(fd: int, blocking: bool) -> None:
+    if fcntl is not None:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            raise LockHeld("lock is held by another process")
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            raise LockHeld("lock is held by another process")
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True):
+    """Exclusive lock on `path` (created if missing) for the duration of the block."""
+    fd = acquire(path, blocking)
+    try:
+        yield
+    finally:
+        release(fd)
+
+
+def acquire(path: str, blocking: bool = True) -> int:
+    """Take the lock and return its fd; hold it for the life of the process if never released."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        _lock(fd, blocking)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def release(fd: int) -> None:
+    try:
+        _unlock(fd)
+    finally:
+        os.close(fd)
@@ -1,22 +1,30 @@
 
 # backend/app/main.py
 import os
-import uuid
 from typing import List, Optional
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 
-from .store import get_collection, get_paths
-from .ingest import extract_pages, chunk_pages
-from .rag import answer_question
+from .store import get_collection, get_paths, get_index_version, app_role, is_query_role, claim_writer, index_reader
+from .rag import answer_question, lean_sources, get_chunk
+from .maintenance import index_stats
+from .write_api import router as write_router, proxy_router
+from .snapshot import import_on_startup, index_identity
+from .checkpoint import resume_on_startup
+from .registry import hidden_doc_ids
+from .llm import configured_providers
+from .failover import provider_stats
+from .admission import admit, admission_stats, chat_class
 
 from pathlib import Path
 from dotenv import load_dotenv
 
 import glob
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 
 from pydantic import BaseModel
 from typing import Optional, List, Literal
@@ -56,6 +64,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# /chat payloads are mostly text; compress anything over ~1KB
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("GZIP_MIN_BYTES", "1024")))
+
+# Query workers never write the index: hand uploads/deletes/compaction to the writer process
+if is_query_role():
+    app.include_router(proxy_router)
+else:
+    app.include_router(write_router)
+
+@app.on_event("startup")
+def _claim_writer():
+    # Single-process mode owns index writes; a second such process must run as APP_ROLE=query
+    if not is_query_role():
+        claim_writer()
+        # SNAPSHOT_PATH: boot from a bundle instead of re-ingesting (no-op if already loaded)
+        import_on_startup()
+        # Finish uploads a previous run was killed in the middle of
+        resume_on_startup()
+
 class ChatMessage(BaseModel):
     role: Literal["user", "assistant"]
     content: str
@@ -66,6 +93,17 @@ class ChatPayload(BaseModel):
     doc_ids: Optional[List[str]] = None
     route: bool = True
     history: Optional[List[ChatMessage]] = None
+    # Lets the backend cache the compacted summary of older turns
+    conversation_id: Optional[str] = None
+    # "lean" = sources carry only id/snippet/citation metadata (fetch text via /chunks/{id})
+    response_mode: Literal["full", "lean"] = "full"
+    # None = RETRIEVAL_MODE env (default "vector"); "lexical" skips the query embedding
+    retrieval_mode: Optional[Literal["vector", "hybrid", "lexical", "auto"]] = None
+    # Requested admission class: interactive chat > summary > batch (eval runs, scripts).
+    # Can only lower the priority the caller's X-Api-Key allows; see app.admission.chat_class
+    kind: Literal["chat", "summary", "batch"] = "chat"
+    # False = always call the LLM, even on weak evidence (eval_run.py --calibrate)
+    relevance_gate: bool = True
 
 @app.get("/health")
 def health():
@@ -73,8 +111,19 @@ def health():
 
 @app.get("/stats")
 def stats():
-    col = get_collection()
-    return {"chunks_indexed": col.count(), **get_paths()}
+    with index_reader():
+        chunks_indexed = get_collection().count()
+    return {
+        "chunks_indexed": chunks_indexed,
+        "index_version": get_index_version(),
+        "role": app_role(),
+        **get_paths(),
+    }
+
+@app.get("/index/version")
+def index_version():
+    """Index identity; replicas compare snapshot_id to confirm they serve the same index."""
+    return index_identity()
 
 @app.get("/whoami")
 def whoami():
@@ -83,56 +132,48 @@ def whoami():
         "OPENAI_MODEL": os.getenv("OPENAI_MODEL"),
         "has_OPENAI_API_KEY": bool(os.getenv("OPENAI_API_KEY")),
         "OPENAI_BASE_URL": os.getenv("OPENAI_BASE_URL"),
+        "LLM_PROVIDERS": os.getenv("LLM_PROVIDERS"),
     }
 
-@app.post("/upload")
-async def upload(file: UploadFile = File(...)):
-    paths = get_paths()
-    doc_id = str(uuid.uuid4())
-
-    safe_name = (file.filename or "document.pdf").replace("/", "_").replace("\\", "_")
-    pdf_path = os.path.join(paths["docs_dir"], f"{doc_id}__{safe_name}")
-
-    data = await file.read()
-    with open(pdf_path, "wb") as f:
-        f.write(data)
-
-    pages = extract_pages(pdf_path)
-    chunks = chunk_pages(pages)
-
-    for c in chunks:
-        c["metadata"]["doc_id"] = doc_id
-        c["metadata"]["doc_name"] = safe_name
-
-    col = get_collection()
-    col.add(
-        ids=[c["id"] for c in chunks],
-        documents=[c["text"] for c in chunks],
-        metadatas=[c["metadata"] for c in chunks],
-    )
-
-    return {
-        "status": "ok",
-        "doc_id": doc_id,
-        "doc_name": safe_name,
-        "pages": len(pages),
-        "chunks_added": len(chunks),
-    }
+@app.get("/llm/stats")
+def llm_stats():
+    """Per-provider latency percentiles, error rates, hedges and breaker state."""
+    return {"providers": configured_providers(), "stats": provider_stats()}
 
-@app.post("/chat")
-async def chat(payload: ChatPayload):
-    try:
-        question = (payload.question or "").strip()
-        if not question:
-            raise HTTPException(status_code=400, detail="Missing question")
+@app.get("/admission/stats")
+def admission_stats_endpoint():
+    """Per-class running / queued counts, rejections, wait and service time percentiles."""
+    return admission_stats()
 
+def _answer(question: str, payload: ChatPayload):
+    # one index version for the whole request: a query worker swaps Chroma only between requests
+    with index_reader():
         return answer_question(
             question,
             doc_id=payload.doc_id,
             doc_ids=payload.doc_ids,
             route=payload.route,
             history=payload.history or [],
+            conversation_id=payload.conversation_id,
+            retrieval_mode=payload.retrieval_mode,
+            relevance_gate=payload.relevance_gate,
         )
+
+@app.post("/chat", response_class=ORJSONResponse)
+async def chat(payload: ChatPayload, x_api_key: Optional[str] = Header(None)):
+    try:
+        question = (payload.question or "").strip()
+        if not question:
+            raise HTTPException(status_code=400, detail="Missing question")
+
+        async with admit(chat_class(payload.kind, x_api_key)):
+            # off the event loop, so queued requests can still be admitted / rejected meanwhile
+            res = await run_in_threadpool(_answer, question, payload)
+        if payload.response_mode == "lean":
+            res["sources"] = lean_sources(res.get("sources") or [])
+        return ORJSONResponse(res)
+    except HTTPException:
+        raise
     except Exception as e:
         # Log the error for debugging
         import traceback
@@ -140,6 +181,20 @@ async def chat(payload: ChatPayload):
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
+@app.get("/chunks/{chunk_id}", response_class=ORJSONResponse)
+def chunk(chunk_id: str):
+    """Full text + metadata for one chunk (used by lean /chat responses)."""
+    with index_reader():
+        res = get_chunk(chunk_id)
+    if not res:
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    return ORJSONResponse(res)
+
+@app.get("/admin/index-stats")
+def admin_index_stats():
+    with index_reader():
+        return index_stats()
+
 @app.get("/debug-main")
 def debug_main():
     return {"main_file": str(Path(__file__).resolve())}
@@ -171,18 +226,18 @@ def documents():
     Returns all uploaded documents known to the vector index (unique doc_id/doc_name).
     Used by eval scripts + UI.
     """
-    col = get_collection()
-
     # Pull metadatas for all stored chunks and build a unique doc list
-    res = col.get(include=["metadatas"])
+    with index_reader():
+        res = get_collection().get(include=["metadatas"])
     metas = res.get("metadatas") or []
+    hidden = set(hidden_doc_ids())  # still ingesting
 
     by_id = {}
     for md in metas:
         if not md:
             continue
         did = md.get("doc_id")
-        if not did:
+        if not did or did in hidden:
             continue
         if did not in by_id:
             by_id[did] = {
@@ -0,0 +1,234 @@
+# backend/app/maintenance.py
+"""
+Index housekeeping: document deletion and collection compaction.
+
+Chroma never shrinks an HNSW graph after deletes, so compaction copies the
+live vectors into a fresh collection, swaps it in and drops the old one.
+"""
+import os
+import glob
+import time
+import shutil
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional
+
+from .store import (
+    CHROMA_DIR,
+    WRITE_LOCK,
+    get_client,
+    get_collection,
+    get_active_collection_name,
+    set_active_collection,
+    get_index_dir,
+    get_paths,
+    bump_index_version,
+    new_collection_name,
+)
+from .dedup import get_dedup_index, strip_alias_flags
+from .lexical import get_lexical_index
+from .partitions import build_partitions, drop_partition, sync_partitions
+from .pagecache import delete_pages
+from .figures import delete_figures
+from . import registry
+
+
+PROBE_QUERIES = [
+    "private credit outlook",
+    "secondaries and liquidity",
+    "biggest risks for 2026",
+    "inflation and interest rates",
+    "real estate valuations",
+]
+
+COPY_BATCH = 1000
+
+# One background job per kind ("compact", "reindex"); status is polled via GET /admin/<kind>
+_JOBS: Dict[str, Dict[str, Any]] = {}
+_JOB_LOCK = threading.Lock()
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    vals = sorted(values)
+    idx = min(len(vals) - 1, max(0, int(round(pct / 100.0 * (len(vals) - 1)))))
+    return vals[idx]
+
+
+def index_stats(col=None, rounds: int = 3) -> Dict[str, Any]:
+    """Chunk count, on-disk size and probe-query latency for the active collection."""
+    col = col or get_collection()
+    count = col.count()
+
+    latencies: List[float] = []
+    if count:
+        for _ in range(rounds):
+            for q in PROBE_QUERIES:
+                t0 = time.perf_counter()
+                col.query(query_texts=[q], n_results=min(10, count), include=["distances"])
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    return {
+        "collection": col.name,
+        "chunks": count,
+        "disk_bytes": _dir_size(CHROMA_DIR),
+        "query_ms_p50": _percentile(latencies, 50),
+        "query_ms_p95": _percentile(latencies, 95),
+    }
+
+
+def delete_document(doc_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Remove a document's vectors, registry entry and PDF. Canonical chunks that
+    other docs link to as near-duplicates are re-owned rather than deleted.
+    Returns None if nothing was known about doc_id. Caller holds WRITE_LOCK.
+    """
+    col = get_collection()
+    res = col.get(where={"doc_id": doc_id}, include=[])
+    chunk_ids = res.get("ids") or []
+
+    dedup = get_dedup_index(col.name)
+    promoted = dedup.remove_doc(doc_id, chunk_ids)
+    if promoted:
+        col.update(ids=list(promoted.keys()), metadatas=list(promoted.values()))
+
+    to_delete = [cid for cid in chunk_ids if cid not in promoted]
+    if to_delete:
+        col.delete(ids=to_delete)
+    dedup.save()
+
+    lexical = get_lexical_index(col.name)
+    lexical.remove_doc(doc_id)
+    lexical.save()
+
+    drop_partition(doc_id)
+    # Re-owned canonicals changed metadata. Every partition holding a copy (the new owner's and
+    # those of the docs still linking to it) would otherwise keep citing the deleted doc.
+    build_partitions(
+        col,
+        [m["doc_id"] for m in promoted.values()]
+        + [a["doc_id"] for cid in promoted for a in dedup.aliases_for(cid)],
+    )
+
+    entry = registry.delete_doc(doc_id)
+
+    pdfs = glob.glob(os.path.join(get_paths()["docs_dir"], f"{doc_id}__*"))
+    for path in pdfs:
+        os.remove(path)
+    cached = delete_pages(doc_id)
+    delete_figures(doc_id)
+
+    if not chunk_ids and entry is None and not pdfs and not cached:
+        return None
+
+    return {
+        "doc_id": doc_id,
+        "chunks_deleted": len(to_delete),
+        "chunks_reassigned": len(promoted),
+        "pdfs_deleted": len(pdfs),
+    }
+
+
+def _vacuum_sqlite() -> None:
+    path = os.path.join(CHROMA_DIR, "chroma.sqlite3")
+    if not os.path.exists(path):
+        return
+    try:
+        conn = sqlite3.connect(path)
+        conn.execute("VACUUM")
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"Compaction: VACUUM skipped ({e})")
+
+
+def compact_index() -> Dict[str, Any]:
+    """
+    Rebuild the active collection into a fresh one (reusing stored embeddings,
+    no re-embedding), swap it in, and drop the old collection.
+    Caller holds WRITE_LOCK.
+    """
+    client = get_client()
+    old_name = get_active_collection_name()
+    old = client.get_or_create_collection(name=old_name)
+    before = index_stats(old)
+
+    new_name = new_collection_name(old_name)
+    new = client.create_collection(name=new_name, metadata=old.metadata or None)
+
+    # Side indexes are keyed by collection name: carry them across first
+    old_dir = get_index_dir(old_name)
+    new_dir = get_index_dir(new_name)
+    shutil.copytree(old_dir, new_dir, dirs_exist_ok=True)
+    dedup = get_dedup_index(new_name)
+    dedup.load()
+
+    total = old.count()
+    for offset in range(0, total, COPY_BATCH):
+        res = old.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=COPY_BATCH,
+            offset=offset,
+        )
+        ids = res.get("ids") or []
+        if not ids:
+            break
+        # alias membership lives in the dedup index; drop in_<doc_id> flags older builds wrote
+        metas = [strip_alias_flags(md) for md in res.get("metadatas") or []]
+        new.add(
+            ids=ids,
+            embeddings=res.get("embeddings"),
+            documents=res.get("documents"),
+            metadatas=metas,
+        )
+
+    set_active_collection(new_name)
+    client.delete_collection(name=old_name)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    partitions = sync_partitions(new)
+    bump_index_version()
+    _vacuum_sqlite()
+
+    after = index_stats(new)
+    return {"from": old_name, "to": new_name, "before": before, "after": after, **partitions}
+
+
+def run_job(kind: str, fn, *args, **kwargs) -> None:
+    """Background entry point: runs fn under the write lock and records its result."""
+    with _JOB_LOCK:
+        _JOBS[kind] = {"status": "running", "started_at": int(time.time())}
+
+    try:
+        with WRITE_LOCK:
+            result = fn(*args, **kwargs)
+        with _JOB_LOCK:
+            _JOBS[kind].update({"status": "done", "finished_at": int(time.time()), **result})
+    except Exception as e:
+        print(f"{kind} job failed: {e}")
+        with _JOB_LOCK:
+            _JOBS[kind].update({"status": "failed", "finished_at": int(time.time()), "error": str(e)})
+
+
+def start_job(kind: str) -> bool:
+    """Mark a job as queued; False if one of this kind is already queued/running."""
+    with _JOB_LOCK:
+        if _JOBS.get(kind, {}).get("status") in ("queued", "running"):
+            return False
+        _JOBS[kind] = {"status": "queued", "queued_at": int(time.time())}
+        return True
+
+
+def job_status(kind: str) -> Dict[str, Any]:
+    with _JOB_LOCK:
+        return dict(_JOBS.get(kind) or {"status": "idle"})
@@ -0,0 +1,114 @@
+# backend/app/pagecache.py
+"""
+Persistent per-document page-text cache.
+
+One file per doc (data/pages/<doc_id>.pages), written once at upload:
+
+    magic    8 bytes   b"MORPAGE1"
+    n        u32       number of pages
+    pages    n x u32   1-indexed page numbers
+    offsets  (n+1) x u64, relative to the start of the blob section
+    blobs    zlib-compressed UTF-8 text per page
+
+Files are read through mmap, so fetching a single page only touches its blob
+and re-indexing never has to re-parse the PDF.
+"""
+import os
+import mmap
+import zlib
+import struct
+from typing import List, Dict, Any, Optional
+
+from .store import DATA_DIR
+
+
+PAGES_DIR = os.path.join(DATA_DIR, "pages")
+MAGIC = b"MORPAGE1"
+_HEADER = struct.Struct("<8sI")
+
+os.makedirs(PAGES_DIR, exist_ok=True)
+
+
+def cache_path(doc_id: str) -> str:
+    return os.path.join(PAGES_DIR, f"{doc_id}.pages")
+
+
+def has_pages(doc_id: str) -> bool:
+    return os.path.exists(cache_path(doc_id))
+
+
+def write_pages(doc_id: str, pages: List[Dict[str, Any]]) -> str:
+    """Persist extract_pages() output; written to a temp file then renamed."""
+    blobs = [zlib.compress((p.get("text") or "").encode("utf-8"), 6) for p in pages]
+    offsets = [0]
+    for b in blobs:
+        offsets.append(offsets[-1] + len(b))
+
+    n = len(pages)
+    path = cache_path(doc_id)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, n))
+        f.write(struct.pack(f"<{n}I", *[int(p["page"]) for p in pages]))
+        f.write(struct.pack(f"<{n + 1}Q", *offsets))
+        for b in blobs:
+            f.write(b)
+    os.replace(tmp, path)
+    return path
+
+
+def _layout(mm) -> Dict[str, Any]:
+    magic, n = _HEADER.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a page cache file")
+    pos = _HEADER.size
+    page_nums = struct.unpack_from(f"<{n}I", mm, pos)
+    pos += 4 * n
+    offsets = struct.unpack_from(f"<{n + 1}Q", mm, pos)
+    pos += 8 * (n + 1)
+    return {"n": n, "pages": page_nums, "offsets": offsets, "data_start": pos}
+
+
+def read_pages(doc_id: str) -> Optional[List[Dict[str, Any]]]:
+    """Same shape as extract_pages(): [{page, text}], or None if not cached."""
+    path = cache_path(doc_id)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lay = _layout(mm)
+            base, offs = lay["data_start"], lay["offsets"]
+            return [
+                {
+                    "page": lay["pages"][i],
+                    "text": zlib.decompress(mm[base + offs[i] : base + offs[i + 1]]).decode("utf-8"),
+                }
+                for i in range(lay["n"])
+            ]
+
+
+def read_page(doc_id: str, page: int) -> Optional[str]:
+    path = cache_path(doc_id)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lay = _layout(mm)
+            try:
+                i = lay["pages"].index(page)
+            except ValueError:
+                return None
+            base, offs = lay["data_start"], lay["offsets"]
+            return zlib.decompress(mm[base + offs[i] : base + offs[i + 1]]).decode("utf-8")
+
+
+def delete_pages(doc_id: str) -> bool:
+    path = cache_path(doc_id)
+    if os.path.exists(path):
+        os.remove(path)
+        return True
+    return False
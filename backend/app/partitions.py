@@ -0,0 +1,150 @@
+# backend/app/partitions.py
+"""
+Per-document partitions for doc-scoped retrieval (PARTITION_MODE=doc).
+
+The shared collection stays the source of truth (global queries, dedup,
+compaction, snapshots). Each ready document additionally gets a small
+collection holding exactly what a doc-scoped query may return: its own
+chunks plus the canonical chunks of other docs it links to (dedup). Partitions are copied from
+the shared collection's stored embeddings (no re-embedding), so doc-scoped
+queries search a graph the size of one document instead of filtering the
+whole corpus with `where`.
+
+Partition names are derived from the active collection, so a compaction,
+re-index or snapshot import simply rebuilds them (sync) and drops the old set.
+Query workers only read partitions; a missing one falls back to the shared
+collection with a metadata filter.
+"""
+import os
+import re
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from .store import get_client, get_active_collection_name, get_index_version, is_query_role, client_epoch, ReadOnlyCollection
+from .dedup import get_dedup_index
+from . import registry
+
+
+BATCH = 2000
+_PARTITION_SUFFIX = re.compile(r"-p[0-9a-f]{16}$")
+_CACHE: Dict[str, Tuple[Tuple[int, int], Any]] = {}  # name -> ((index_version, client_epoch), collection)
+_CACHE_LOCK = threading.Lock()
+
+
+def partitions_enabled() -> bool:
+    return os.getenv("PARTITION_MODE", "off").strip().lower() == "doc"
+
+
+def partition_name(doc_id: str, base: Optional[str] = None) -> str:
+    # Chroma names are capped at 63 chars; hash the doc_id to keep them short and valid
+    digest = hashlib.sha1(doc_id.encode("utf-8")).hexdigest()[:16]
+    return f"{base or get_active_collection_name()}-p{digest}"
+
+
+def _collection_names(client) -> List[str]:
+    return [getattr(c, "name", c) for c in client.list_collections()]
+
+
+def get_partition(doc_id: str):
+    """The document's partition, or None (not built / partitions off)."""
+    if not partitions_enabled():
+        return None
+    name = partition_name(doc_id)
+    # a query worker's Chroma System can be rebuilt: cached handles from the old one are dead
+    version = (get_index_version(), client_epoch())
+    with _CACHE_LOCK:
+        hit = _CACHE.get(name)
+        if hit and hit[0] == version:
+            return hit[1]
+
+    try:
+        col = get_client().get_collection(name=name)
+    except Exception:
+        return None
+    if is_query_role():
+        col = ReadOnlyCollection(col)
+    with _CACHE_LOCK:
+        _CACHE[name] = (version, col)
+    return col
+
+
+def build_partition(col, doc_id: str) -> int:
+    """(Re)build one document's partition from the shared collection `col`. Returns chunk count."""
+    client = get_client()
+    name = partition_name(doc_id, base=col.name)
+    if name in _collection_names(client):
+        client.delete_collection(name=name)
+    part = client.create_collection(name=name, metadata=col.metadata or None)
+
+    def copy(res) -> int:
+        ids = res.get("ids") or []
+        if ids:
+            part.add(
+                ids=ids,
+                embeddings=res.get("embeddings"),
+                documents=res.get("documents"),
+                metadatas=res.get("metadatas"),
+            )
+        return len(ids)
+
+    include = ["embeddings", "documents", "metadatas"]
+    total = 0
+    while True:
+        n = copy(col.get(where={"doc_id": doc_id}, include=include, limit=BATCH, offset=total))
+        total += n
+        if n < BATCH:
+            break
+
+    # canonicals owned by other docs whose text also appears in this one
+    linked = get_dedup_index(col.name).linked_chunks(doc_id)
+    for start in range(0, len(linked), BATCH):
+        ids = linked[start : start + BATCH]
+        res = col.get(ids=ids, include=include)
+        keep = [i for i, md in enumerate(res.get("metadatas") or []) if (md or {}).get("doc_id") != doc_id]
+        total += copy({k: [res[k][i] for i in keep] for k in ["ids"] + include})
+
+    with _CACHE_LOCK:
+        _CACHE.pop(name, None)
+    return total
+
+
+def build_partitions(col, doc_ids: List[str]) -> None:
+    if not partitions_enabled():
+        return
+    for doc_id in dict.fromkeys(doc_ids):
+        build_partition(col, doc_id)
+
+
+def drop_partition(doc_id: str) -> None:
+    client = get_client()
+    name = partition_name(doc_id)
+    if name in _collection_names(client):
+        client.delete_collection(name=name)
+    with _CACHE_LOCK:
+        _CACHE.pop(name, None)
+
+
+def sync_partitions(col) -> Dict[str, Any]:
+    """
+    After the active collection changed (compaction, re-index, snapshot
+    import): drop partitions of other collections, build one per ready doc.
+    Caller holds the write lock and bumps the index version afterwards.
+    """
+    client = get_client()
+    prefix = f"{col.name}-p"
+    dropped = 0
+    for name in _collection_names(client):
+        if _PARTITION_SUFFIX.search(name) and not name.startswith(prefix):
+            client.delete_collection(name=name)
+            dropped += 1
+    with _CACHE_LOCK:
+        _CACHE.clear()
+
+    built = 0
+    if partitions_enabled():
+        for entry in registry.list_docs():
+            if registry.is_ready(entry):
+                build_partition(col, entry["doc_id"])
+                built += 1
+    return {"partitions_built": built, "partitions_dropped": dropped}
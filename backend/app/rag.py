@@ -1,11 +1,20 @@
 # backend/app/rag.py
 from __future__ import annotations
 
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+import os
 import re
 
-from .store import get_collection
-from .llm import generate
+from .store import get_collection, get_index_version
+from .llm import generate, source_label
+from .dedup import get_dedup_index, resolve_aliases, strip_alias_flags
+from .lexical import ensure_lexical_index, is_keyword_query, tokenize
+from .registry import hidden_doc_ids, get_doc
+from .partitions import get_partition
+from . import figures
+
+
+INSUFFICIENT_INFO = "Not enough information in the provided excerpts."
 
 
 def _cite_snippet(text: str, max_len: int = 240) -> str:
@@ -13,72 +22,214 @@ def _cite_snippet(text: str, max_len: int = 240) -> str:
     return (t[:max_len] + "…") if len(t) > max_len else t
 
 
-def retrieve(
-    query: str,
-    k: int = 12,
-    doc_id: Optional[str] = None,
-    doc_ids: Optional[List[str]] = None,
-) -> List[Dict[str, Any]]:
-    col = get_collection()
+RETRIEVAL_MODES = ("vector", "hybrid", "lexical", "auto")
+RRF_K = 60
+
+
+def get_retrieval_mode(mode: Optional[str] = None) -> str:
+    """
+    vector:  embedding search only (default)
+    hybrid:  embedding + BM25, merged with reciprocal rank fusion
+    lexical: BM25 only, no query embedding
+    auto:    lexical for short keyword queries (falls back to vector if nothing matches well), else hybrid
+    """
+    m = (mode or os.getenv("RETRIEVAL_MODE", "vector")).strip().lower()
+    return m if m in RETRIEVAL_MODES else "vector"
+
+
+def _source(cid: str, doc: Optional[str], meta: Optional[Dict[str, Any]], dist: Optional[float]) -> Dict[str, Any]:
+    text = (doc or "").strip()
+    return {
+        "id": cid,
+        "text": text,
+        "snippet": _cite_snippet(text),
+        "metadata": strip_alias_flags(meta),
+        "distance": dist,
+    }
 
-    target_doc_ids = doc_ids or ([doc_id] if doc_id else None)
 
-    def run_query(where_doc_id: Optional[str], n: int):
-        kwargs = dict(
+def _vector_candidates(
+    col,
+    query: str,
+    target_doc_ids: Optional[List[str]],
+    dedup,
+    hidden: List[str],
+    per_doc: int,
+    n_raw: int,
+    partitioned: bool = True,
+) -> List[Dict[str, Any]]:
+    def run_query(target, n: int, **filters) -> List[Tuple[str, str, Dict[str, Any], Optional[float]]]:
+        res = target.query(
             query_texts=[query],
             n_results=n,
             include=["documents", "metadatas", "distances"],
+            **filters,
         )
-        if where_doc_id:
-            kwargs["where"] = {"doc_id": where_doc_id}
-        return col.query(**kwargs)
+        ids = res.get("ids", [[]])[0]
+        docs = res.get("documents", [[]])[0]
+        metas = res.get("metadatas", [[]])[0]
+        dists = res.get("distances", [[None] * len(docs)])[0]
+        return list(zip(ids, docs, metas, dists))
+
+    def doc_hits(did: str):
+        # Planner: a doc's own partition holds exactly its chunks plus the canonicals it links to
+        part = get_partition(did) if partitioned else None
+        if part is not None:
+            return run_query(part, per_doc)
+        hits = run_query(col, per_doc, where={"doc_id": did})
+        linked = dedup.linked_chunks(did)
+        if linked:
+            # canonical chunks owned by other docs whose text also appears in this one
+            seen = {h[0] for h in hits}
+            hits += [h for h in run_query(col, min(per_doc, len(linked)), ids=linked) if h[0] not in seen]
+            hits.sort(key=lambda h: h[3] if h[3] is not None else 999999)
+        return hits[:per_doc]
 
     out: List[Dict[str, Any]] = []
 
     if target_doc_ids:
-        # Allocate retrieval budget fairly across docs
-        # Example: if k=14 and 2 docs => ~7 per doc (plus buffer)
-        per_doc = max(4, (k // len(target_doc_ids)) + 2)
-
         for did in target_doc_ids:
-            res = run_query(did, per_doc)
-            docs = res.get("documents", [[]])[0]
-            metas = res.get("metadatas", [[]])[0]
-            dists = res.get("distances", [[None] * len(docs)])[0]
-
-            for doc, meta, dist in zip(docs, metas, dists):
-                text = (doc or "").strip()
-                meta = meta or {}
-                out.append(
-                    {
-                        "text": text,
-                        "snippet": _cite_snippet(text),
-                        "metadata": meta,
-                        "distance": dist,
-                    }
-                )
+            for cid, doc, meta, dist in doc_hits(did):
+                out.append(resolve_aliases(_source(cid, doc, meta, dist), dedup, doc_id=did))
     else:
-        # Global query across all docs
-        n_raw = max(30, k * 4)
-        res = run_query(None, n_raw)
-        docs = res.get("documents", [[]])[0]
-        metas = res.get("metadatas", [[]])[0]
-        dists = res.get("distances", [[None] * len(docs)])[0]
-
-        for doc, meta, dist in zip(docs, metas, dists):
-            text = (doc or "").strip()
-            meta = meta or {}
-            out.append(
-                {
-                    "text": text,
-                    "snippet": _cite_snippet(text),
-                    "metadata": meta,
-                    "distance": dist,
-                }
-            )
+        # Global query across all docs. Chunks owned by hidden docs are filtered out, except
+        # canonicals a visible doc links to: that text is the visible doc's too.
+        filters = {"where": {"doc_id": {"$nin": hidden}}} if hidden else {}
+        hits = run_query(col, n_raw, **filters)
+        shared = _shared_hidden_canonicals(col, dedup, hidden) if hidden else []
+        if shared:
+            seen = {h[0] for h in hits}
+            hits += [h for h in run_query(col, min(n_raw, len(shared)), ids=shared) if h[0] not in seen]
+        for cid, doc, meta, dist in hits:
+            out.append(resolve_aliases(_source(cid, doc, meta, dist), dedup, hidden=hidden))
 
     # Sort best-first (lower distance = closer)
     out.sort(key=lambda x: (x["distance"] if x["distance"] is not None else 999999))
+    return out
+
+
+_SHARED_CACHE: Dict[tuple, List[str]] = {}
+
+
+def _shared_hidden_canonicals(col, dedup, hidden: List[str]) -> List[str]:
+    """
+    Chunks owned by hidden docs (ingesting / failed) that some visible doc
+    links to as a near-duplicate. Cached per index version and hidden set.
+    """
+    key = (col.name, get_index_version(), tuple(sorted(hidden)))
+    if key not in _SHARED_CACHE:
+        hidden_set = set(hidden)
+        owned = col.get(where={"doc_id": {"$in": list(hidden)}}, include=[]).get("ids") or []
+        _SHARED_CACHE.clear()
+        _SHARED_CACHE[key] = [
+            cid for cid in owned if any(a.get("doc_id") not in hidden_set for a in dedup.aliases_for(cid))
+        ]
+    return _SHARED_CACHE[key]
+
+
+def _lexical_candidates(
+    col, query: str, target_doc_ids: Optional[List[str]], dedup, hidden: List[str], n_raw: int
+) -> List[Dict[str, Any]]:
+    """BM25 hits, best-first. Text/metadata come from col.get by id, so the query is never embedded."""
+    index = ensure_lexical_index(col)
+    hits = index.search(query, k=n_raw, doc_ids=target_doc_ids, exclude_doc_ids=hidden)
+    if not hits:
+        return []
+    ceiling = index.max_score(query) or 1.0
+
+    res = col.get(ids=[cid for cid, _, _ in hits], include=["documents", "metadatas"])
+    stored = {
+        cid: (doc, meta)
+        for cid, doc, meta in zip(res.get("ids") or [], res.get("documents") or [], res.get("metadatas") or [])
+    }
+
+    out: List[Dict[str, Any]] = []
+    for cid, score, docs in hits:
+        if cid not in stored:
+            continue  # index briefly ahead of/behind the collection
+        doc, meta = stored[cid]
+        # cite the page in a requested (or visible) doc when the chunk is shared with other docs
+        wanted = target_doc_ids or [d for d in docs if d not in hidden]
+        did = next((d for d in docs if d in wanted), None)
+        s = resolve_aliases(_source(cid, doc, meta, None), dedup, doc_id=did, hidden=hidden)
+        s["bm25"] = round(score, 4)
+        # comparable across queries: what the relevance gate uses for lexical-only hits
+        s["bm25_norm"] = round(score / ceiling, 4)
+        out.append(s)
+    return out
+
+
+def _rrf_merge(*ranked: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Reciprocal rank fusion: score = sum(1 / (RRF_K + rank)) over the lists a chunk appears in."""
+    merged: Dict[Any, Dict[str, Any]] = {}
+    scores: Dict[Any, float] = {}
+    for results in ranked:
+        for rank, s in enumerate(results, start=1):
+            meta = s.get("metadata") or {}
+            key = (s.get("id"), meta.get("doc_id"), meta.get("page"))
+            if key in merged:
+                # keep the vector distance (relevance gate) and the bm25 score side by side
+                for field in ("distance", "bm25", "bm25_norm"):
+                    if merged[key].get(field) is None and s.get(field) is not None:
+                        merged[key][field] = s[field]
+            else:
+                merged[key] = s
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+
+    order = sorted(merged.keys(), key=lambda key: scores[key], reverse=True)
+    return [merged[key] for key in order]
+
+
+def retrieve(
+    query: str,
+    k: int = 12,
+    doc_id: Optional[str] = None,
+    doc_ids: Optional[List[str]] = None,
+    mode: Optional[str] = None,
+    per_doc: Optional[int] = None,
+    n_raw: Optional[int] = None,
+    col=None,
+) -> List[Dict[str, Any]]:
+    """
+    per_doc / n_raw override the candidate budgets (doc-scoped / global);
+    col targets another collection (eval sweeps) instead of the active one.
+    """
+    partitioned = col is None
+    col = col if col is not None else get_collection()
+
+    # Documents still being ingested stay invisible until their last batch is committed
+    hidden = hidden_doc_ids()
+    target_doc_ids = doc_ids or ([doc_id] if doc_id else None)
+    if target_doc_ids and hidden:
+        target_doc_ids = [d for d in target_doc_ids if d not in hidden]
+        if not target_doc_ids:
+            return []
+    dedup = get_dedup_index(col.name)
+    mode = get_retrieval_mode(mode)
+
+    # Allocate retrieval budget fairly across docs
+    # Example: if k=14 and 2 docs => ~7 per doc (plus buffer)
+    if per_doc is None:
+        per_doc = max(4, (k // len(target_doc_ids)) + 2) if target_doc_ids else 0
+    if n_raw is None:
+        n_raw = max(30, k * 4)
+
+    def vector():
+        return _vector_candidates(col, query, target_doc_ids, dedup, hidden, per_doc, n_raw, partitioned)
+
+    def lexical():
+        return _lexical_candidates(col, query, target_doc_ids, dedup, hidden, n_raw)
+
+    out: List[Dict[str, Any]] = []
+    if mode == "lexical" or (mode == "auto" and is_keyword_query(query)):
+        out = lexical()
+        if mode == "auto" and evidence_is_weak(out):
+            # no (or only weak) keyword hits: the embedding may still find paraphrases
+            out = vector()
+    elif mode in ("hybrid", "auto"):
+        out = _rrf_merge(vector(), lexical())
+    else:
+        out = vector()
 
     # Dedupe: 1 chunk per (doc_id, page) to increase page diversity
     seen = set()
@@ -96,14 +247,50 @@ def retrieve(
     return deduped
 
 
+# Metadata keys the UI actually renders (SourcesPanel / citations)
+LEAN_METADATA_KEYS = ("doc_id", "doc_name", "page")
+
+
+def lean_sources(sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Strip sources down to what the sources panel shows: id, snippet, citation
+    metadata and distance. Full text is fetched on demand via GET /chunks/{id}.
+    """
+    out = []
+    for s in sources:
+        meta = s.get("metadata") or {}
+        out.append(
+            {
+                "id": s.get("id"),
+                "snippet": s.get("snippet") or _cite_snippet(s.get("text") or ""),
+                "metadata": {k: meta[k] for k in LEAN_METADATA_KEYS if k in meta},
+                "distance": s.get("distance"),
+                "also_in": s.get("also_in") or [],
+            }
+        )
+    return out
+
+
+def get_chunk(chunk_id: str) -> Optional[Dict[str, Any]]:
+    col = get_collection()
+    res = col.get(ids=[chunk_id], include=["documents", "metadatas"])
+    ids = res.get("ids") or []
+    if not ids:
+        return None
+    text = ((res.get("documents") or [""])[0] or "").strip()
+    return {
+        "id": ids[0],
+        "text": text,
+        "snippet": _cite_snippet(text),
+        "metadata": strip_alias_flags((res.get("metadatas") or [{}])[0]),
+    }
+
+
 def format_context(sources: List[Dict[str, Any]]) -> str:
     parts = []
     for s in sources:
-        meta = s.get("metadata", {}) or {}
-        name = meta.get("doc_name", "report")
-        page = meta.get("page", "?")
         text = (s.get("text") or "").replace("\n", " ").strip()
-        parts.append(f"[{name} p.{page}] {text}")
+        parts.append(f"[{source_label(s)}] {text}")
     return "\n\n".join(parts)
 
 
@@ -140,24 +327,233 @@ def enforce_citations(output: str) -> str:
         # Only enforce citations for the cite-required sections
         if needs_cite(line) and not cite_pattern.search(line):
             if section == "ANSWER":
-                fixed.append("Not enough information in the provided excerpts.")
+                fixed.append(INSUFFICIENT_INFO)
             else:
-                fixed.append("- Not enough information in the provided excerpts.")
+                fixed.append(f"- {INSUFFICIENT_INFO}")
         else:
             fixed.append(line)
 
     return "\n".join(fixed)
 
 
+def relevance_threshold() -> float:
+    """
+    Max distance (lower = closer) the best retrieved chunk may have before we
+    skip generation. Chroma's default space is squared L2 on normalized
+    embeddings, so distances fall in [0, 4]. Off (0) until set from a
+    calibration run (eval/eval_run.py --calibrate) on this corpus and model.
+    """
+    try:
+        return float(os.getenv("RELEVANCE_MAX_DISTANCE", "0"))
+    except ValueError:
+        return 0.0
+
+
+def lexical_threshold() -> float:
+    """
+    Min normalised BM25 score (score / the query's maximum, in [0, 1)) the
+    best hit must reach when no source has a vector distance (lexical mode).
+    A chunk containing every query term once scores about 0.45. Set
+    LEXICAL_MIN_SCORE=0 to disable.
+    """
+    try:
+        return float(os.getenv("LEXICAL_MIN_SCORE", "0.2"))
+    except ValueError:
+        return 0.0
+
+
+def best_distance(sources: List[Dict[str, Any]]) -> Optional[float]:
+    dists = [s["distance"] for s in sources if s.get("distance") is not None]
+    return min(dists) if dists else None
+
+
+def best_lexical_score(sources: List[Dict[str, Any]]) -> Optional[float]:
+    scores = [s["bm25_norm"] for s in sources if s.get("bm25_norm") is not None]
+    return max(scores) if scores else None
+
+
+def evidence_is_weak(sources: List[Dict[str, Any]]) -> bool:
+    """
+    True when retrieval found nothing close enough to be worth an LLM call.
+    Vector distance decides when there is one; lexical-only hits are judged
+    by their normalised BM25 score instead.
+    """
+    if not sources:
+        return True
+
+    best = best_distance(sources)
+    if best is not None:
+        threshold = relevance_threshold()
+        return threshold > 0 and best > threshold
+
+    score = best_lexical_score(sources)
+    if score is None:
+        return False
+    floor = lexical_threshold()
+    return floor > 0 and score < floor
+
+
+def insufficient_evidence_response(sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Standard four-section answer returned without calling the LLM.
+    Shape matches answer_question(), plus an `evidence` block for the UI badge.
+    """
+    answer = "\n".join(
+        [
+            "ANSWER:",
+            INSUFFICIENT_INFO,
+            "",
+            "KEY THEMES:",
+            f"- {INSUFFICIENT_INFO}",
+            "",
+            "WHAT TO FOCUS ON IN 2026:",
+            f"- {INSUFFICIENT_INFO}",
+            "",
+            "GAPS:",
+            "- Missing: excerpts relevant to this question. "
+            "Look for: a report that covers this topic, or rephrase using the report's own terms.",
+        ]
+    )
+
+    best = best_distance(sources)
+    lexical = best_lexical_score(sources)
+    if not sources:
+        notes = "No excerpts retrieved; skipped generation."
+    elif best is None:
+        notes = (
+            f"Best keyword match score {lexical:.3f} is below the lexical threshold "
+            f"{lexical_threshold():.3f}; skipped generation."
+        )
+    else:
+        notes = (
+            f"Closest excerpt distance {best:.3f} exceeds relevance threshold "
+            f"{relevance_threshold():.3f}; skipped generation."
+        )
+
+    return {
+        "answer": answer,
+        "sources": sources,
+        "evidence": {
+            "quality": "LOW",
+            "citation_coverage": 0.0,
+            "distinct_pages_cited": 0,
+            "notes": notes,
+            "best_distance": best,
+            "best_lexical_score": lexical,
+            "gated": True,
+        },
+    }
+
+
+# Figure cues: a unit or currency, "how much/many/...", or asking for figures/tables by name.
+# Metric words alone ("default rates", "growth") are not enough: they appear in plenty of
+# qualitative questions, and each lookup costs a pass over the docs' figure tables.
+_QUANT_HINT = re.compile(
+    r"[%$€£]|\b(?:how (?:much|many|large|big|high|low)|percent(?:ages?)?|figures?|numbers?|tables?|charts?|"
+    r"quantitative|numeric(?:al)?|statistics|stats)\b",
+    re.IGNORECASE,
+)
+_PAGE_REF = re.compile(r"\b(?:p\.|page)\s*(\d{1,4})\b", re.IGNORECASE)
+_NUMBER_CUE = re.compile(r"(?<![\w.])\d[\d,]*(?:\.\d+)?(?![\w.])")
+_YEAR_ONLY = re.compile(r"(?:19|20)\d{2}")
+# Question words that ask for numbers without naming a metric
+_FIGURE_NOISE = frozenset("""
+    figure figures number numbers table tables chart charts much many large big high low value values exact show give
+    list quantitative numeric numerical statistics stats data key main important mentioned mention mentions cited
+    reported stated provided included given document report page pages
+""".split())
+
+
+def is_quantitative(question: str) -> bool:
+    """A figure cue, a page reference, or a number that is not a year ("2026 outlook" is not one)."""
+    if _QUANT_HINT.search(question) or _PAGE_REF.search(question):
+        return True
+    return any(not _YEAR_ONLY.fullmatch(n) for n in _NUMBER_CUE.findall(question))
+
+
+def figure_lookup_enabled() -> bool:
+    return os.getenv("FIGURE_LOOKUP", "on").strip().lower() not in ("0", "off", "false", "no")
+
+
+def lookup_figures(question: str, doc_ids: List[str]) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Exact table/chart figures for a quantitative question, from the
+    per-document side-store (app.figures). No embedding, no vector query,
+    and read-only: a doc without a figure file simply contributes nothing.
+
+    Returns (rows, strong). A generic request ("list the figures mentioned",
+    optionally for a year or page) returns every row in scope up to the limit.
+    Otherwise only the best keyword matches are kept, and they are `strong`
+    (allowed to stand in for weak retrieval evidence) when they hit at least
+    half of the question's keywords.
+    """
+    if not doc_ids or not figure_lookup_enabled() or not is_quantitative(question):
+        return [], False
+
+    years = figures.years_in(question)
+    pages = [int(p) for p in _PAGE_REF.findall(question)]
+    keywords = [t for t in tokenize(question) if not t.isdigit() and t not in _FIGURE_NOISE and t not in years]
+    rows = figures.lookup(
+        doc_ids,
+        keywords=keywords,
+        years=years,
+        pages=pages,
+        limit=int(os.getenv("FIGURE_LOOKUP_LIMIT", "12")),
+    )
+    if not keywords or not rows:
+        return rows, bool(rows)
+
+    best = rows[0]["hits"]
+    rows = [r for r in rows if r["hits"] == best]
+    return rows, best * 2 >= len(set(keywords))
+
+
+def figure_sources(rows: List[Dict[str, Any]], names: Dict[str, str] | None = None) -> List[Dict[str, Any]]:
+    """One prompt source per (doc, page) so the model cites figures like any excerpt."""
+    grouped: Dict[tuple, List[Dict[str, Any]]] = {}
+    for r in rows:
+        grouped.setdefault((r["doc_id"], r["page"]), []).append(r)
+
+    out = []
+    for (doc_id, page), items in grouped.items():
+        lines = []
+        for r in items:
+            label = f"{r['label']} ({r['column']})" if r.get("column") else r["label"]
+            lines.append(f"{label}: {r['value']}")
+        # Registry first, then the name retrieved chunks carry, then the id: never "None p.X"
+        doc_name = (get_doc(doc_id) or {}).get("doc_name") or (names or {}).get(doc_id) or doc_id
+        text = "Figures extracted from tables/charts on this page: " + "; ".join(lines)
+        src = _source(f"fig:{doc_id}:{page}", text, {"doc_id": doc_id, "doc_name": doc_name, "page": page}, None)
+        src["kind"] = "figures"
+        out.append(src)
+    return out
+
+
 def answer_question(
     question: str,
     doc_id: str | None = None,
     doc_ids: list[str] | None = None,
     route: bool = True,
     history: list[dict[str, str]] | None = None,  # Add history parameter
+    conversation_id: str | None = None,
+    retrieval_mode: str | None = None,
+    relevance_gate: bool = True,
 ):
-    sources = retrieve(question, k=14, doc_id=doc_id, doc_ids=doc_ids)
-    context = format_context(sources)
+    sources = retrieve(question, k=14, doc_id=doc_id, doc_ids=doc_ids, mode=retrieval_mode)
+
+    # Exact figures from the table side-store: the requested docs, or the ones retrieval landed on
+    scope = doc_ids or ([doc_id] if doc_id else [(s.get("metadata") or {}).get("doc_id") for s in sources])
+    figure_rows, figures_strong = lookup_figures(question, [d for d in dict.fromkeys(scope) if d])
+
+    # Relevance gate: don't pay for a generation that enforce_citations would blank out anyway.
+    # Only a strong figure match stands in for weak retrieval; loose ones are dropped with it.
+    if relevance_gate and not figures_strong and evidence_is_weak(sources):
+        return insufficient_evidence_response(sources)
+
+    # Figures go first so MAX_SOURCES_FOR_LLM never truncates them away
+    names = {m.get("doc_id"): m.get("doc_name") for m in (s.get("metadata") or {} for s in sources) if m.get("doc_name")}
+    prompt_sources = figure_sources(figure_rows, names) + sources
+    context = format_context(prompt_sources)
     
     # Convert ChatMessage objects to dicts if needed
     history_dicts = None
@@ -168,6 +564,15 @@ def answer_question(
             for msg in history
         ]
     
-    answer = generate(question=question, context=context, sources=sources, history=history_dicts)
+    answer = generate(
+        question=question,
+        context=context,
+        sources=prompt_sources,
+        history=history_dicts,
+        conversation_id=conversation_id,
+    )
     answer = enforce_citations(answer)
-    return {"answer": answer, "sources": sources}
\ No newline at end of file
+    res = {"answer": answer, "sources": sources}
+    if figure_rows:
+        res["figures"] = figure_rows
+    return res
\ No newline at end of file
@@ -5,6 +5,7 @@ import time
 from typing import Dict, Any, List, Optional
 
 from .store import get_paths
+from .locks import file_lock
 
 REGISTRY_FILENAME = "docs_registry.json"
 
@@ -24,25 +25,66 @@ def _load() -> Dict[str, Any]:
         return {}
 
 def _save(data: Dict[str, Any]) -> None:
+    # Write-then-rename: readers in other processes never see a half-written file
     path = _registry_path()
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
+    os.replace(tmp, path)
 
-def upsert_doc(doc_id: str, doc_name: str, pdf_path: str) -> None:
-    data = _load()
-    data[doc_id] = {
-        "doc_id": doc_id,
-        "doc_name": doc_name,
-        "pdf_path": pdf_path,
-        "uploaded_at": int(time.time()),
-    }
-    _save(data)
+def _lock():
+    # Serializes load-modify-save across processes
+    return file_lock(_registry_path() + ".lock")
+
+def upsert_doc(doc_id: str, doc_name: str, pdf_path: str, **fields: Any) -> None:
+    with _lock():
+        data = _load()
+        data[doc_id] = {
+            "doc_id": doc_id,
+            "doc_name": doc_name,
+            "pdf_path": pdf_path,
+            "uploaded_at": int(time.time()),
+            **fields,
+        }
+        _save(data)
+
+def update_doc(doc_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+    """Merge fields into an existing entry (ingest checkpoints); None if unknown."""
+    with _lock():
+        data = _load()
+        entry = data.get(doc_id)
+        if entry is None:
+            return None
+        entry.update(fields)
+        _save(data)
+    return entry
+
+def delete_doc(doc_id: str) -> Optional[Dict[str, Any]]:
+    with _lock():
+        data = _load()
+        entry = data.pop(doc_id, None)
+        if entry is not None:
+            _save(data)
+    return entry
+
+def replace_all(data: Dict[str, Any]) -> None:
+    """Swap in a whole catalog (snapshot import)."""
+    with _lock():
+        _save(data)
 
 def get_doc(doc_id: str) -> Optional[Dict[str, Any]]:
     data = _load()
     return data.get(doc_id)
 
+def is_ready(entry: Dict[str, Any]) -> bool:
+    # Entries written before checkpointed ingest have no status and are complete
+    return entry.get("status", "ready") == "ready"
+
+def hidden_doc_ids() -> List[str]:
+    """Documents still being ingested, or whose ingest failed; retrieval must not see them."""
+    return [d for d, e in _load().items() if not is_ready(e)]
+
 def list_docs() -> List[Dict[str, Any]]:
     data = _load()
     # newest first
@@ -0,0 +1,199 @@
+# backend/app/reindex.py
+"""
+Rebuild every document's chunks + vectors from the page-text cache.
+
+    cd backend
+    python -m app.reindex --chunk-size 1500 --chunk-overlap 200 --workers 8
+
+Parsing/cleaning/chunking and MinHash signatures run in a process pool;
+dedup linking and batched col.add happen in this process, in upload order
+(see doc_order), so the same corpus always picks the same canonical chunks. Everything goes into a
+fresh collection which is swapped in atomically at the end, so the running
+API keeps serving the old index until the new one is complete. Documents
+without a table/figure file (app.figures) get one from the same pool.
+
+The CLI takes data/writer.lock, so it only runs while no API writer is up;
+against a live deployment use POST /admin/reindex, which runs the same job
+inside the writer process.
+"""
+import os
+import glob
+import time
+import shutil
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any
+
+from .store import (
+    claim_writer,
+    get_client,
+    get_paths,
+    get_active_collection_name,
+    set_active_collection,
+    get_chunking,
+    set_chunking,
+    get_index_dir,
+    bump_index_version,
+    new_collection_name,
+)
+from .ingest import extract_pages, chunk_pages, IndexBatch
+from .dedup import minhash, dedup_enabled
+from .partitions import sync_partitions
+from .checkpoint import UnreadableDocument
+from .figures import extract_figures, has_figures, save_figures
+from . import pagecache
+from . import registry
+
+
+def doc_order(doc: Dict[str, Any]) -> tuple:
+    """Deterministic ingest order: oldest upload first, doc_id breaks ties."""
+    return (doc.get("uploaded_at", 0), doc["doc_id"])
+
+
+def prepare_pool(workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    Process pool for prepare_doc. Workers are spawned, not forked: the
+    writer is threaded (uvicorn, the maintenance job thread, Chroma's own
+    threads), and a fork copies locks some other thread may be holding.
+    """
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
+
+
+def list_documents() -> List[Dict[str, Any]]:
+    """Registry entries plus any PDFs in docs_dir that predate the registry."""
+    docs = {d["doc_id"]: d for d in registry.list_docs()}
+    for path in glob.glob(os.path.join(get_paths()["docs_dir"], "*__*")):
+        doc_id, name = os.path.basename(path).split("__", 1)
+        docs.setdefault(doc_id, {"doc_id": doc_id, "doc_name": name, "pdf_path": path})
+    return sorted(docs.values(), key=doc_order)
+
+
+def prepare_doc(doc: Dict[str, Any], chunk_size: int, chunk_overlap: int, with_figures: bool = False) -> Dict[str, Any]:
+    """
+    Worker: cached pages -> chunks (+ MinHash). Falls back to the PDF once,
+    then caches. with_figures also extracts the table/figure rows, which the
+    parent saves (save_figures); a failed extraction comes back as figure_error.
+    """
+    doc_id = doc["doc_id"]
+    pages = pagecache.read_pages(doc_id)
+    parsed = False
+    if pages is None:
+        try:
+            pages = extract_pages(doc["pdf_path"])
+        except Exception as e:
+            raise UnreadableDocument(f"{doc.get('doc_name') or doc_id}: {e}") from e
+        pagecache.write_pages(doc_id, pages)
+        parsed = True
+
+    chunks = chunk_pages(pages, chunk_size=chunk_size, chunk_overlap=chunk_overlap, id_prefix=doc.get("ingest_key"))
+    if dedup_enabled():
+        for c in chunks:
+            c["minhash"] = minhash(c["text"])
+
+    figure_rows, figure_error = None, None
+    if with_figures:
+        try:
+            figure_rows = extract_figures(doc["pdf_path"])
+        except Exception as e:
+            figure_error = str(e)
+
+    return {
+        "doc": doc,
+        "pages": len(pages),
+        "chunks": chunks,
+        "parsed_pdf": parsed,
+        "with_figures": with_figures,
+        "figure_rows": figure_rows,
+        "figure_error": figure_error,
+    }
+
+
+def reindex(chunk_size: int | None = None, chunk_overlap: int | None = None, workers: int | None = None) -> Dict[str, Any]:
+    """
+    Rebuild with the given chunking (default: the corpus' current one). The
+    new setting becomes the corpus setting: later uploads use it too, and
+    every registry entry records it.
+    """
+    t0 = time.perf_counter()
+    chunking = get_chunking()
+    chunk_size = chunk_size or chunking["chunk_size"]
+    chunk_overlap = chunk_overlap or chunking["chunk_overlap"]
+    client = get_client()
+    old_name = get_active_collection_name()
+    old = client.get_or_create_collection(name=old_name)
+
+    new_name = new_collection_name(old_name)
+    new = client.create_collection(name=new_name, metadata=old.metadata or None)
+    get_index_dir(new_name)
+
+    docs = list_documents()
+    totals = {"documents": 0, "pages": 0, "chunks_added": 0, "duplicates_linked": 0, "pdfs_parsed": 0}
+
+    counts: Dict[str, int] = {}  # doc_id -> chunks under the new setting
+    finished: List[str] = []  # interrupted ingests that this rebuild completes
+    try:
+        batch = IndexBatch(new)
+        with prepare_pool(workers) as pool:
+            futures = [
+                pool.submit(prepare_doc, d, chunk_size, chunk_overlap, not has_figures(d["doc_id"])) for d in docs
+            ]
+            # Dedup links documents one at a time, in submission order: whichever doc is
+            # linked first owns a shared chunk, so completion order would make it random
+            for fut in futures:
+                res = fut.result()
+                doc = res["doc"]
+                if res["with_figures"]:
+                    save_figures(doc["doc_id"], res["figure_rows"], res["figure_error"])
+                stats = batch.add_document(res["chunks"], doc["doc_id"], doc.get("doc_name") or doc["doc_id"])
+                counts[doc["doc_id"]] = len(res["chunks"])
+                if not registry.is_ready(doc):
+                    finished.append(doc["doc_id"])
+                totals["documents"] += 1
+                totals["pages"] += res["pages"]
+                totals["chunks_added"] += stats["chunks_added"]
+                totals["duplicates_linked"] += stats["duplicates_linked"]
+                totals["pdfs_parsed"] += int(res["parsed_pdf"])
+                print(f"[{totals['documents']}/{len(docs)}] {doc.get('doc_name')}: {stats}")
+        batch.flush()
+    except Exception:
+        client.delete_collection(name=new_name)
+        shutil.rmtree(get_index_dir(new_name), ignore_errors=True)
+        raise
+
+    set_active_collection(new_name)
+    set_chunking(chunk_size, chunk_overlap)
+    client.delete_collection(name=old_name)
+    shutil.rmtree(get_index_dir(old_name), ignore_errors=True)
+    for doc_id, n in counts.items():
+        fields = {"status": "ready", "error": None} if doc_id in finished else {}
+        registry.update_doc(
+            doc_id,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            chunks_total=n,
+            chunks_committed=n,
+            **fields,
+        )
+    totals.update(sync_partitions(new))
+    bump_index_version()
+
+    totals.update({"collection": new_name, "chunk_size": chunk_size, "chunk_overlap": chunk_overlap})
+    totals["seconds"] = round(time.perf_counter() - t0, 2)
+    return totals
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rebuild all chunks/vectors from the page-text cache")
+    ap.add_argument("--chunk-size", type=int, default=None, help="Default: the corpus' current setting (1800 initially)")
+    ap.add_argument("--chunk-overlap", type=int, default=None, help="Default: the corpus' current setting (250 initially)")
+    ap.add_argument("--workers", type=int, default=None, help="Process pool size (default: all cores)")
+    args = ap.parse_args()
+
+    claim_writer()
+    res = reindex(args.chunk_size, args.chunk_overlap, args.workers)
+    print(f"\nRe-indexed into {res['collection']}: {res}")
+
+
+if __name__ == "__main__":
+    main()
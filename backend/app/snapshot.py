@@ -0,0 +1,360 @@
+# backend/app/snapshot.py
+"""
+Portable index snapshots for fast replica boot.
+
+    cd backend
+    python -m app.snapshot export ../snapshots          # writes ../snapshots/snapshot-v<N>-<ts>/
+    python -m app.snapshot import ../snapshots/snapshot-v12-1760000000
+
+Bundle layout (one directory):
+
+    manifest.json        format, snapshot_id, index_version, counts, sha256 per file
+    vectors.npy          float32 [n_chunks, dim]; np.load(..., mmap_mode="r")
+    ids.json             column: chunk ids (row i <-> vectors[i])
+    documents.json       column: chunk text
+    metadatas.json       column: chunk metadata
+    registry.json        document catalog
+    indexes/             side indexes of the collection (dedup, ...)
+    pages/<doc_id>.pages page-text cache
+    figures/             table/figure side-store (app.figures)
+    docs/                PDFs (omit with --no-pdfs)
+
+Import reuses the stored vectors (no re-embedding) and swaps the new
+collection in atomically. Set SNAPSHOT_PATH to import on startup; replicas
+compare `snapshot_id` via GET /index/version to confirm they serve the same index.
+"""
+import os
+import sys
+import re
+import json
+import time
+import shutil
+import glob
+import hashlib
+import argparse
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from .store import (
+    DATA_DIR,
+    claim_writer,
+    get_client,
+    get_paths,
+    get_active_collection_name,
+    set_active_collection,
+    get_index_dir,
+    get_index_version,
+    bump_index_version,
+    get_chunking,
+    set_chunking,
+    new_collection_name,
+)
+from .pagecache import PAGES_DIR
+from .figures import FIGURES_DIR
+from .dedup import get_dedup_index
+from .partitions import sync_partitions
+from . import registry
+
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+# What this node last imported/exported; served by GET /index/version
+SNAPSHOT_STATE_FILE = os.path.join(DATA_DIR, "snapshot.json")
+BATCH = 2000
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _copy_tree(src: str, dst: str) -> None:
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, dirs_exist_ok=True)
+
+
+def _clear_dir(path: str, keep=None) -> None:
+    """Empty path, except files keep(name) says to leave."""
+    if not os.path.isdir(path):
+        return
+    for name in os.listdir(path):
+        full = os.path.join(path, name)
+        if keep is not None and keep(name):
+            continue
+        if os.path.isdir(full):
+            shutil.rmtree(full, ignore_errors=True)
+        else:
+            os.remove(full)
+
+
+def _localize_registry(entries: Dict[str, Any], bundle: str) -> Dict[str, Any]:
+    """
+    Point every pdf_path at this node's docs dir. The exporting node's
+    absolute paths mean nothing here (resume, figures and reindex read them).
+    """
+    docs_dir = get_paths()["docs_dir"]
+    for doc_id, entry in entries.items():
+        shipped = glob.glob(os.path.join(bundle, "docs", f"{doc_id}__*"))
+        if shipped:
+            name = os.path.basename(shipped[0])
+        else:
+            # upload names are <doc_id>__<safe name>; the exporter may have used either separator
+            name = re.split(r"[\\/]", entry.get("pdf_path") or "")[-1] or f"{doc_id}__{entry.get('doc_name')}"
+        entry["pdf_path"] = os.path.join(docs_dir, name)
+    return entries
+
+
+def current_snapshot() -> Optional[Dict[str, Any]]:
+    try:
+        with open(SNAPSHOT_STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def export_snapshot(out_dir: str, include_pdfs: bool = True) -> Dict[str, Any]:
+    """Write a bundle for the active collection. Caller holds the write lock."""
+    client = get_client()
+    name = get_active_collection_name()
+    col = client.get_or_create_collection(name=name)
+    version = get_index_version()
+
+    bundle = os.path.join(out_dir, f"snapshot-v{version}-{int(time.time())}")
+    os.makedirs(bundle, exist_ok=False)
+
+    total = col.count()
+    ids, documents, metadatas = [], [], []
+    vectors = None
+    dim = 0
+    for offset in range(0, total, BATCH):
+        res = col.get(include=["embeddings", "documents", "metadatas"], limit=BATCH, offset=offset)
+        batch_ids = res.get("ids") or []
+        if not batch_ids:
+            break
+        emb = np.asarray(res.get("embeddings"), dtype=np.float32)
+        if vectors is None:
+            dim = int(emb.shape[1])
+            vectors = np.lib.format.open_memmap(
+                os.path.join(bundle, "vectors.npy"), mode="w+", dtype=np.float32, shape=(total, dim)
+            )
+        vectors[len(ids) : len(ids) + len(batch_ids)] = emb
+        ids.extend(batch_ids)
+        documents.extend(res.get("documents") or [])
+        metadatas.extend(res.get("metadatas") or [])
+
+    if vectors is None:
+        np.save(os.path.join(bundle, "vectors.npy"), np.zeros((0, 0), dtype=np.float32))
+    else:
+        vectors.flush()
+        del vectors
+
+    _write_json(os.path.join(bundle, "ids.json"), ids)
+    _write_json(os.path.join(bundle, "documents.json"), documents)
+    _write_json(os.path.join(bundle, "metadatas.json"), metadatas)
+    docs = registry.list_docs()
+    _write_json(os.path.join(bundle, "registry.json"), {d["doc_id"]: d for d in docs})
+
+    _copy_tree(get_index_dir(name), os.path.join(bundle, "indexes"))
+    _copy_tree(PAGES_DIR, os.path.join(bundle, "pages"))
+    _copy_tree(FIGURES_DIR, os.path.join(bundle, "figures"))
+    if include_pdfs:
+        _copy_tree(get_paths()["docs_dir"], os.path.join(bundle, "docs"))
+
+    files = {}
+    for root, _, names in os.walk(bundle):
+        for n in sorted(names):
+            path = os.path.join(root, n)
+            rel = os.path.relpath(path, bundle).replace(os.sep, "/")
+            files[rel] = {"sha256": _sha256(path), "bytes": os.path.getsize(path)}
+
+    digest = hashlib.sha256(
+        json.dumps({k: v["sha256"] for k, v in sorted(files.items())}).encode("utf-8")
+    ).hexdigest()
+    manifest = {
+        "format": FORMAT_VERSION,
+        "snapshot_id": digest[:16],
+        "index_version": version,
+        "collection": name,
+        "collection_metadata": col.metadata or None,
+        "created_at": int(time.time()),
+        "chunks": len(ids),
+        "dim": dim,
+        "documents": len(docs),
+        "chunking": get_chunking(),
+        "include_pdfs": include_pdfs,
+        "files": files,
+    }
+    _write_json(os.path.join(bundle, MANIFEST), manifest)
+    state = {k: v for k, v in manifest.items() if k != "files"}
+    state["local_index_version"] = version
+    _write_json(SNAPSHOT_STATE_FILE, state)
+    return {"path": bundle, **{k: v for k, v in manifest.items() if k != "files"}}
+
+
+def verify_snapshot(bundle: str) -> Dict[str, Any]:
+    """Load the manifest and check every file's size and sha256."""
+    with open(os.path.join(bundle, MANIFEST), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise RuntimeError(f"Unsupported snapshot format {manifest.get('format')}")
+
+    for rel, info in manifest["files"].items():
+        path = os.path.join(bundle, *rel.split("/"))
+        if not os.path.exists(path) or os.path.getsize(path) != info["bytes"]:
+            raise RuntimeError(f"Snapshot file missing or truncated: {rel}")
+        if _sha256(path) != info["sha256"]:
+            raise RuntimeError(f"Snapshot checksum mismatch: {rel}")
+    return manifest
+
+
+def import_snapshot(bundle: str, force: bool = False) -> Dict[str, Any]:
+    """
+    Load a bundle into a fresh collection and swap it in. No-op if this node
+    already serves the same snapshot_id (unless force). Caller holds the write lock.
+    """
+    manifest = verify_snapshot(bundle)
+    state = current_snapshot() or {}
+    if not force and state.get("snapshot_id") == manifest["snapshot_id"] and state.get("imported"):
+        return {"status": "already_loaded", "snapshot_id": manifest["snapshot_id"]}
+
+    t0 = time.perf_counter()
+    with open(os.path.join(bundle, "registry.json"), "r", encoding="utf-8") as f:
+        entries = _localize_registry(json.load(f), bundle)
+
+    client = get_client()
+    old_name = get_active_collection_name()
+    new_name = new_collection_name(old_name, tag="snap")
+    new = client.create_collection(name=new_name, metadata=manifest.get("collection_metadata"))
+
+    try:
+        with open(os.path.join(bundle, "ids.json"), "r", encoding="utf-8") as f:
+            ids = json.load(f)
+        with open(os.path.join(bundle, "documents.json"), "r", encoding="utf-8") as f:
+            documents = json.load(f)
+        with open(os.path.join(bundle, "metadatas.json"), "r", encoding="utf-8") as f:
+            metadatas = json.load(f)
+        vectors = np.load(os.path.join(bundle, "vectors.npy"), mmap_mode="r")
+
+        for start in range(0, len(ids), BATCH):
+            end = start + BATCH
+            new.add(
+                ids=ids[start:end],
+                embeddings=np.asarray(vectors[start:end]),
+                documents=documents[start:end],
+                metadatas=metadatas[start:end],
+            )
+
+        _copy_tree(os.path.join(bundle, "indexes"), get_index_dir(new_name))
+    except Exception:
+        client.delete_collection(name=new_name)
+        shutil.rmtree(get_index_dir(new_name), ignore_errors=True)
+        raise
+
+    # Replace, don't merge: nothing may survive for docs the snapshot doesn't have
+    _clear_dir(PAGES_DIR)
+    _copy_tree(os.path.join(bundle, "pages"), PAGES_DIR)
+    _clear_dir(FIGURES_DIR)
+    _copy_tree(os.path.join(bundle, "figures"), FIGURES_DIR)
+    docs_dir = get_paths()["docs_dir"]
+    if os.path.isdir(os.path.join(bundle, "docs")):
+        _clear_dir(docs_dir)
+        _copy_tree(os.path.join(bundle, "docs"), docs_dir)
+    else:
+        # bundle exported without PDFs: keep local copies of the snapshot's docs only
+        _clear_dir(docs_dir, keep=lambda name: name.split("__", 1)[0] in entries)
+    registry.replace_all(entries)
+    if manifest.get("chunking"):
+        # a writer restored from this bundle keeps chunking new uploads the same way
+        set_chunking(manifest["chunking"]["chunk_size"], manifest["chunking"]["chunk_overlap"])
+
+    get_dedup_index(new_name).load()
+    set_active_collection(new_name)
+    if old_name != new_name:
+        try:
+            client.delete_collection(name=old_name)
+        except Exception:
+            pass  # fresh node: the old collection may never have existed
+        shutil.rmtree(get_index_dir(old_name), ignore_errors=True)
+    sync_partitions(new)
+    bump_index_version()
+
+    state = {k: v for k, v in manifest.items() if k != "files"}
+    state.update(
+        {
+            "imported": True,
+            "imported_at": int(time.time()),
+            "collection": new_name,
+            "local_index_version": get_index_version(),
+        }
+    )
+    _write_json(SNAPSHOT_STATE_FILE, state)
+
+    return {"status": "imported", "seconds": round(time.perf_counter() - t0, 2), **state}
+
+
+def index_identity() -> Dict[str, Any]:
+    """
+    What this node serves. `snapshot_id` is comparable across replicas;
+    `matches_snapshot` turns False once the index is written after import/export.
+    """
+    state = current_snapshot() or {}
+    version = get_index_version()
+    return {
+        "index_version": version,
+        "collection": get_active_collection_name(),
+        "snapshot_id": state.get("snapshot_id"),
+        "snapshot_created_at": state.get("created_at"),
+        "matches_snapshot": bool(state) and state.get("local_index_version") == version,
+    }
+
+
+def import_on_startup() -> Optional[Dict[str, Any]]:
+    """If SNAPSHOT_PATH is set, make sure this node serves that bundle."""
+    bundle = os.getenv("SNAPSHOT_PATH", "").strip()
+    if not bundle:
+        return None
+    res = import_snapshot(bundle)
+    print(f"Snapshot {res.get('snapshot_id')}: {res.get('status')}")
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export/import a portable index snapshot")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export")
+    ex.add_argument("out_dir")
+    ex.add_argument("--no-pdfs", action="store_true", help="Skip PDFs (replicas then can't serve /pdf)")
+    im = sub.add_parser("import")
+    im.add_argument("bundle")
+    im.add_argument("--force", action="store_true", help="Re-import even if already serving this snapshot_id")
+    vf = sub.add_parser("verify")
+    vf.add_argument("bundle")
+    args = ap.parse_args()
+
+    if args.cmd == "verify":
+        m = verify_snapshot(args.bundle)
+        print(f"OK snapshot_id={m['snapshot_id']} chunks={m['chunks']} documents={m['documents']}")
+        return
+
+    claim_writer()
+    if args.cmd == "export":
+        res = export_snapshot(args.out_dir, include_pdfs=not args.no_pdfs)
+    else:
+        res = import_snapshot(args.bundle, force=args.force)
+    json.dump(res, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
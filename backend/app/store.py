@@ -1,18 +1,249 @@
 import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
 from chromadb import PersistentClient
 
+from .locks import acquire, LockHeld
+
 # backend/app -> backend/
 BASE_DIR = os.path.join(os.path.dirname(__file__), "..")
 DATA_DIR = os.path.join(BASE_DIR, "data")
 DOCS_DIR = os.path.join(DATA_DIR, "docs")
 CHROMA_DIR = os.path.join(DATA_DIR, "chroma")
+# Side indexes that live next to a collection (dedup signatures, ...)
+INDEXES_DIR = os.path.join(DATA_DIR, "indexes")
+
+# Which collection queries/ingest use; swapped atomically by compaction
+ACTIVE_COLLECTION_FILE = os.path.join(DATA_DIR, "active_collection.json")
+DEFAULT_COLLECTION = "reports"
+# Bumped after every committed index write; query workers reload when it changes
+INDEX_VERSION_FILE = os.path.join(DATA_DIR, "index_version.json")
+# Chunking the corpus is built with: uploads use it, a re-index changes it
+CHUNKING_FILE = os.path.join(DATA_DIR, "chunking.json")
+DEFAULT_CHUNKING = {"chunk_size": 1800, "chunk_overlap": 250}
+WRITER_LOCK_FILE = os.path.join(DATA_DIR, "writer.lock")
 
 os.makedirs(DOCS_DIR, exist_ok=True)
 os.makedirs(CHROMA_DIR, exist_ok=True)
+os.makedirs(INDEXES_DIR, exist_ok=True)
+
+# Held by anything that writes the index (upload, delete, compaction)
+WRITE_LOCK = threading.Lock()
+
+# APP_ROLE: "all" (single process, default), "writer" (owns ingest/index writes),
+# "query" (read-only /chat workers; write endpoints are proxied to WRITER_URL)
+def app_role() -> str:
+    return os.getenv("APP_ROLE", "all").strip().lower()
+
+def is_query_role() -> bool:
+    return app_role() == "query"
+
+_writer_fd = None
+
+def claim_writer() -> None:
+    """Hold the writer lock for the life of this process; fails if another writer has it."""
+    global _writer_fd
+    if _writer_fd is not None:
+        return
+    try:
+        _writer_fd = acquire(WRITER_LOCK_FILE, blocking=False)
+    except LockHeld:
+        raise RuntimeError(
+            "Another process already owns index writes (data/writer.lock). "
+            "Run extra workers with APP_ROLE=query and WRITER_URL pointing at the writer."
+        )
+
+def get_index_version() -> int:
+    try:
+        with open(INDEX_VERSION_FILE, "r", encoding="utf-8") as f:
+            return int((json.load(f) or {}).get("version") or 0)
+    except (OSError, ValueError):
+        return 0
+
+def bump_index_version() -> int:
+    """Publish a new index version (write-then-rename so readers never see a partial file)."""
+    version = get_index_version() + 1
+    tmp = INDEX_VERSION_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "collection": get_active_collection_name(), "updated_at": time.time()}, f)
+    os.replace(tmp, INDEX_VERSION_FILE)
+    return version
+
+_client_lock = threading.Lock()
+_client_version = None
+_client_epoch = 0  # bumped whenever the Chroma System is rebuilt
+
+def _reset_chroma_cache() -> None:
+    # Chroma keeps one System (and in-memory HNSW segments) per path per process;
+    # dropping it makes the next client re-read what the writer committed.
+    try:
+        from chromadb.api.shared_system_client import SharedSystemClient
+    except ImportError:
+        from chromadb.api.client import SharedSystemClient
+    SharedSystemClient.clear_system_cache()
+
+
+class _SwapGate:
+    """
+    Readers are requests using the current Chroma System; a swap waits until
+    none is in flight and holds new ones back meanwhile, so clearing the
+    System never pulls it out from under a running query. Nested reads on
+    one thread count once.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.readers = 0
+        self.swapping = False
+        self.local = threading.local()
+
+    def depth(self) -> int:
+        return getattr(self.local, "depth", 0)
+
+    def enter(self) -> None:
+        if not self.depth():
+            with self.cond:
+                while self.swapping:
+                    self.cond.wait()
+                self.readers += 1
+        self.local.depth = self.depth() + 1
+
+    def leave(self) -> None:
+        self.local.depth = self.depth() - 1
+        if not self.depth():
+            with self.cond:
+                self.readers -= 1
+                if not self.readers:
+                    self.cond.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self.cond:
+            while self.swapping:
+                self.cond.wait()
+            self.swapping = True
+            while self.readers:
+                self.cond.wait()
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.swapping = False
+                self.cond.notify_all()
+
+
+_GATE = _SwapGate()
+
+def _sync_client_version() -> None:
+    """Query role: rebuild the Chroma System once the writer published a new index version."""
+    global _client_version, _client_epoch
+    version = get_index_version()
+    with _client_lock:
+        if _client_version is None:
+            _client_version = version
+        if version == _client_version:
+            return
+    with _GATE.exclusive():
+        with _client_lock:
+            if version != _client_version:
+                _reset_chroma_cache()
+                _client_version = version
+                _client_epoch += 1
+
+@contextmanager
+def index_reader():
+    """
+    Hold for the whole of a request that reads Chroma. In a query worker the
+    System is only swapped for a new index version between such requests,
+    never during one (a request that started on the old version finishes on it).
+    """
+    if is_query_role() and not _GATE.depth():
+        _sync_client_version()
+    _GATE.enter()
+    try:
+        yield
+    finally:
+        _GATE.leave()
+
+def client_epoch() -> int:
+    """Changes whenever collections fetched earlier belong to a dropped System."""
+    return _client_epoch
+
+def get_client():
+    if is_query_role() and not _GATE.depth():
+        _sync_client_version()
+    return PersistentClient(path=CHROMA_DIR)
+
+
+class ReadOnlyCollection:
+    """Collection proxy for query workers: reads pass through, writes raise."""
+
+    _WRITES = {"add", "upsert", "update", "delete", "modify"}
+
+    def __init__(self, col):
+        self._col = col
+
+    def __getattr__(self, name):
+        if name in self._WRITES:
+            raise RuntimeError(f"Collection.{name} is not allowed in a query worker (APP_ROLE=query)")
+        return getattr(self._col, name)
+
+def get_active_collection_name() -> str:
+    try:
+        with open(ACTIVE_COLLECTION_FILE, "r", encoding="utf-8") as f:
+            return (json.load(f) or {}).get("name") or DEFAULT_COLLECTION
+    except (OSError, ValueError):
+        return DEFAULT_COLLECTION
+
+def set_active_collection(name: str) -> None:
+    """Point readers at another collection (write-then-rename so it's atomic)."""
+    tmp = ACTIVE_COLLECTION_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"name": name}, f)
+    os.replace(tmp, ACTIVE_COLLECTION_FILE)
+    bump_index_version()
+
+def get_chunking() -> dict:
+    """{"chunk_size", "chunk_overlap"} of the current corpus (defaults until the first re-index)."""
+    try:
+        with open(CHUNKING_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f) or {}
+    except (OSError, ValueError):
+        data = {}
+    return {k: int(data.get(k) or v) for k, v in DEFAULT_CHUNKING.items()}
+
+def set_chunking(chunk_size: int, chunk_overlap: int) -> None:
+    tmp = CHUNKING_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"chunk_size": chunk_size, "chunk_overlap": chunk_overlap}, f)
+    os.replace(tmp, CHUNKING_FILE)
 
 def get_collection():
-    client = PersistentClient(path=CHROMA_DIR)
-    return client.get_or_create_collection(name="reports")
+    client = get_client()
+    name = get_active_collection_name()
+    if not is_query_role():
+        return client.get_or_create_collection(name=name)
+    # creating it is the writer's job; a query worker only opens what exists
+    try:
+        return ReadOnlyCollection(client.get_collection(name=name))
+    except Exception as e:
+        raise RuntimeError(f"Collection {name!r} does not exist yet; the writer creates it on first upload") from e
+
+def new_collection_name(current: str, tag: str = "") -> str:
+    """
+    Name for a rebuilt collection (compaction, re-index, snapshot import):
+    same base, unique suffix. The random part keeps two jobs started in the
+    same second from colliding in create_collection.
+    """
+    return f"{current.split('__')[0]}__{tag}{int(time.time())}-{uuid.uuid4().hex[:8]}"
+
+def get_index_dir(collection_name: str) -> str:
+    path = os.path.join(INDEXES_DIR, collection_name)
+    os.makedirs(path, exist_ok=True)
+    return path
 
 def get_paths():
     return {"docs_dir": DOCS_DIR, "chroma_dir": CHROMA_DIR}
\ No newline at end of file
@@ -0,0 +1,216 @@
+# backend/app/write_api.py
+"""
+Endpoints that write the index (upload, delete, compaction).
+
+Mounted directly by the single-process app (APP_ROLE=all) and by the writer
+process (app.writer). Query workers (APP_ROLE=query) mount `proxy_router`
+instead, which forwards the same paths to WRITER_URL.
+"""
+import os
+from typing import List, Optional
+
+import httpx
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+from .store import get_paths, bump_index_version, WRITE_LOCK
+from .registry import is_ready
+from .checkpoint import begin_document, ingest_document, UnreadableDocument, start_resume, pending_documents
+from .maintenance import delete_document, compact_index, start_job, run_job, job_status
+from .reindex import reindex
+from .snapshot import export_snapshot
+from .figures import backfill_figures
+from .bulk import safe_filename, stage_files, ingest_documents
+from .admission import admit
+
+
+router = APIRouter()
+
+
+def _acquire_write_lock():
+    # Compaction can hold the lock for a while; fail fast instead of stalling the event loop
+    if not WRITE_LOCK.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Index maintenance in progress, retry shortly")
+
+@router.post("/upload")
+async def upload(file: UploadFile = File(...)):
+    """
+    Checkpointed ingest (see app.checkpoint). doc_id is the content hash, so
+    re-uploading the same PDF returns the existing document, or resumes it if
+    an earlier attempt was interrupted.
+    """
+    safe_name = safe_filename(file.filename)
+
+    async with admit("ingest"):
+        data = await file.read()
+        _acquire_write_lock()
+        try:
+            entry, _ = await run_in_threadpool(begin_document, safe_name, data)
+            if is_ready(entry):
+                return {"status": "ok", "doc_id": entry["doc_id"], "doc_name": entry["doc_name"], "duplicate": True}
+
+            try:
+                res = await run_in_threadpool(ingest_document, entry)
+            except UnreadableDocument as e:
+                raise HTTPException(status_code=400, detail=f"Could not parse PDF: {e}")
+            except Exception as e:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Ingest stopped at a checkpoint ({e}); upload the same file again or POST /admin/resume to resume",
+                )
+            finally:
+                # committed batches are on disk either way (hidden until the doc is ready)
+                bump_index_version()
+        finally:
+            WRITE_LOCK.release()
+
+    return {"status": "ok", **res}
+
+@router.post("/upload/batch")
+async def upload_batch(files: List[UploadFile] = File(...), workers: Optional[int] = None):
+    """Ingest several PDFs at once: parallel parse/chunk, batched embedding (see app.bulk)."""
+    async with admit("ingest"):
+        payloads = [(safe_filename(f.filename), await f.read()) for f in files]
+        _acquire_write_lock()
+        try:
+            # hashing + writing the PDFs is blocking disk work: keep it off the event loop
+            docs, skipped = await run_in_threadpool(stage_files, payloads)
+            res = await run_in_threadpool(ingest_documents, docs, workers)
+        finally:
+            WRITE_LOCK.release()
+
+    res["results"].extend(skipped)
+    return {"status": "ok", "duplicates": len(skipped), **res}
+
+@router.post("/admin/resume")
+def resume():
+    """Retry every unfinished ("ingesting" / "failed") document from its last checkpoint."""
+    started = start_resume()
+    return {"status": "queued" if started else job_status("resume")["status"], "pending": pending_documents()}
+
+@router.get("/admin/resume")
+def resume_status():
+    """Progress of the job that finishes interrupted ingests, and what is still unfinished."""
+    return {**job_status("resume"), "pending": pending_documents()}
+
+@router.delete("/documents/{doc_id}")
+def delete_doc(doc_id: str):
+    """Remove a document's vectors, registry entry and PDF."""
+    _acquire_write_lock()
+    try:
+        res = delete_document(doc_id)
+        if res is not None:
+            bump_index_version()
+    finally:
+        WRITE_LOCK.release()
+    if res is None:
+        raise HTTPException(status_code=404, detail="Unknown doc_id")
+    return {"status": "ok", **res}
+
+@router.post("/admin/compact")
+def compact(background_tasks: BackgroundTasks):
+    """Rebuild the vector index in the background; poll GET /admin/compact for before/after stats."""
+    if not start_job("compact"):
+        raise HTTPException(status_code=409, detail="Compaction already running")
+    background_tasks.add_task(run_job, "compact", compact_index)
+    return {"status": "queued"}
+
+@router.get("/admin/compact")
+def compact_status():
+    return job_status("compact")
+
+@router.post("/admin/reindex")
+def start_reindex(
+    background_tasks: BackgroundTasks,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+    workers: Optional[int] = None,
+):
+    """
+    Re-chunk every document from the page-text cache into a fresh collection
+    (see app.reindex). Omitted parameters keep the corpus' current chunking.
+    """
+    if not start_job("reindex"):
+        raise HTTPException(status_code=409, detail="Re-index already running")
+    background_tasks.add_task(run_job, "reindex", reindex, chunk_size, chunk_overlap, workers)
+    return {"status": "queued"}
+
+@router.get("/admin/reindex")
+def reindex_status():
+    return job_status("reindex")
+
+@router.post("/admin/figures")
+def start_figures_backfill(background_tasks: BackgroundTasks):
+    """Build table/figure files for ready documents that have none (see app.figures)."""
+    if not start_job("figures"):
+        raise HTTPException(status_code=409, detail="Figure backfill already running")
+    background_tasks.add_task(run_job, "figures", backfill_figures)
+    return {"status": "queued"}
+
+@router.get("/admin/figures")
+def figures_backfill_status():
+    return job_status("figures")
+
+@router.post("/admin/snapshot")
+def start_snapshot(background_tasks: BackgroundTasks, include_pdfs: bool = True):
+    """Export a snapshot bundle into SNAPSHOT_DIR (see app.snapshot)."""
+    if not start_job("snapshot"):
+        raise HTTPException(status_code=409, detail="Snapshot export already running")
+    out_dir = os.getenv("SNAPSHOT_DIR", os.path.join(os.path.dirname(get_paths()["docs_dir"]), "snapshots"))
+    background_tasks.add_task(run_job, "snapshot", export_snapshot, out_dir, include_pdfs)
+    return {"status": "queued", "out_dir": out_dir}
+
+@router.get("/admin/snapshot")
+def snapshot_status():
+    return job_status("snapshot")
+
+
+# ---------------------------
+# Query-worker proxy
+# ---------------------------
+
+proxy_router = APIRouter()
+
+# (path, methods) served by the writer process
+WRITE_ROUTES = [
+    ("/upload", ["POST"]),
+    ("/upload/batch", ["POST"]),
+    ("/documents/{doc_id}", ["DELETE"]),
+    ("/admin/compact", ["GET", "POST"]),
+    ("/admin/reindex", ["GET", "POST"]),
+    ("/admin/snapshot", ["GET", "POST"]),
+    ("/admin/resume", ["GET", "POST"]),
+    ("/admin/figures", ["GET", "POST"]),
+]
+
+_HOP_HEADERS = {"host", "content-length", "connection", "transfer-encoding", "content-encoding"}
+
+
+def _writer_url() -> str:
+    return os.getenv("WRITER_URL", "http://127.0.0.1:8001").rstrip("/")
+
+
+async def _forward(request: Request) -> Response:
+    url = _writer_url() + request.url.path
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in _HOP_HEADERS}
+    body = await request.body()
+    timeout = float(os.getenv("WRITER_TIMEOUT", "600"))
+
+    try:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            resp = await client.request(
+                request.method,
+                url,
+                params=request.query_params,
+                content=body,
+                headers=headers,
+            )
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=503, detail=f"Writer unavailable at {_writer_url()}: {e}")
+
+    out_headers = {k: v for k, v in resp.headers.items() if k.lower() not in _HOP_HEADERS}
+    return Response(content=resp.content, status_code=resp.status_code, headers=out_headers)
+
+
+for _path, _methods in WRITE_ROUTES:
+    proxy_router.add_api_route(_path, _forward, methods=_methods, include_in_schema=False)
@@ -0,0 +1,56 @@
+# backend/app/writer.py
+"""
+Dedicated index-writer process for multi-worker deployments.
+
+    APP_ROLE=writer uvicorn app.writer:app --port 8001 --workers 1
+    APP_ROLE=query WRITER_URL=http://127.0.0.1:8001 uvicorn app.main:app --port 8000 --workers 4
+
+Only this process ingests, deletes and compacts; it holds data/writer.lock so a
+second writer refuses to start. Query workers open the index read-only and
+reload whenever data/index_version.json changes.
+"""
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from fastapi import FastAPI
+
+ENV_PATH = Path(__file__).resolve().parents[2] / ".env"
+if ENV_PATH.exists():
+    load_dotenv(dotenv_path=ENV_PATH, override=True)
+
+os.environ.setdefault("APP_ROLE", "writer")
+
+from .store import get_collection, get_index_version, claim_writer, is_query_role  # noqa: E402
+from .write_api import router as write_router  # noqa: E402
+from .snapshot import import_on_startup, index_identity  # noqa: E402
+from .checkpoint import resume_on_startup  # noqa: E402
+from .admission import admission_stats  # noqa: E402
+
+app = FastAPI(title="Market Outlook RAG (writer)")
+app.include_router(write_router)
+
+@app.on_event("startup")
+def _claim_writer():
+    if is_query_role():
+        raise RuntimeError("app.writer cannot run with APP_ROLE=query")
+    claim_writer()
+    import_on_startup()
+    resume_on_startup()
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "role": "writer"}
+
+@app.get("/stats")
+def stats():
+    return {"chunks_indexed": get_collection().count(), "index_version": get_index_version()}
+
+@app.get("/index/version")
+def index_version():
+    return index_identity()
+
+@app.get("/admission/stats")
+def admission_stats_endpoint():
+    """Ingest queue depth and wait times on the writer."""
+    return admission_stats()
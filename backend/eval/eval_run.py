@@ -1,6 +1,7 @@
 import csv
 import json
 import re
+import time
 import argparse
 from typing import List, Dict, Any, Optional
 
@@ -8,6 +9,7 @@ import requests
 
 
 CITE_RE = re.compile(r"\(p\.\s*\d+\)", re.IGNORECASE)
+INSUFFICIENT_INFO = "Not enough information in the provided excerpts."
 
 
 def has_citations(text: str) -> bool:
@@ -37,15 +39,78 @@ def citation_coverage(answer: str) -> float:
     return cited / len(lines)
 
 
+def best_distance(res: Dict[str, Any]) -> Optional[float]:
+    ev = res.get("evidence") or {}
+    if ev.get("best_distance") is not None:
+        return float(ev["best_distance"])
+    dists = [s.get("distance") for s in (res.get("sources") or []) if s.get("distance") is not None]
+    return min(dists) if dists else None
+
+
+def answer_is_insufficient(answer: str) -> bool:
+    """
+    True if the ANSWER section is just the insufficient-info sentence
+    (whether the backend gated it or enforce_citations blanked it).
+    """
+    m = re.search(r"ANSWER:\s*(.*?)(?:\n\s*\n|KEY THEMES:|$)", answer or "", re.DOTALL)
+    body = (m.group(1) if m else answer or "").strip()
+    return body == INSUFFICIENT_INFO
+
+
+def print_relevance_calibration(rows: List[Dict[str, Any]]) -> None:
+    """
+    Report how RELEVANCE_MAX_DISTANCE would behave on this question set.
+    Grounded = answered with citations; the threshold should sit above all of those.
+
+    Only questions the model actually answered count: a gated question is
+    "insufficient" because of the current threshold, so including it would
+    just confirm that threshold. Run with --calibrate to answer every question.
+    """
+    answered = [r for r in rows if r["best_distance"] != "" and not r["gated"]]
+    grounded = [r["best_distance"] for r in answered if not r["insufficient"]]
+    insufficient = [r["best_distance"] for r in answered if r["insufficient"]]
+    all_d = sorted(grounded + insufficient)
+    n_gated = sum(1 for r in rows if r["gated"])
+
+    print("\nRelevance gate calibration (best distance per question):")
+    if n_gated:
+        print(f"  {n_gated}/{len(rows)} questions were gated by the backend and are left out; rerun with --calibrate")
+    if not all_d:
+        print("  no distances returned")
+        return
+
+    print(f"  grounded answers:     n={len(grounded)} max={max(grounded) if grounded else '-'}")
+    print(f"  insufficient answers: n={len(insufficient)} min={min(insufficient) if insufficient else '-'}")
+
+    lo, hi = all_d[0], all_d[-1]
+    steps = 8
+    for i in range(steps + 1):
+        t = lo + (hi - lo) * i / steps
+        kept = sum(1 for d in grounded if d <= t)
+        gated = sum(1 for d in insufficient if d > t)
+        print(
+            f"  threshold={t:.3f}  keeps {kept}/{len(grounded)} grounded  "
+            f"skips {gated}/{len(insufficient)} insufficient"
+        )
+
+    if grounded and not n_gated:
+        print(f"  suggested RELEVANCE_MAX_DISTANCE >= {max(grounded) + 0.05:.3f}")
+
+
 def get_docs(base_url: str) -> List[Dict[str, Any]]:
     r = requests.get(f"{base_url}/documents", timeout=30)
     r.raise_for_status()
     return r.json()
 
 
-def ask(base_url: str, question: str, doc_ids: List[str], route: bool = True) -> Dict[str, Any]:
-    payload = {"question": question, "doc_ids": doc_ids, "route": route}
-    r = requests.post(f"{base_url}/chat", json=payload, timeout=180)
+def ask(base_url: str, question: str, doc_ids: List[str], route: bool = True, gate: bool = True) -> Dict[str, Any]:
+    # lowest admission class: an eval run never crowds out interactive chat
+    payload = {"question": question, "doc_ids": doc_ids, "route": route, "kind": "batch", "relevance_gate": gate}
+    for _ in range(5):
+        r = requests.post(f"{base_url}/chat", json=payload, timeout=180)
+        if r.status_code != 429:
+            break
+        time.sleep(float(r.headers.get("Retry-After", "5")))
     r.raise_for_status()
     return r.json()
 
@@ -55,6 +120,11 @@ def main():
     ap.add_argument("--base-url", default="http://localhost:8000", help="Backend base URL")
     ap.add_argument("--out", default="results.csv", help="Output CSV filename")
     ap.add_argument("--route", action="store_true", help="Enable router for eval questions")
+    ap.add_argument(
+        "--calibrate",
+        action="store_true",
+        help="Bypass the relevance gate so every question is answered (unbiased RELEVANCE_MAX_DISTANCE calibration)",
+    )
     ap.add_argument("--doc-ids", default="", help="Comma-separated doc_ids to evaluate (blank = all docs)")
     ap.add_argument("--questions", default="", help="Path to questions.json (optional)")
     args = ap.parse_args()
@@ -93,9 +163,10 @@ def main():
     rows = []
     for i, q in enumerate(questions, start=1):
         print(f"[{i}/{len(questions)}] {q}")
-        res = ask(base_url, q, doc_ids=doc_ids, route=args.route)
+        res = ask(base_url, q, doc_ids=doc_ids, route=args.route, gate=not args.calibrate)
         ans = res.get("answer", "")
         sources = res.get("sources", []) or []
+        best = best_distance(res)
 
         row = {
             "question": q,
@@ -104,6 +175,9 @@ def main():
             "answer_has_citations": has_citations(ans),
             "citation_coverage": round(citation_coverage(ans), 3),
             "distinct_pages_cited": distinct_pages_from_sources(sources),
+            "best_distance": round(best, 4) if best is not None else "",
+            "gated": bool((res.get("evidence") or {}).get("gated")),
+            "insufficient": answer_is_insufficient(ans),
             "answer": ans,
         }
         rows.append(row)
@@ -118,12 +192,16 @@ def main():
                 "answer_has_citations",
                 "citation_coverage",
                 "distinct_pages_cited",
+                "best_distance",
+                "gated",
+                "insufficient",
                 "answer",
             ],
         )
         w.writeheader()
         w.writerows(rows)
 
+    print_relevance_calibration(rows)
     print(f"\nWrote {args.out} with {len(rows)} rows.")
 
 
@@ -0,0 +1,94 @@
+"""
+Local stub for the OpenAI-compatible and Ollama endpoints, for exercising
+LLM failover, hedging and circuit breakers without a real model.
+
+    python eval/llm_stub.py --port 9100 --delay 0.2 --jitter 2.0 --tail-rate 0.05 --error-rate 0.1
+
+    LLM_PROVIDERS=OPENAI,OLLAMA,MOCK
+    OPENAI_API_KEY=stub
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1
+    OLLAMA_HOST=http://127.0.0.1:9101      # a second stub instance
+
+Then watch GET /llm/stats while running eval_run.py.
+"""
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+ANSWER = (
+    "ANSWER:\nThe report expects private credit to keep growing (p.1).\n\n"
+    "KEY THEMES:\n- Private credit growth (p.1)\n\n"
+    "WHAT TO FOCUS ON IN 2026:\n- Manager selection (p.1)\n\n"
+    "GAPS:\n- Missing: default forecasts. Look for: credit outlook section."
+)
+
+
+def make_handler(args):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *a):
+            if args.verbose:
+                super().log_message(fmt, *a)
+
+        def _reply(self, code: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+
+            delay = args.delay
+            if random.random() < args.tail_rate:
+                delay += args.jitter
+            time.sleep(delay)
+
+            if random.random() < args.error_rate:
+                self._reply(503, {"error": {"message": "stub: injected failure"}})
+                return
+
+            if self.path.rstrip("/").endswith("/chat/completions"):
+                self._reply(
+                    200,
+                    {
+                        "id": "stub",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": "stub",
+                        "choices": [
+                            {"index": 0, "message": {"role": "assistant", "content": ANSWER}, "finish_reason": "stop"}
+                        ],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                    },
+                )
+            elif self.path.rstrip("/").endswith("/api/generate"):
+                self._reply(200, {"model": "stub", "response": ANSWER, "done": True})
+            else:
+                self._reply(404, {"error": f"unknown path {self.path}"})
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=9100)
+    ap.add_argument("--delay", type=float, default=0.2, help="Base latency (s)")
+    ap.add_argument("--jitter", type=float, default=0.0, help="Extra latency (s) added to tail requests")
+    ap.add_argument("--tail-rate", type=float, default=0.0, help="Fraction of requests that get --jitter")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args))
+    print(f"LLM stub on http://127.0.0.1:{args.port} (OpenAI: /v1/chat/completions, Ollama: /api/generate)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+In-process retrieval sweep: recall / MRR vs latency / memory per parameter setting.
+
+No HTTP and no LLM: chunks every ingested document with chunk_pages, indexes
+each chunking setting into a scratch collection, and calls rag.retrieve
+directly against a labelled question -> page set.
+
+    cd backend
+    python eval/retrieval_sweep.py --labels eval/labels.json \
+        --k 8,14,20 --per-doc auto,4,8 --n-raw auto,60 \
+        --chunk-size 1200,1800 --chunk-overlap 150,250 --min-recall 0.8 --repeats 5
+
+labels.json:
+
+    [
+      {"question": "What does it say about secondaries?", "doc": "outlook_2026.pdf", "pages": [4, 5]},
+      {"question": "Private credit default outlook", "doc": "<doc_id>", "pages": [12], "scoped": false}
+    ]
+
+`doc` is a doc_name or doc_id from the registry; `scoped` (default true)
+restricts retrieval to that document, like a doc-scoped chat. "auto" for
+--per-doc / --n-raw means the formulas rag.retrieve uses by default.
+
+Each setting starts with one untimed warm-up query (first HNSW / BM25 load,
+caches), then times every labelled question --repeats times; p50/p95 are
+over all samples. Memory is the process RSS, which includes Chroma's native
+index (tracemalloc only sees Python allocations): rss_mb after the setting,
+rss_delta_mb over it, and peak_rss_mb, the process high-water mark so far.
+
+Scratch collections are built with the same dedup/BM25 side indexes as a real
+ingest and deleted afterwards. Embedding them costs one pass over the corpus
+per chunking setting; the writer lock is taken, so stop the API first.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+import itertools
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.store import claim_writer, get_client, get_index_dir  # noqa: E402
+from app.ingest import extract_pages, chunk_pages, IndexBatch  # noqa: E402
+from app.rag import retrieve  # noqa: E402
+from app import pagecache, registry  # noqa: E402
+
+
+SCRATCH_PREFIX = "sweep"
+
+
+def parse_grid(value: str, allow_auto: bool = False) -> List[Optional[int]]:
+    out: List[Optional[int]] = []
+    for part in value.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        if part == "auto" and allow_auto:
+            out.append(None)
+        else:
+            out.append(int(part))
+    return out
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    vals = sorted(values)
+    idx = min(len(vals) - 1, max(0, int(round(pct / 100.0 * (len(vals) - 1)))))
+    return vals[idx]
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size now (Linux /proc); None elsewhere."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Process RSS high-water mark; ru_maxrss is KB on Linux, bytes on macOS."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def _mb(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+def load_labels(path: str, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    by_name = {d["doc_name"]: d["doc_id"] for d in docs}
+    known = {d["doc_id"] for d in docs}
+    with open(path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+
+    labels = []
+    for item in items:
+        ref = item["doc"]
+        doc_id = ref if ref in known else by_name.get(ref)
+        if doc_id is None:
+            raise SystemExit(f"Unknown doc in labels: {ref!r}")
+        labels.append(
+            {
+                "question": item["question"],
+                "doc_id": doc_id,
+                "relevant": {(doc_id, int(p)) for p in item["pages"]},
+                "scoped": item.get("scoped", True),
+            }
+        )
+    return labels
+
+
+def load_pages(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    pages = pagecache.read_pages(doc["doc_id"])
+    return pages if pages is not None else extract_pages(doc["pdf_path"])
+
+
+def build_scratch(
+    docs: List[Dict[str, Any]],
+    pages: Dict[str, List[Dict[str, Any]]],
+    chunk_size: int,
+    chunk_overlap: int,
+) -> Tuple[Any, Dict[str, Any]]:
+    client = get_client()
+    name = f"{SCRATCH_PREFIX}-cs{chunk_size}-co{chunk_overlap}"
+    try:
+        client.delete_collection(name=name)
+    except Exception:
+        pass
+    shutil.rmtree(get_index_dir(name), ignore_errors=True)
+    col = client.create_collection(name=name)
+
+    t0 = time.perf_counter()
+    batch = IndexBatch(col)
+    n_chunks = 0
+    for doc in docs:
+        chunks = chunk_pages(pages[doc["doc_id"]], chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        n_chunks += len(chunks)
+        batch.add_document(chunks, doc["doc_id"], doc["doc_name"])
+    batch.flush()
+    return col, {"chunks": n_chunks, "index_s": round(time.perf_counter() - t0, 2)}
+
+
+def drop_scratch(col) -> None:
+    get_client().delete_collection(name=col.name)
+    shutil.rmtree(get_index_dir(col.name), ignore_errors=True)
+
+
+def _locations(source: Dict[str, Any]) -> set:
+    """(doc_id, page) pairs a source covers, including pages it was deduplicated from."""
+    meta = source.get("metadata") or {}
+    locs = {(meta.get("doc_id"), meta.get("page"))}
+    locs.update((a.get("doc_id"), a.get("page")) for a in source.get("also_in") or [])
+    return locs
+
+
+def score(sources: List[Dict[str, Any]], relevant: set) -> Tuple[float, float]:
+    """(recall@k, reciprocal rank of the first relevant source)."""
+    found: set = set()
+    rr = 0.0
+    for rank, s in enumerate(sources, start=1):
+        locs = _locations(s)
+        if not rr and relevant & locs:
+            rr = 1.0 / rank
+        found |= locs
+    return len(relevant & found) / len(relevant), rr
+
+
+def run_setting(
+    col, labels: List[Dict[str, Any]], k: int, per_doc, n_raw, mode: str, repeats: int = 1
+) -> Dict[str, Any]:
+    def kwargs(lab: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(k=k, doc_ids=[lab["doc_id"]] if lab["scoped"] else None, mode=mode, per_doc=per_doc, n_raw=n_raw, col=col)
+
+    # untimed: the first query of a setting pays for loading the index and filling caches
+    retrieve(labels[0]["question"], **kwargs(labels[0]))
+    rss_before = current_rss_mb()
+
+    recalls, rrs, latencies = [], [], []
+    for lab in labels:
+        sources: List[Dict[str, Any]] = []
+        for _ in range(max(1, repeats)):
+            t0 = time.perf_counter()
+            sources = retrieve(lab["question"], **kwargs(lab))
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+
+        recall, rr = score(sources, lab["relevant"])
+        recalls.append(recall)
+        rrs.append(rr)
+
+    n = len(labels)
+    rss_after, peak = current_rss_mb(), peak_rss_mb()
+    if rss_after is not None:
+        # the kernel updates ru_maxrss lazily, so it can trail the RSS just read
+        peak = max(peak or 0.0, rss_after)
+    return {
+        "recall_at_k": round(sum(recalls) / n, 4),
+        "mrr": round(sum(rrs) / n, 4),
+        "samples": len(latencies),
+        "latency_ms_p50": round(percentile(latencies, 50), 2),
+        "latency_ms_p95": round(percentile(latencies, 95), 2),
+        "rss_mb": _mb(rss_after),
+        "rss_delta_mb": _mb(rss_after - rss_before) if rss_after is not None and rss_before is not None else None,
+        "peak_rss_mb": _mb(peak),
+    }
+
+
+FIELDS = [
+    "chunk_size",
+    "chunk_overlap",
+    "chunks",
+    "mode",
+    "k",
+    "per_doc",
+    "n_raw",
+    "recall_at_k",
+    "mrr",
+    "samples",
+    "latency_ms_p50",
+    "latency_ms_p95",
+    "rss_mb",
+    "rss_delta_mb",
+    "peak_rss_mb",
+]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sweep retrieval parameters against labelled question -> page pairs")
+    ap.add_argument("--labels", required=True, help="JSON list of {question, doc, pages[, scoped]}")
+    ap.add_argument("--k", default="8,14,20")
+    ap.add_argument("--per-doc", default="auto", help="Doc-scoped candidates per doc ('auto' = max(4, k//n+2))")
+    ap.add_argument("--n-raw", default="auto", help="Global candidates ('auto' = max(30, k*4))")
+    ap.add_argument("--chunk-size", default="1800")
+    ap.add_argument("--chunk-overlap", default="250")
+    ap.add_argument("--modes", default="vector", help="Comma-separated retrieval modes (vector,hybrid,lexical,auto)")
+    ap.add_argument("--repeats", type=int, default=3, help="Timed runs per question (after one warm-up query per setting)")
+    ap.add_argument("--min-recall", type=float, default=0.8, help="Quality bar for the recommendation")
+    ap.add_argument("--out", default="retrieval_sweep.csv")
+    args = ap.parse_args()
+
+    # Scratch collections are not partitioned; keep retrieve() on the collection we pass
+    os.environ["PARTITION_MODE"] = "off"
+    claim_writer()
+
+    docs = [d for d in registry.list_docs() if registry.is_ready(d)]
+    if not docs:
+        raise SystemExit("No documents in the registry. Upload PDFs first.")
+    labels = load_labels(args.labels, docs)
+    pages = {d["doc_id"]: load_pages(d) for d in docs}
+
+    ks = parse_grid(args.k)
+    per_docs = parse_grid(args.per_doc, allow_auto=True)
+    n_raws = parse_grid(args.n_raw, allow_auto=True)
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+
+    rows = []
+    for cs, co in itertools.product(parse_grid(args.chunk_size), parse_grid(args.chunk_overlap)):
+        if co >= cs:
+            continue
+        col, built = build_scratch(docs, pages, cs, co)
+        print(f"chunk_size={cs} chunk_overlap={co}: {built['chunks']} chunks indexed in {built['index_s']}s")
+        try:
+            for mode, k, pd, nr in itertools.product(modes, ks, per_docs, n_raws):
+                res = run_setting(col, labels, k, pd, nr, mode, repeats=args.repeats)
+                row = {
+                    "chunk_size": cs,
+                    "chunk_overlap": co,
+                    "chunks": built["chunks"],
+                    "mode": mode,
+                    "k": k,
+                    "per_doc": "auto" if pd is None else pd,
+                    "n_raw": "auto" if nr is None else nr,
+                    **res,
+                }
+                rows.append(row)
+                print(
+                    f"  {mode:7s} k={k:<3} per_doc={row['per_doc']:<4} n_raw={row['n_raw']:<4} "
+                    f"recall@k={res['recall_at_k']:.3f} mrr={res['mrr']:.3f} "
+                    f"p50={res['latency_ms_p50']}ms p95={res['latency_ms_p95']}ms rss={res['rss_mb']}MB peak={res['peak_rss_mb']}MB"
+                )
+        finally:
+            drop_scratch(col)
+
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        w.writerows(rows)
+    print(f"\nWrote {args.out} with {len(rows)} settings ({len(labels)} labelled questions).")
+
+    passing = [r for r in rows if r["recall_at_k"] >= args.min_recall]
+    if passing:
+        best = min(passing, key=lambda r: (r["latency_ms_p95"], -r["recall_at_k"]))
+        print(f"Fastest setting with recall@k >= {args.min_recall}: {best}")
+    else:
+        top = max(rows, key=lambda r: r["recall_at_k"]) if rows else None
+        print(f"No setting reaches recall@k >= {args.min_recall}; best recall: {top}")
+
+
+if __name__ == "__main__":
+    main()
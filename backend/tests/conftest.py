@@ -0,0 +1,122 @@
+# backend/tests/conftest.py
+import os
+import random
+import re
+import sys
+import zlib
+
+import numpy as np
+import pytest
+
+# `python -m pytest` from backend/ puts it on sys.path; a bare `pytest` may not
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+WORDS = (
+    "private credit fundraising slowed higher base rates lifted yields direct lenders secondaries volumes "
+    "record continuation vehicles portfolio sales lending grew buyout sponsors liquidity exits reopen "
+    "infrastructure debt spreads tightened insurers allocations europe real estate valuations adjusting "
+    "regime transaction stayed low allocators expect dispersion managers widen favour operating expertise "
+    "inflation outlook growth risk default recovery leverage covenants pricing discounts demand supply"
+).split()
+
+
+def prose(topic: str, words: int = 400) -> str:
+    """A page of report-like text; the same topic always gives the same text, different topics don't overlap."""
+    rng = random.Random(topic)
+    out = []
+    for i in range(words):
+        out.append(rng.choice(WORDS))
+        if i % 12 == 11:
+            out[-1] += "."
+    return " ".join(out).capitalize()
+
+
+def make_pdf(path, pages) -> bytes:
+    """Write a PDF with one text page per string; returns its bytes."""
+    import fitz
+
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), text, fontsize=7)
+    doc.save(str(path))
+    doc.close()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _hash_embed(texts):
+    # Deterministic bag-of-words vectors: the tests check index plumbing, not embedding
+    # quality, and must not depend on Chroma downloading its ONNX model.
+    out = []
+    for text in texts:
+        v = np.zeros(128, dtype=np.float32)
+        for word in re.findall(r"\w+", (text or "").lower()):
+            v[zlib.crc32(word.encode()) % 128] += 1.0
+        norm = np.linalg.norm(v)
+        out.append(v / norm if norm else v)
+    return out
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    A fresh backend/data in tmp_path: every module-level path points there and
+    the per-process caches (side indexes, partitions, Chroma System) start empty.
+    """
+    from chromadb.utils import embedding_functions
+    from app import store, pagecache, figures, snapshot, maintenance, dedup, lexical, partitions, rag
+
+    monkeypatch.setattr(embedding_functions.DefaultEmbeddingFunction, "__init__", lambda self, *a, **k: None)
+    monkeypatch.setattr(embedding_functions.DefaultEmbeddingFunction, "__call__", lambda self, input: _hash_embed(input))
+
+    root = tmp_path / "data"
+    for sub in ("docs", "chroma", "indexes", "pages", "figures"):
+        (root / sub).mkdir(parents=True)
+    paths = {
+        "DATA_DIR": root,
+        "DOCS_DIR": root / "docs",
+        "CHROMA_DIR": root / "chroma",
+        "INDEXES_DIR": root / "indexes",
+        "ACTIVE_COLLECTION_FILE": root / "active_collection.json",
+        "INDEX_VERSION_FILE": root / "index_version.json",
+        "CHUNKING_FILE": root / "chunking.json",
+        "WRITER_LOCK_FILE": root / "writer.lock",
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(store, name, str(path))
+    monkeypatch.setattr(maintenance, "CHROMA_DIR", str(root / "chroma"))
+    monkeypatch.setattr(pagecache, "PAGES_DIR", str(root / "pages"))
+    monkeypatch.setattr(figures, "FIGURES_DIR", str(root / "figures"))
+    monkeypatch.setattr(snapshot, "PAGES_DIR", str(root / "pages"))
+    monkeypatch.setattr(snapshot, "FIGURES_DIR", str(root / "figures"))
+    monkeypatch.setattr(snapshot, "SNAPSHOT_STATE_FILE", str(root / "snapshot.json"))
+
+    monkeypatch.setattr(dedup, "_INDEXES", {})
+    monkeypatch.setattr(lexical, "_INDEXES", {})
+    monkeypatch.setattr(partitions, "_CACHE", {})
+    monkeypatch.setattr(rag, "_SHARED_CACHE", {})
+    monkeypatch.setattr(figures, "_CACHE", {})
+    monkeypatch.setattr(store, "_client_version", None)
+    monkeypatch.delenv("APP_ROLE", raising=False)
+
+    yield root
+    store._reset_chroma_cache()
+
+
+@pytest.fixture
+def upload(data_dir, tmp_path):
+    """upload(name, pages) -> ingest result, through the same path as POST /upload."""
+    from app.checkpoint import begin_document, ingest_document
+    from app.store import WRITE_LOCK, bump_index_version
+
+    def _upload(name, pages, **kwargs):
+        data = make_pdf(tmp_path / name, pages)
+        with WRITE_LOCK:
+            entry, _ = begin_document(name, data, **kwargs)
+            res = ingest_document(entry)
+            bump_index_version()
+        return res
+
+    return _upload
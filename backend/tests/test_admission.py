@@ -0,0 +1,80 @@
+# backend/tests/test_admission.py
+import asyncio
+
+import pytest
+
+from app.admission import AdmissionController, Overloaded, chat_class
+
+
+def test_chat_class_without_keys_trusts_the_request(monkeypatch):
+    monkeypatch.delenv("ADMISSION_KEYS", raising=False)
+    assert chat_class("chat") == "chat"
+    assert chat_class("summary") == "summary"
+    assert chat_class("batch") == "batch"
+    assert chat_class(None) == "chat"
+
+
+def test_chat_class_key_sets_the_ceiling(monkeypatch):
+    monkeypatch.setenv("ADMISSION_KEYS", "ui:chat,scripts:summary")
+    monkeypatch.delenv("ADMISSION_UNTRUSTED_CLASS", raising=False)
+
+    assert chat_class("chat", "ui") == "chat"
+    assert chat_class("chat", "scripts") == "summary"
+    assert chat_class("batch", "ui") == "batch"  # asking for less is always allowed
+    assert chat_class("chat") == "batch"
+    assert chat_class("chat", "guess") == "batch"
+
+    monkeypatch.setenv("ADMISSION_UNTRUSTED_CLASS", "summary")
+    assert chat_class("chat") == "summary"
+
+
+def test_higher_priority_waiter_goes_first(monkeypatch):
+    monkeypatch.setenv("ADMISSION_SLOTS_BATCH", "1")
+
+    async def scenario():
+        ctl = AdmissionController(capacity=1)
+        order = []
+
+        async def request(kind, hold):
+            await ctl.acquire(kind)
+            order.append(kind)
+            await asyncio.sleep(hold)
+            ctl.release(kind, hold)
+
+        first = asyncio.create_task(request("batch", 0.05))
+        await asyncio.sleep(0.01)
+        # both queue behind the running batch request; chat is served first
+        queued = [asyncio.create_task(request("batch", 0)), asyncio.create_task(request("chat", 0))]
+        await asyncio.gather(first, *queued)
+        return order
+
+    assert asyncio.run(scenario()) == ["batch", "chat", "batch"]
+
+
+def test_full_queue_is_rejected(monkeypatch):
+    monkeypatch.setenv("ADMISSION_QUEUE_CHAT", "0")
+
+    async def scenario():
+        ctl = AdmissionController(capacity=1)
+        await ctl.acquire("chat")
+        with pytest.raises(Overloaded) as e:
+            await ctl.acquire("chat")
+        assert e.value.reason == "queue full" and e.value.retry_after >= 1
+        ctl.release("chat", 0.01)
+        assert ctl.snapshot()["classes"]["chat"]["rejected_full"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_wait_limit_is_enforced(monkeypatch):
+    monkeypatch.setenv("ADMISSION_MAX_WAIT_SUMMARY", "0.05")
+
+    async def scenario():
+        ctl = AdmissionController(capacity=1)
+        await ctl.acquire("chat")
+        with pytest.raises(Overloaded) as e:
+            await ctl.acquire("summary")
+        assert e.value.reason == "queue wait exceeded"
+        assert ctl.snapshot()["queued"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,80 @@
+# backend/tests/test_bulk.py
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import make_pdf, prose
+
+
+@pytest.fixture
+def bulk(data_dir, monkeypatch):
+    from app import bulk as bulk_mod
+
+    # spawned workers would not see the temporary data dir; threads run the same prepare_doc
+    monkeypatch.setattr(bulk_mod, "prepare_pool", lambda workers=None: ThreadPoolExecutor(max_workers=2))
+    return bulk_mod
+
+
+def _stage(bulk, tmp_path, files):
+    from app.store import WRITE_LOCK
+
+    payloads = []
+    for name, pages in files:
+        data = make_pdf(tmp_path / name, pages) if pages else b"%PDF-1.7 truncated upload"
+        payloads.append((name, data))
+    with WRITE_LOCK:
+        return bulk.stage_files(payloads)
+
+
+def _ingest(bulk, docs):
+    from app.store import WRITE_LOCK
+
+    with WRITE_LOCK:
+        return bulk.ingest_documents(docs, workers=2)
+
+
+def test_unreadable_pdf_is_dropped_others_kept(bulk, tmp_path):
+    from app import registry
+    from app.store import get_collection
+
+    docs, skipped = _stage(bulk, tmp_path, [("a.pdf", [prose("alpha")]), ("broken.pdf", None), ("b.pdf", [prose("beta")])])
+    assert len(docs) == 3 and not skipped
+
+    res = _ingest(bulk, docs)
+    status = {r["doc_name"]: r["status"] for r in res["results"]}
+    assert status == {"a.pdf": "ok", "broken.pdf": "error", "b.pdf": "ok"}
+    assert res["documents"] == 2 and res["failed"] == 1
+
+    names = {d["doc_name"]: d for d in registry.list_docs()}
+    assert set(names) == {"a.pdf", "b.pdf"}
+    assert all(registry.is_ready(d) for d in names.values())
+    # table/figure files come out of the same pool, saved by the writer
+    assert all(d["figures"] == "ready" for d in names.values())
+    stored = {md["doc_id"] for md in get_collection().get(include=["metadatas"])["metadatas"]}
+    assert stored == {names["a.pdf"]["doc_id"], names["b.pdf"]["doc_id"]}
+
+
+def test_other_failures_stay_resumable(bulk, tmp_path, monkeypatch):
+    from app import registry
+    from app.checkpoint import resume_pending
+    from app.store import WRITE_LOCK
+
+    real = bulk.prepare_doc
+
+    def flaky(doc, *args):
+        if doc["doc_name"] == "b.pdf":
+            raise OSError("No space left on device")
+        return real(doc, *args)
+
+    monkeypatch.setattr(bulk, "prepare_doc", flaky)
+    docs, _ = _stage(bulk, tmp_path, [("a.pdf", [prose("alpha")]), ("b.pdf", [prose("beta")])])
+    res = _ingest(bulk, docs)
+    assert res["documents"] == 1 and res["failed"] == 1
+
+    b = next(d for d in registry.list_docs() if d["doc_name"] == "b.pdf")
+    assert b["status"] == "failed" and "No space" in b["error"]
+    assert registry.hidden_doc_ids() == [b["doc_id"]]
+
+    with WRITE_LOCK:
+        assert resume_pending()["resumed"] == 1
+    assert registry.is_ready(registry.get_doc(b["doc_id"]))
@@ -0,0 +1,65 @@
+# backend/tests/test_checkpoint.py
+import pytest
+from chromadb.utils import embedding_functions
+
+from conftest import _hash_embed, make_pdf, prose
+
+
+def test_doc_id_is_the_content_hash(data_dir, tmp_path):
+    from app import registry
+    from app.checkpoint import begin_document, content_doc_id
+    from app.store import WRITE_LOCK
+
+    data = make_pdf(tmp_path / "a.pdf", [prose("alpha")])
+    other = make_pdf(tmp_path / "b.pdf", [prose("beta")])
+    assert content_doc_id(data) == content_doc_id(bytes(data))
+    assert content_doc_id(data) != content_doc_id(other)
+
+    with WRITE_LOCK:
+        entry, is_new = begin_document("a.pdf", data)
+        again, again_new = begin_document("renamed copy.pdf", data)
+    assert is_new and not again_new
+    assert again["doc_id"] == entry["doc_id"] == content_doc_id(data)
+    assert len(registry.list_docs()) == 1
+
+
+def test_resume_starts_after_the_last_committed_batch(data_dir, tmp_path, monkeypatch):
+    from app import registry
+    from app.checkpoint import begin_document, ingest_document, resume_pending
+    from app.store import WRITE_LOCK, get_collection
+
+    calls = []
+
+    def embed_then_crash(self, input):
+        calls.append(len(input))
+        if len(calls) == 3:
+            raise ConnectionError("embedding backend went away")
+        return _hash_embed(input)
+
+    monkeypatch.setattr(embedding_functions.DefaultEmbeddingFunction, "__call__", embed_then_crash)
+    data = make_pdf(tmp_path / "a.pdf", [prose(f"page {i}", 500) for i in range(4)])
+    with WRITE_LOCK:
+        entry, _ = begin_document("a.pdf", data)
+        with pytest.raises(ConnectionError):
+            ingest_document(entry, batch_size=2)
+
+    entry = registry.get_doc(entry["doc_id"])
+    committed, total = entry["chunks_committed"], entry["chunks_total"]
+    assert entry["status"] == "failed" and "went away" in entry["error"]
+    assert committed == 4 and total > committed
+    assert registry.hidden_doc_ids() == [entry["doc_id"]]
+    first_ids = set(get_collection().get(include=[])["ids"])
+    assert len(first_ids) == committed
+
+    monkeypatch.setattr(embedding_functions.DefaultEmbeddingFunction, "__call__", lambda self, input: _hash_embed(input))
+    with WRITE_LOCK:
+        res = resume_pending(batch_size=2)
+    assert res["resumed"] == 1
+    assert res["documents"][0]["resumed_from"] == committed
+
+    entry = registry.get_doc(entry["doc_id"])
+    assert entry["status"] == "ready" and entry["chunks_committed"] == total
+    ids = set(get_collection().get(include=[])["ids"])
+    # deterministic ids: the committed batches were kept, not re-added under new ids
+    assert len(ids) == total and first_ids <= ids
+    assert not registry.hidden_doc_ids()
@@ -0,0 +1,113 @@
+# backend/tests/test_dedup.py
+from app.dedup import DedupIndex, DedupStage, link_near_duplicates, minhash, resolve_aliases, similarity
+from app.journal import Journal
+
+
+TEXT = (
+    "Private credit fundraising slowed in 2025 as higher base rates lifted all-in yields, "
+    "while secondaries volumes reached a record on continuation vehicles and LP portfolio sales."
+)
+OTHER = "Infrastructure debt spreads tightened as insurers increased allocations to long-dated assets in Europe."
+
+
+def _chunk(cid, text, doc_id, page=1):
+    return {"id": cid, "text": text, "metadata": {"doc_id": doc_id, "doc_name": f"{doc_id}.pdf", "page": page}}
+
+
+def test_minhash_similarity():
+    assert similarity(minhash(TEXT), minhash(TEXT)) == 1.0
+    assert similarity(minhash(TEXT), minhash(TEXT + " Outlook remains constructive.")) > 0.7
+    assert similarity(minhash(TEXT), minhash(OTHER)) < 0.2
+
+
+def test_near_duplicate_is_linked_not_embedded(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.json"))
+    stage = DedupStage(index)
+
+    unique, links = link_near_duplicates([_chunk("a1", TEXT, "a"), _chunk("a2", OTHER, "a")], stage)
+    assert [c["id"] for c in unique] == ["a1", "a2"] and links == []
+
+    # caught from the stage before anything is committed
+    unique, links = link_near_duplicates([_chunk("b1", TEXT, "b", page=3)], stage)
+    assert unique == []
+    assert links == [("a1", {"doc_id": "b", "doc_name": "b.pdf", "page": 3})]
+
+    stage.commit()
+    assert index.find(minhash(TEXT)) == "a1"
+    assert index.linked_chunks("b") == ["a1"]
+
+
+def test_failed_batch_leaves_nothing_behind(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.json"))
+    stage = DedupStage(index)
+    link_near_duplicates([_chunk("a1", TEXT, "a")], stage)
+    stage.clear()  # upsert failed
+
+    assert index.signatures == {}
+    unique, _ = link_near_duplicates([_chunk("a1", TEXT, "a")], DedupStage(index))
+    assert [c["id"] for c in unique] == ["a1"]
+
+
+def test_index_survives_reload(tmp_path):
+    path = str(tmp_path / "dedup.json")
+    index = DedupIndex(path)
+    index.add("a1", minhash(TEXT))
+    index.link("a1", {"doc_id": "b", "doc_name": "b.pdf", "page": 2})
+    index.save()
+
+    reloaded = DedupIndex(path)
+    assert reloaded.find(minhash(TEXT)) == "a1"
+    assert reloaded.aliases_for("a1") == [{"doc_id": "b", "doc_name": "b.pdf", "page": 2}]
+    assert reloaded.linked_chunks("b") == ["a1"]
+
+
+def test_remove_doc_promotes_shared_canonical(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.json"))
+    index.add("a1", minhash(TEXT))
+    index.add("a2", minhash(OTHER))
+    index.link("a1", {"doc_id": "b", "doc_name": "b.pdf", "page": 2})
+    index.link("a1", {"doc_id": "c", "doc_name": "c.pdf", "page": 5})
+
+    promoted = index.remove_doc("a", ["a1", "a2"])
+    assert promoted == {"a1": {"doc_id": "b", "doc_name": "b.pdf", "page": 2}}
+    assert index.find(minhash(OTHER)) is None
+    assert index.find(minhash(TEXT)) == "a1"
+    assert index.aliases_for("a1") == [{"doc_id": "c", "doc_name": "c.pdf", "page": 5}]
+    assert index.linked_chunks("b") == []
+
+    index.save()  # a removal writes a full snapshot
+    assert DedupIndex(index.path).aliases_for("a1") == [{"doc_id": "c", "doc_name": "c.pdf", "page": 5}]
+
+
+def test_resolve_aliases_skips_hidden_docs(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.json"))
+    index.add("a1", minhash(TEXT))
+    index.link("a1", {"doc_id": "b", "doc_name": "b.pdf", "page": 2})
+    index.link("a1", {"doc_id": "c", "doc_name": "c.pdf", "page": 5})
+    source = {"id": "a1", "text": TEXT, "metadata": {"doc_id": "a", "doc_name": "a.pdf", "page": 1}}
+
+    res = resolve_aliases(source, index)
+    assert [a["doc_id"] for a in res["also_in"]] == ["b", "c"]
+
+    # owner still ingesting: cite the first visible alias instead
+    res = resolve_aliases(source, index, hidden={"a"})
+    assert res["metadata"]["doc_id"] == "b" and res["metadata"]["page"] == 2
+    assert "a" not in [x["doc_id"] for x in res.get("also_in") or []]
+
+
+def test_journal_skips_torn_tail_and_replayed_ops(tmp_path):
+    path = str(tmp_path / "side.json")
+    journal = Journal(path)
+    journal.append([{"op": "add", "id": "x"}, {"op": "add", "id": "y"}])
+    with open(journal.log_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "id": "tor')  # crash mid-append
+
+    snapshot, ops = Journal(path).read()
+    assert snapshot == {} and [op["id"] for op in ops] == ["x", "y"]
+
+    journal = Journal(path)
+    journal.read()
+    journal.append([{"op": "add", "id": "z"}])
+    journal.rewrite({"items": ["x", "y", "z"]})
+    snapshot, ops = Journal(path).read()
+    assert snapshot["items"] == ["x", "y", "z"] and ops == []
@@ -0,0 +1,98 @@
+# backend/tests/test_failover.py
+import time
+import itertools
+
+import pytest
+
+from app.failover import CircuitBreaker, call_with_failover, provider_stats
+
+_names = itertools.count()
+
+
+def _name(prefix: str) -> str:
+    # stats and breakers are process-wide, keyed by provider name
+    return f"TEST{prefix}{next(_names)}"
+
+
+def _fail(timeout: float) -> str:
+    raise ConnectionError("refused")
+
+
+def test_fails_over_to_next_provider():
+    first, second = _name("DOWN"), _name("UP")
+    assert call_with_failover([(first, _fail), (second, lambda t: "answer")]) == "answer"
+
+    stats = provider_stats()
+    assert stats[first]["errors"] == 1
+    assert stats[second]["wins"] == 1
+
+
+def test_slow_provider_times_out(monkeypatch):
+    slow, fast = _name("SLOW"), _name("FAST")
+    monkeypatch.setenv(f"LLM_TIMEOUT_{slow}", "0.2")
+
+    t0 = time.monotonic()
+    assert call_with_failover([(slow, lambda t: time.sleep(2) or "late"), (fast, lambda t: "on time")]) == "on time"
+    assert time.monotonic() - t0 < 1.5
+
+
+def test_all_failing_raises_with_every_error():
+    a, b = _name("A"), _name("B")
+    with pytest.raises(RuntimeError) as e:
+        call_with_failover([(a, _fail), (b, _fail)])
+    assert a in str(e.value) and b in str(e.value)
+
+
+def test_breaker_opens_and_half_opens(monkeypatch):
+    monkeypatch.setenv("LLM_BREAKER_FAILURES", "2")
+    monkeypatch.setenv("LLM_BREAKER_COOLDOWN", "0.1")
+    breaker = CircuitBreaker()
+
+    breaker.failure()
+    assert breaker.state() == "closed"
+    breaker.failure()
+    assert breaker.state() == "open" and not breaker.allow()
+
+    time.sleep(0.15)
+    assert breaker.state() == "half_open"
+    assert breaker.allow() and not breaker.allow()  # one trial call at a time
+    breaker.success()
+    assert breaker.state() == "closed"
+
+
+def test_open_breaker_is_skipped(monkeypatch):
+    monkeypatch.setenv("LLM_BREAKER_FAILURES", "1")
+    monkeypatch.setenv("LLM_BREAKER_COOLDOWN", "60")
+    flaky, backup = _name("FLAKY"), _name("BACKUP")
+    calls = []
+
+    def flaky_fn(timeout):
+        calls.append(1)
+        raise ConnectionError("refused")
+
+    providers = [(flaky, flaky_fn), (backup, lambda t: "ok")]
+    assert call_with_failover(providers) == "ok"
+    assert call_with_failover(providers) == "ok"
+    assert len(calls) == 1
+    assert provider_stats()[flaky]["breaker"] == "open"
+
+
+def test_slow_primary_is_hedged(monkeypatch):
+    from app.failover import _get
+
+    monkeypatch.setenv("LLM_HEDGE_MIN_SAMPLES", "5")
+    monkeypatch.setenv("LLM_HEDGE_MIN_DELAY", "0.05")
+    primary, secondary = _name("USUALLYFAST"), _name("HEDGE")
+    stats, _ = _get(primary)
+    for _ in range(5):
+        stats.record(True, 0.02)  # learned p95: 20 ms, so hedge after the 50 ms floor
+
+    t0 = time.monotonic()
+    result = call_with_failover([(primary, lambda t: time.sleep(1) or "late"), (secondary, lambda t: "hedged")])
+    assert result == "hedged"
+    assert time.monotonic() - t0 < 0.8
+
+    out = provider_stats()
+    assert out[secondary]["hedges_started"] == 1
+    assert out[secondary]["wins"] == 1
+    assert out[primary]["wins"] == 0
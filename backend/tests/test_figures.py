@@ -0,0 +1,115 @@
+# backend/tests/test_figures.py
+import pytest
+
+from app import figures, rag
+from app.figures import _text_rows, lookup, write_figures
+from conftest import prose
+
+
+CHART = """Private credit fundraising
+Direct lending 2024 82.5
+Direct lending 2025 64.0
+Default rate 2025 3.1%
+Mezzanine
+12.4"""
+
+
+@pytest.fixture
+def figures_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(figures, "FIGURES_DIR", str(tmp_path))
+    monkeypatch.setattr(rag, "get_doc", lambda doc_id: None)
+    return tmp_path
+
+
+def test_text_rows_label_values():
+    rows = _text_rows(7, CHART)
+    got = [(r["label"], r["column"], r["value"]) for r in rows]
+    assert got == [
+        ("Private credit fundraising: Direct lending", "2024", "82.5"),
+        ("Private credit fundraising: Direct lending", "2025", "64.0"),
+        ("Private credit fundraising: Default rate", "2025", "3.1%"),
+        ("Private credit fundraising: Mezzanine", "", "12.4"),  # bare number inherits the label above
+    ]
+    assert all(r["page"] == 7 and r["source"] == "figure" for r in rows)
+    assert rows[2]["number"] == 3.1
+
+
+def test_lookup_filters_and_ranks(figures_dir):
+    write_figures("d1", _text_rows(7, CHART))
+    write_figures("d2", _text_rows(2, "Buyout multiples\nEntry multiple 2025 11.2x"))
+
+    rows = lookup(["d1", "d2"], keywords=["default", "rate"])
+    assert [(r["doc_id"], r["value"], r["hits"]) for r in rows] == [("d1", "3.1%", 2)]
+
+    assert {r["value"] for r in lookup(["d1"], keywords=["lending"], years=["2024"])} == {"82.5"}
+    assert {r["doc_id"] for r in lookup(["d1", "d2"], pages=[2])} == {"d2"}
+    assert len(lookup(["d1", "d2"])) == 5  # no filter: every row
+    assert lookup(["d1"], keywords=["infrastructure"]) == []
+
+
+def test_lookup_figures_strength(figures_dir, monkeypatch):
+    write_figures("d1", _text_rows(7, CHART))
+    monkeypatch.delenv("FIGURE_LOOKUP", raising=False)
+
+    rows, strong = rag.lookup_figures("How high was the default rate in 2025?", ["d1"])
+    assert strong and [r["value"] for r in rows] == ["3.1%"]
+
+    rows, strong = rag.lookup_figures("List the figures mentioned in the report", ["d1"])
+    assert strong and len(rows) == 4
+
+    # only one of the question's keywords matched: usable, but not a substitute for retrieval evidence
+    rows, strong = rag.lookup_figures("How large is mezzanine versus unitranche, sponsor, covenant?", ["d1"])
+    assert rows and not strong
+
+    assert rag.lookup_figures("Summarise the 2026 outlook", ["d1"]) == ([], False)
+    # a metric word alone is no figure cue
+    assert rag.lookup_figures("What is the outlook for default rates in 2025?", ["d1"]) == ([], False)
+
+
+def test_quantitative_cues():
+    for q in ("How many deals closed?", "Spreads above 300 bps", "What is on page 12?", "Share in %", "Show the tables"):
+        assert rag.is_quantitative(q), q
+    for q in ("Summarise the 2026 outlook", "Why did fundraising slow?", "Default rate trends in 2025"):
+        assert not rag.is_quantitative(q), q
+
+
+def test_lookup_never_builds(figures_dir):
+    # no file: no figures, and nothing written on the query path
+    assert rag.lookup_figures("How many figures are there?", ["missing"]) == ([], False)
+    assert not figures.has_figures("missing")
+    assert list(figures_dir.iterdir()) == []
+
+
+def test_figure_sources_cite_by_page(figures_dir):
+    write_figures("d1", _text_rows(7, CHART))
+    sources = rag.figure_sources(lookup(["d1"], keywords=["lending"]), names={"d1": "outlook.pdf"})
+    assert len(sources) == 1
+    src = sources[0]
+    assert src["id"] == "fig:d1:7" and src["kind"] == "figures"
+    assert src["metadata"]["doc_name"] == "outlook.pdf" and src["metadata"]["page"] == 7
+    assert "Direct lending (2024): 82.5" in src["text"]
+
+
+def test_ingest_builds_figures_and_backfill_fills_gaps(upload, tmp_path):
+    from app import registry
+    from app.figures import backfill_figures, delete_figures, has_figures
+    from app.store import WRITE_LOCK
+
+    a = upload("a.pdf", [prose("alpha"), CHART])
+    entry = registry.get_doc(a["doc_id"])
+    assert has_figures(a["doc_id"])
+    assert entry["figures"] == "ready" and entry["figures_rows"] >= 3
+    assert {r["value"] for r in lookup([a["doc_id"]], keywords=["default"])} == {"3.1%"}
+
+    # an older upload without a file, and one whose extraction failed
+    delete_figures(a["doc_id"])
+    b = upload("b.pdf", [prose("beta")])
+    registry.update_doc(b["doc_id"], pdf_path=str(tmp_path / "gone.pdf"))
+    delete_figures(b["doc_id"])
+
+    with WRITE_LOCK:
+        res = backfill_figures()
+    assert res == {"documents": 2, "built": 1, "failed": 1}
+    assert has_figures(a["doc_id"]) and not has_figures(b["doc_id"])
+    failed = registry.get_doc(b["doc_id"])
+    assert failed["figures"] == "failed" and failed["figures_error"]
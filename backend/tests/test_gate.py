@@ -0,0 +1,66 @@
+# backend/tests/test_gate.py
+from app.rag import INSUFFICIENT_INFO, evidence_is_weak, insufficient_evidence_response
+
+
+def test_no_sources_is_weak():
+    assert evidence_is_weak([])
+
+
+def test_vector_distance_decides(monkeypatch):
+    monkeypatch.setenv("RELEVANCE_MAX_DISTANCE", "1.0")
+    assert not evidence_is_weak([{"distance": 1.4}, {"distance": 0.8}])
+    assert evidence_is_weak([{"distance": 1.4}, {"distance": 1.2}])
+    # a weak keyword score does not override a close vector hit
+    assert not evidence_is_weak([{"distance": 0.5, "bm25_norm": 0.01}])
+
+    monkeypatch.setenv("RELEVANCE_MAX_DISTANCE", "0")
+    assert not evidence_is_weak([{"distance": 3.9}])
+
+
+def test_lexical_only_hits_use_bm25(monkeypatch):
+    monkeypatch.setenv("LEXICAL_MIN_SCORE", "0.2")
+    assert evidence_is_weak([{"bm25": 1.1, "bm25_norm": 0.05}])
+    assert not evidence_is_weak([{"bm25": 9.0, "bm25_norm": 0.45}])
+
+    monkeypatch.setenv("LEXICAL_MIN_SCORE", "0")
+    assert not evidence_is_weak([{"bm25": 1.1, "bm25_norm": 0.05}])
+
+
+def test_insufficient_evidence_response(monkeypatch):
+    monkeypatch.setenv("RELEVANCE_MAX_DISTANCE", "1.0")
+    sources = [{"id": "c1", "distance": 1.7}]
+    res = insufficient_evidence_response(sources)
+
+    assert res["answer"].startswith("ANSWER:\n" + INSUFFICIENT_INFO)
+    for header in ("KEY THEMES:", "WHAT TO FOCUS ON IN 2026:", "GAPS:"):
+        assert header in res["answer"]
+    assert res["sources"] == sources
+    assert res["evidence"]["gated"] and res["evidence"]["quality"] == "LOW"
+    assert res["evidence"]["best_distance"] == 1.7
+    assert "1.700" in res["evidence"]["notes"]
+
+    lexical = insufficient_evidence_response([{"id": "c1", "bm25_norm": 0.05}])
+    assert lexical["evidence"]["best_distance"] is None
+    assert "keyword" in lexical["evidence"]["notes"]
+
+
+def test_gate_is_off_until_calibrated(monkeypatch):
+    monkeypatch.delenv("RELEVANCE_MAX_DISTANCE", raising=False)
+    assert not evidence_is_weak([{"distance": 3.5}])
+
+
+def test_calibration_ignores_gated_questions(capsys):
+    from eval.eval_run import print_relevance_calibration
+
+    rows = [
+        {"best_distance": 0.9, "gated": False, "insufficient": False},
+        {"best_distance": 1.2, "gated": False, "insufficient": False},
+        {"best_distance": 1.5, "gated": False, "insufficient": True},
+    ]
+    print_relevance_calibration(rows)
+    assert "suggested RELEVANCE_MAX_DISTANCE >= 1.250" in capsys.readouterr().out
+
+    # a gated question is only "insufficient" because of the current threshold: no suggestion from it
+    print_relevance_calibration(rows + [{"best_distance": 1.1, "gated": True, "insufficient": True}])
+    out = capsys.readouterr().out
+    assert "1/4 questions were gated" in out and "suggested" not in out
@@ -0,0 +1,63 @@
+# backend/tests/test_history.py
+from app import history
+from app.history import build_history, estimate_tokens
+
+
+def _conversation(turns: int):
+    out = []
+    for i in range(turns):
+        out.append({"role": "user", "content": f"Question {i} about private credit?"})
+        out.append({"role": "assistant", "content": f"ANSWER:\nAnswer {i} first. Second sentence. Third one.\n\nGAPS:\n- none"})
+    return out
+
+
+def test_recent_turns_verbatim_older_compacted(monkeypatch):
+    monkeypatch.setenv("HISTORY_RECENT_TURNS", "2")
+    res = build_history(_conversation(3))
+
+    assert [m["content"] for m in res["recent"]] == [
+        "Question 2 about private credit?",
+        "ANSWER:\nAnswer 2 first. Second sentence. Third one.\n\nGAPS:\n- none",
+    ]
+    assert res["summary"].splitlines()[:2] == [
+        "User asked: Question 0 about private credit?",
+        "Assistant answered: Answer 0 first. Second sentence.",
+    ]
+
+
+def test_summary_fits_the_budget(monkeypatch):
+    monkeypatch.setenv("HISTORY_RECENT_TURNS", "2")
+    monkeypatch.setenv("HISTORY_TOKEN_BUDGET", "120")
+    res = build_history(_conversation(20))
+
+    used = estimate_tokens(res["summary"]) + sum(estimate_tokens(m["content"]) for m in res["recent"])
+    assert used <= 120
+    # oldest lines go first
+    assert "Question 18" in res["summary"] and "Question 0 " not in res["summary"]
+
+
+def test_cache_only_compacts_new_turns(monkeypatch):
+    monkeypatch.setenv("HISTORY_RECENT_TURNS", "2")
+    compacted = []
+    real = history.compact_turn
+    monkeypatch.setattr(history, "compact_turn", lambda turn: compacted.append(turn) or real(turn))
+
+    conv = _conversation(4)
+    first = build_history(conv, conversation_id="conv-cache")
+    assert len(compacted) == 6
+
+    compacted.clear()
+    second = build_history(conv + _conversation(5)[8:], conversation_id="conv-cache")
+    assert len(compacted) == 2
+    assert second["summary"].startswith(first["summary"])
+
+
+def test_cache_rebuilds_when_history_diverges(monkeypatch):
+    monkeypatch.setenv("HISTORY_RECENT_TURNS", "2")
+    conv = _conversation(4)
+    build_history(conv, conversation_id="conv-diverge")
+
+    # different conversation reusing the id: the last compacted turn no longer matches
+    other = [{"role": m["role"], "content": m["content"].replace("Question", "Query").replace("Answer", "Reply")} for m in conv]
+    res = build_history(other, conversation_id="conv-diverge")
+    assert "Question" not in res["summary"] and "Answer 0" not in res["summary"]
@@ -0,0 +1,25 @@
+# backend/tests/test_lean.py
+from app.rag import LEAN_METADATA_KEYS, lean_sources
+
+
+def test_lean_sources_keep_only_what_the_panel_shows():
+    text = "Secondaries volumes reached a record in 2025. " * 20
+    full = [
+        {
+            "id": "c1",
+            "text": text,
+            "metadata": {"doc_id": "a", "doc_name": "a.pdf", "page": 4, "chunk_index": 7, "source_path": "/x/a.pdf"},
+            "distance": 0.42,
+            "bm25": 7.1,
+            "also_in": [{"doc_id": "b", "doc_name": "b.pdf", "page": 9}],
+        },
+        {"id": "c2", "text": "Short chunk.", "snippet": "Short chunk.", "metadata": {"doc_id": "b", "page": 1}},
+    ]
+
+    lean = lean_sources(full)
+    assert [set(s) for s in lean] == [{"id", "snippet", "metadata", "distance", "also_in"}] * 2
+    assert lean[0]["metadata"] == {"doc_id": "a", "doc_name": "a.pdf", "page": 4}
+    assert set(lean[0]["metadata"]) <= set(LEAN_METADATA_KEYS)
+    assert lean[0]["also_in"] == [{"doc_id": "b", "doc_name": "b.pdf", "page": 9}]
+    assert 0 < len(lean[0]["snippet"]) < len(text)
+    assert lean[1] == {"id": "c2", "snippet": "Short chunk.", "metadata": {"doc_id": "b", "page": 1}, "distance": None, "also_in": []}
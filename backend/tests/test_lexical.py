@@ -0,0 +1,84 @@
+# backend/tests/test_lexical.py
+from app.lexical import LexicalIndex, is_keyword_query, tokenize
+from app.rag import _rrf_merge
+
+
+def _index(tmp_path):
+    idx = LexicalIndex(str(tmp_path / "lexical.json"))
+    idx.add("c1", "Secondaries volumes hit a record as LPs sold portfolios.", ["a"])
+    idx.add("c2", "NAV lending grew quickly among buyout funds.", ["a", "b"])
+    idx.add("c3", "Infrastructure debt spreads tightened in Europe.", ["b"])
+    return idx
+
+
+def _src(cid, doc_id="a", page=1, **fields):
+    return {"id": cid, "metadata": {"doc_id": doc_id, "page": page}, **fields}
+
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("What does the report say about NAV lending?") == ["nav", "lending"]
+
+
+def test_search_ranks_and_filters(tmp_path):
+    idx = _index(tmp_path)
+    assert [cid for cid, _, _ in idx.search("secondaries")] == ["c1"]
+    assert [cid for cid, _, _ in idx.search("NAV lending", doc_ids=["b"])] == ["c2"]
+    assert idx.search("NAV lending", doc_ids=["c"]) == []
+    # a chunk only excluded docs contain is skipped; one another doc also holds is kept
+    assert [cid for cid, _, _ in idx.search("spreads lending", exclude_doc_ids=["b"])] == ["c2"]
+
+
+def test_max_score_bounds_search_scores(tmp_path):
+    idx = _index(tmp_path)
+    for query in ("secondaries", "NAV lending", "spreads Europe"):
+        top = idx.search(query)[0][1]
+        assert 0 < top / idx.max_score(query) < 1
+
+
+def test_persistence_and_remove_doc(tmp_path):
+    idx = _index(tmp_path)
+    idx.add_doc("c3", "c")
+    idx.save()
+
+    reloaded = LexicalIndex(idx.path)
+    assert reloaded.live == 3
+    assert [cid for cid, _, _ in reloaded.search("spreads", doc_ids=["c"])] == ["c3"]
+
+    reloaded.remove_doc("a")
+    reloaded.save()
+    reloaded = LexicalIndex(idx.path)
+    assert reloaded.search("secondaries") == []
+    assert [cid for cid, _, _ in reloaded.search("NAV lending")] == ["c2"]  # b still holds it
+
+
+def test_backfill_from_collection(tmp_path):
+    class FakeCollection:
+        def get(self, include, limit, offset):
+            rows = [
+                ("c1", "Secondaries volumes hit a record.", {"doc_id": "a"}),
+                ("c2", "NAV lending grew quickly.", {"doc_id": "b"}),
+            ][offset : offset + limit]
+            return {"ids": [r[0] for r in rows], "documents": [r[1] for r in rows], "metadatas": [r[2] for r in rows]}
+
+    idx = LexicalIndex(str(tmp_path / "lexical.json"))
+    aliases = {"c2": [{"doc_id": "c", "page": 4}]}
+    assert idx.backfill(FakeCollection(), lambda cid: aliases.get(cid, []), batch=1) == 2
+    assert idx.search("lending")[0][2] == ["b", "c"]
+    assert idx.rewrite
+
+
+def test_keyword_queries():
+    assert is_keyword_query("EPMM")
+    assert is_keyword_query('"continuation vehicle pricing discount"')
+    assert not is_keyword_query("How did private credit fundraising change over the past year?")
+
+
+def test_rrf_merge_fuses_and_keeps_scores():
+    vector = [_src("v1", distance=0.4), _src("both", distance=0.6)]
+    lexical = [_src("both", bm25=7.0, bm25_norm=0.5), _src("l1", bm25=3.0, bm25_norm=0.2)]
+
+    merged = _rrf_merge(vector, lexical)
+    assert [s["id"] for s in merged] == ["both", "v1", "l1"]
+    assert merged[0]["distance"] == 0.6 and merged[0]["bm25_norm"] == 0.5
+    # same chunk on another page (dedup alias) is a separate result
+    assert len(_rrf_merge([_src("x", page=1)], [_src("x", page=2)])) == 2
@@ -0,0 +1,49 @@
+# backend/tests/test_maintenance.py
+from conftest import prose
+
+from app.dedup import get_dedup_index
+from app.maintenance import compact_index, delete_document
+from app.store import WRITE_LOCK, get_active_collection_name, get_collection
+from app import registry
+
+
+def test_delete_promotes_shared_canonicals(upload):
+    a = upload("a.pdf", [prose("alpha"), prose("shared")])
+    b = upload("b.pdf", [prose("beta"), prose("shared")])
+    assert b["duplicates_linked"] > 0
+
+    col = get_collection()
+    owned_by_a = set(col.get(where={"doc_id": a["doc_id"]}, include=[])["ids"])
+    shared = set(get_dedup_index(col.name).linked_chunks(b["doc_id"]))
+    assert shared and shared <= owned_by_a
+
+    with WRITE_LOCK:
+        res = delete_document(a["doc_id"])
+    assert res["chunks_reassigned"] == len(shared)
+    assert res["chunks_deleted"] == len(owned_by_a) - len(shared)
+
+    col = get_collection()
+    assert col.get(where={"doc_id": a["doc_id"]}, include=[])["ids"] == []
+    promoted = col.get(ids=sorted(shared), include=["metadatas"])["metadatas"]
+    assert {(m["doc_id"], m["page"]) for m in promoted} == {(b["doc_id"], 2)}
+    assert get_dedup_index(col.name).linked_chunks(b["doc_id"]) == []
+    assert registry.get_doc(a["doc_id"]) is None
+
+    with WRITE_LOCK:
+        assert delete_document(a["doc_id"]) is None
+
+
+def test_compact_keeps_every_chunk(upload):
+    upload("a.pdf", [prose("alpha"), prose("shared")])
+    b = upload("b.pdf", [prose("beta"), prose("shared")])
+    old_name = get_active_collection_name()
+    before = get_collection().count()
+    linked_before = set(get_dedup_index(old_name).linked_chunks(b["doc_id"]))
+
+    with WRITE_LOCK:
+        res = compact_index()
+
+    assert res["from"] == old_name and res["to"] == get_active_collection_name() != old_name
+    assert res["before"]["chunks"] == res["after"]["chunks"] == before == get_collection().count()
+    # side indexes follow the collection
+    assert set(get_dedup_index(res["to"]).linked_chunks(b["doc_id"])) == linked_before
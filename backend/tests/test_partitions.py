@@ -0,0 +1,42 @@
+# backend/tests/test_partitions.py
+from conftest import prose
+
+
+def test_doc_scoped_query_routes_to_the_partition(upload, monkeypatch):
+    from app import partitions, rag
+    from app.store import get_collection
+
+    monkeypatch.setenv("PARTITION_MODE", "doc")
+    a = upload("a.pdf", [prose("alpha"), prose("shared")])
+    b = upload("b.pdf", [prose("beta"), prose("shared")])
+
+    col = get_collection()
+    own_a = len(col.get(where={"doc_id": a["doc_id"]}, include=[])["ids"])
+    own_b = len(col.get(where={"doc_id": b["doc_id"]}, include=[])["ids"])
+    assert partitions.get_partition(a["doc_id"]).count() == own_a
+    # b's shared page is stored once, under a: b's partition carries that canonical too
+    assert b["duplicates_linked"] >= 1
+    assert partitions.get_partition(b["doc_id"]).count() == own_b + b["duplicates_linked"]
+
+    routed = []
+    real = rag.get_partition
+    monkeypatch.setattr(rag, "get_partition", lambda did: routed.append(did) or real(did))
+    via_partition = rag.retrieve(prose("shared")[:200], k=20, doc_id=b["doc_id"], mode="vector")
+    assert routed == [b["doc_id"]]
+    # the shared canonical is cited at b's own page, never at a
+    assert via_partition and all(s["metadata"]["doc_id"] == b["doc_id"] for s in via_partition)
+
+    # without the partition the shared collection (where + linked canonicals) gives the same hits
+    partitions.drop_partition(b["doc_id"])
+    fallback = rag.retrieve(prose("shared")[:200], k=20, doc_id=b["doc_id"], mode="vector")
+    assert {s["id"] for s in fallback} == {s["id"] for s in via_partition}
+
+
+def test_partitions_off_by_default(upload, monkeypatch):
+    from app import partitions
+
+    monkeypatch.delenv("PARTITION_MODE", raising=False)
+    a = upload("a.pdf", [prose("alpha")])
+    assert partitions.get_partition(a["doc_id"]) is None
+    monkeypatch.setenv("PARTITION_MODE", "doc")
+    assert partitions.get_partition(a["doc_id"]) is None  # never built while off
@@ -0,0 +1,61 @@
+# backend/tests/test_reindex.py
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import prose
+
+
+def _reindex(monkeypatch, **kwargs):
+    from app import reindex as reindex_mod
+    from app.store import WRITE_LOCK
+
+    # spawned workers would not see the temporary data dir; threads run the same prepare_doc
+    monkeypatch.setattr(reindex_mod, "prepare_pool", lambda workers=None: ThreadPoolExecutor(max_workers=2))
+    with WRITE_LOCK:
+        return reindex_mod.reindex(**kwargs)
+
+
+def test_reindex_keeps_upload_order(upload, monkeypatch):
+    from app import registry
+    from app.dedup import get_dedup_index
+    from app.store import get_collection
+
+    # the later upload sorts first by doc_id only if order were ignored
+    first = upload("zz-first.pdf", [prose("alpha"), prose("shared")])
+    second = upload("aa-second.pdf", [prose("beta"), prose("shared")])
+    registry.update_doc(first["doc_id"], uploaded_at=100)
+    registry.update_doc(second["doc_id"], uploaded_at=200)
+
+    _reindex(monkeypatch)
+
+    col = get_collection()
+    dedup = get_dedup_index(col.name)
+    dedup.load()
+    res = col.get(include=["metadatas"])
+    shared = [(cid, md) for cid, md in zip(res["ids"], res["metadatas"]) if dedup.aliases_for(cid)]
+    assert shared, "the shared page should be stored once and linked from the second doc"
+    for cid, md in shared:
+        assert md["doc_id"] == first["doc_id"]
+        assert [a["doc_id"] for a in dedup.aliases_for(cid)] == [second["doc_id"]]
+
+
+def test_reindex_persists_its_chunking(upload, monkeypatch):
+    from app import registry
+    from app.store import get_chunking
+
+    res = upload("a.pdf", [prose("alpha", 600), prose("beta", 600)])
+    before = registry.get_doc(res["doc_id"])["chunks_total"]
+
+    out = _reindex(monkeypatch, chunk_size=600, chunk_overlap=100)
+
+    assert get_chunking() == {"chunk_size": 600, "chunk_overlap": 100}
+    entry = registry.get_doc(res["doc_id"])
+    assert (entry["chunk_size"], entry["chunk_overlap"]) == (600, 100)
+    assert entry["chunks_total"] == entry["chunks_committed"] > before
+    assert out["chunk_size"] == 600
+
+    new = upload("b.pdf", [prose("gamma", 600)])
+    assert registry.get_doc(new["doc_id"])["chunk_size"] == 600
+
+    # no parameters: keep the corpus setting instead of falling back to 1800/250
+    _reindex(monkeypatch)
+    assert get_chunking() == {"chunk_size": 600, "chunk_overlap": 100}
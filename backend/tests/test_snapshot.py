@@ -0,0 +1,75 @@
+# backend/tests/test_snapshot.py
+import os
+
+import pytest
+
+from conftest import prose
+
+
+def _state():
+    from app import registry
+    from app.store import get_collection
+
+    res = get_collection().get(include=["documents", "metadatas"])
+    chunks = sorted(zip(res["ids"], res["documents"], [md["doc_id"] for md in res["metadatas"]]))
+    return chunks, sorted(d["doc_id"] for d in registry.list_docs())
+
+
+def test_snapshot_round_trip(upload, data_dir, tmp_path):
+    from app import registry
+    from app.maintenance import delete_document
+    from app.pagecache import read_pages
+    from app.snapshot import export_snapshot, import_snapshot, index_identity
+    from app.store import WRITE_LOCK, get_chunking, set_chunking
+
+    a = upload("a.pdf", [prose("alpha"), prose("shared")])
+    upload("b.pdf", [prose("beta"), prose("shared")])
+    set_chunking(1200, 150)
+    with WRITE_LOCK:
+        out = export_snapshot(str(tmp_path / "out"))
+    exported = _state()
+    assert out["chunks"] == len(exported[0]) and out["documents"] == 2
+
+    # the node moves on: one doc gone, another added, chunking changed
+    with WRITE_LOCK:
+        delete_document(a["doc_id"])
+    upload("c.pdf", [prose("gamma")])
+    set_chunking(900, 100)
+    assert _state() != exported
+
+    with WRITE_LOCK:
+        res = import_snapshot(out["path"])
+    assert res["status"] == "imported" and res["snapshot_id"] == out["snapshot_id"]
+    assert _state() == exported
+    assert get_chunking() == {"chunk_size": 1200, "chunk_overlap": 150}
+    assert read_pages(a["doc_id"]) is not None
+    # PDFs now live in this node's docs dir, whatever path the exporter had
+    for entry in registry.list_docs():
+        assert os.path.dirname(entry["pdf_path"]) == str(data_dir / "docs")
+        assert os.path.exists(entry["pdf_path"])
+    assert index_identity()["snapshot_id"] == out["snapshot_id"]
+    assert index_identity()["matches_snapshot"]
+
+    with WRITE_LOCK:
+        assert import_snapshot(out["path"])["status"] == "already_loaded"
+
+
+def test_verify_rejects_a_tampered_bundle(upload, tmp_path):
+    from app.snapshot import export_snapshot, import_snapshot, verify_snapshot
+    from app.store import WRITE_LOCK
+
+    upload("a.pdf", [prose("alpha")])
+    with WRITE_LOCK:
+        bundle = export_snapshot(str(tmp_path / "out"))["path"]
+    assert verify_snapshot(bundle)["chunks"]
+
+    before = _state()
+    with open(os.path.join(bundle, "documents.json"), "r+", encoding="utf-8") as f:
+        text = f.read()
+        f.seek(0)
+        f.write(text.replace("a", "b", 1))
+    with pytest.raises(RuntimeError, match="checksum mismatch: documents.json"):
+        verify_snapshot(bundle)
+    with WRITE_LOCK, pytest.raises(RuntimeError):
+        import_snapshot(bundle, force=True)
+    assert _state() == before
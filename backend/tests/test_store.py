@@ -0,0 +1,39 @@
+# backend/tests/test_store.py
+import pytest
+
+from conftest import prose
+
+
+def test_index_reader_picks_up_a_bumped_version(upload, monkeypatch):
+    from app.store import client_epoch, get_collection, index_reader
+
+    upload("a.pdf", [prose("alpha")])
+    monkeypatch.setenv("APP_ROLE", "query")
+    with index_reader():
+        epoch = client_epoch()
+        before = get_collection().count()
+
+    with index_reader():
+        # the writer commits while this request is running: it keeps its System
+        monkeypatch.setenv("APP_ROLE", "writer")
+        upload("b.pdf", [prose("beta")])
+        monkeypatch.setenv("APP_ROLE", "query")
+        with index_reader():
+            assert client_epoch() == epoch
+
+    # the next request starts on the new version
+    with index_reader():
+        assert client_epoch() == epoch + 1
+        assert get_collection().count() > before
+
+
+def test_query_worker_collection_is_read_only(upload, monkeypatch):
+    from app.store import get_collection, index_reader
+
+    upload("a.pdf", [prose("alpha")])
+    monkeypatch.setenv("APP_ROLE", "query")
+    with index_reader():
+        col = get_collection()
+        assert col.count()
+        with pytest.raises(RuntimeError, match="query worker"):
+            col.delete(ids=["x"])
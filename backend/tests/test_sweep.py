@@ -0,0 +1,63 @@
+# backend/tests/test_sweep.py
+import csv
+import json
+
+from conftest import prose
+
+
+def test_sweep_writes_one_row_per_setting(upload, data_dir, tmp_path, monkeypatch, capsys):
+    from app import store
+    from app.store import get_client
+    from eval import retrieval_sweep
+
+    upload("a.pdf", [prose("alpha"), prose("beta")])
+    b = upload("b.pdf", [prose("gamma")])
+    labels = tmp_path / "labels.json"
+    labels.write_text(
+        json.dumps(
+            [
+                {"question": prose("beta")[:300], "doc": "a.pdf", "pages": [2]},
+                {"question": prose("gamma")[:300], "doc": b["doc_id"], "pages": [1], "scoped": False},
+            ]
+        )
+    )
+    out = tmp_path / "sweep.csv"
+    monkeypatch.setattr(store, "_writer_fd", None)
+    monkeypatch.setenv("PARTITION_MODE", "off")
+    monkeypatch.setattr(
+        "sys.argv",
+        ["retrieval_sweep.py", "--labels", str(labels), "--k", "4,8", "--chunk-size", "600,1800",
+         "--chunk-overlap", "100", "--repeats", "2", "--min-recall", "0.5", "--out", str(out)],
+    )
+    retrieval_sweep.main()
+
+    with open(out, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == retrieval_sweep.FIELDS
+        rows = list(reader)
+    assert sorted((int(r["chunk_size"]), int(r["k"])) for r in rows) == [(600, 4), (600, 8), (1800, 4), (1800, 8)]
+    for r in rows:
+        assert r["per_doc"] == "auto" and r["n_raw"] == "auto" and r["mode"] == "vector"
+        assert int(r["samples"]) == 4  # 2 questions x 2 repeats, warm-up excluded
+        assert float(r["recall_at_k"]) == 1.0 and float(r["mrr"]) > 0
+        assert 0 < float(r["latency_ms_p50"]) <= float(r["latency_ms_p95"])
+        assert float(r["peak_rss_mb"]) >= float(r["rss_mb"]) > 0
+    # the finer chunking produces more chunks
+    chunks = {int(r["chunk_size"]): int(r["chunks"]) for r in rows}
+    assert chunks[600] > chunks[1800]
+
+    assert "Fastest setting with recall@k >= 0.5" in capsys.readouterr().out
+    names = [getattr(c, "name", c) for c in get_client().list_collections()]
+    assert not [n for n in names if n.startswith(retrieval_sweep.SCRATCH_PREFIX)]
+
+
+def test_score_counts_deduplicated_pages():
+    from eval.retrieval_sweep import score
+
+    sources = [
+        {"metadata": {"doc_id": "a", "page": 1}},
+        {"metadata": {"doc_id": "a", "page": 3}, "also_in": [{"doc_id": "b", "page": 7}]},
+    ]
+    assert score(sources, {("b", 7)}) == (1.0, 0.5)
+    assert score(sources, {("a", 1), ("a", 2)}) == (0.5, 1.0)
+    assert score(sources, {("c", 1)}) == (0.0, 0.0)
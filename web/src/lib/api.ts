@@ -1,7 +1,8 @@
 import { BACKEND_URL } from "./config";
 
 export type Source = {
-  text: string;
+  id?: string;
+  text?: string; // omitted in lean responses; fetch with getChunk(id)
   snippet?: string;
   metadata?: {
     doc_id?: string;
@@ -22,11 +23,24 @@ export type Evidence = {
   notes?: string;
 };
 
+// Exact value from a table/chart, present when the question asks for figures
+export type Figure = {
+  doc_id: string;
+  page: number;
+  source: "table" | "figure";
+  label: string;
+  column: string;
+  value: string;
+  number: number | null;
+  hits: number; // question keywords the row matched
+};
+
 export type AskResponse = {
   answer: string;
   sources: Source[];
   evidence?: Evidence;
   routed_doc_ids?: string[];
+  figures?: Figure[];
 };
 
 export type DocListItem = { doc_id: string; doc_name: string; uploaded_at?: number };
@@ -52,7 +66,33 @@ export async function uploadPdf(file: File): Promise<{ doc_id: string; doc_name:
   return res.json();
 }
 
-type AskOptions = { doc_ids: string[]; route?: boolean };
+export type BulkUploadResult = {
+  documents: number;
+  failed: number;
+  pages: number;
+  seconds: number;
+  pages_per_s: number | null;
+  chunks_per_s: number | null;
+  results: { doc_id: string; doc_name: string; status: "ok" | "error"; error?: string }[];
+};
+
+// POST /upload/batch (multipart form-data: "files", repeated)
+export async function uploadPdfs(files: File[]): Promise<BulkUploadResult> {
+  const form = new FormData();
+  for (const f of files) form.append("files", f);
+
+  const res = await fetch(`${BACKEND_URL}/upload/batch`, { method: "POST", body: form });
+  if (!res.ok) throw new Error(`Bulk upload failed: ${res.status} ${res.statusText}`);
+  return res.json();
+}
+
+type AskOptions = {
+  doc_ids: string[];
+  route?: boolean;
+  response_mode?: "full" | "lean";
+  retrieval_mode?: "vector" | "hybrid" | "lexical" | "auto";
+  kind?: "chat" | "summary" | "batch"; // admission priority class
+};
 
 // POST /chat
 export async function askQuestion(question: string, opts: AskOptions): Promise<AskResponse> {
@@ -63,13 +103,28 @@ export async function askQuestion(question: string, opts: AskOptions): Promise<A
       question,
       doc_ids: opts.doc_ids,
       route: opts.route ?? true,
+      // the UI only renders snippet + citation metadata; full text is fetched with getChunk()
+      response_mode: opts.response_mode ?? "lean",
+      retrieval_mode: opts.retrieval_mode,
+      kind: opts.kind ?? "chat",
     }),
   });
 
+  if (res.status === 429) {
+    const wait = res.headers.get("Retry-After") ?? "a few";
+    throw new Error(`Server busy, try again in ${wait}s`);
+  }
   if (!res.ok) throw new Error(`Chat failed: ${res.status} ${res.statusText}`);
   return res.json();
 }
 
+// GET /chunks/{id} (full text for a lean source)
+export async function getChunk(id: string): Promise<Source> {
+  const res = await fetch(`${BACKEND_URL}/chunks/${encodeURIComponent(id)}`);
+  if (!res.ok) throw new Error(`Chunk failed: ${res.status} ${res.statusText}`);
+  return res.json();
+}
+
 // Summarize = /chat with fixed prompt
 export async function summarize(opts: AskOptions): Promise<AskResponse> {
   const prompt =
@@ -81,7 +136,7 @@ export async function summarize(opts: AskOptions): Promise<AskResponse> {
     "Rules: Use only the provided document. Use 1–2 citations per bullet max. " +
     "If missing, say 'Not enough information in the provided excerpts.'";
 
-  return askQuestion(prompt, opts);
+  return askQuestion(prompt, { ...opts, kind: "summary" });
 }
 
 export async function getBackendConfig() {